@@ -48,5 +48,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload the config entry when options are changed."""
+    """Apply changed options, reloading the config entry only when required."""
+    coordinator: MarstekCoordinator | None = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if coordinator is not None and coordinator.async_update_options(entry.options):
+        return
     await hass.config_entries.async_reload(entry.entry_id)
@@ -1,4 +1,7 @@
 """Config flow for Marstek Venus HA Integration."""
+from collections import ChainMap
+from itertools import product
+
 import voluptuous as vol
 
 from homeassistant import config_entries
@@ -6,6 +9,7 @@ from homeassistant.helpers import selector
 
 from .const import (
     DOMAIN,
+    BATTERY_ENTITY_PARTS,
     CONF_CT_MODE,
     CONF_GRID_POWER_SENSOR,
     CONF_PV_POWER_SENSOR,
@@ -41,6 +45,8 @@ from .const import (
     CONF_PID_KP,
     CONF_PID_KI,
     CONF_PID_KD,
+    CONF_PID_RESET_ON_ZERO_CROSSING,
+    CONF_PID_DEADBAND,
     DEFAULT_CT_MODE,
     DEFAULT_SMOOTHING_SECONDS,
     DEFAULT_MIN_SURPLUS,
@@ -69,6 +75,8 @@ from .const import (
     DEFAULT_PID_KP,
     DEFAULT_PID_KI,
     DEFAULT_PID_KD,
+    DEFAULT_PID_RESET_ON_ZERO_CROSSING,
+    DEFAULT_PID_DEADBAND,
         CONF_CHARGE_POWER_LEVEL_1,
         CONF_CHARGE_POWER_LEVEL_2,
         CONF_CHARGE_POWER_LEVEL_3,
@@ -91,7 +99,165 @@ from .const import (
         DEFAULT_DISCHARGE_POWER_LEVEL_5,
 )
 
-class MarstekConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
+# Entity selectors are immutable and shared by all form renders
+_SENSOR_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor"))
+_BINARY_SENSOR_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain="binary_sensor"))
+
+# Bounded validators, so invalid values are rejected when the form is submitted
+_PERCENT = vol.All(vol.Coerce(int), vol.Range(min=0, max=100))
+_POS_INT = vol.All(vol.Coerce(int), vol.Range(min=0))
+_POS_FLOAT = vol.All(vol.Coerce(float), vol.Range(min=0))
+
+# Plain form fields as (key, required, validator, default). The config flow uses the
+# default, the options flow prefills the current value and falls back to the default.
+_BASIC_FIELDS = (
+    (CONF_SMOOTHING_SECONDS, True, _POS_INT, DEFAULT_SMOOTHING_SECONDS),
+    (CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS, True, _POS_INT, DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS),
+    (CONF_SERVICE_CALL_CACHE_SECONDS, True, _POS_INT, DEFAULT_SERVICE_CALL_CACHE_SECONDS),
+)
+
+_BATTERIES_FIELDS = (
+    (CONF_MIN_SOC, True, _PERCENT, DEFAULT_MIN_SOC),
+    (CONF_MAX_SOC, True, _PERCENT, DEFAULT_MAX_SOC),
+    (CONF_MAX_DISCHARGE_POWER, True, _POS_INT, DEFAULT_MAX_DISCHARGE_POWER),
+    (CONF_MAX_CHARGE_POWER, True, _POS_INT, DEFAULT_MAX_CHARGE_POWER),
+    (CONF_CHARGE_POWER_LEVEL_1, True, _POS_INT, DEFAULT_CHARGE_POWER_LEVEL_1),
+    (CONF_CHARGE_POWER_LEVEL_2, True, _POS_INT, DEFAULT_CHARGE_POWER_LEVEL_2),
+    (CONF_CHARGE_POWER_LEVEL_3, True, _POS_INT, DEFAULT_CHARGE_POWER_LEVEL_3),
+    (CONF_CHARGE_POWER_LEVEL_4, True, _POS_INT, DEFAULT_CHARGE_POWER_LEVEL_4),
+    (CONF_CHARGE_POWER_LEVEL_5, True, _POS_INT, DEFAULT_CHARGE_POWER_LEVEL_5),
+    (CONF_DISCHARGE_POWER_LEVEL_1, True, _POS_INT, DEFAULT_DISCHARGE_POWER_LEVEL_1),
+    (CONF_DISCHARGE_POWER_LEVEL_2, True, _POS_INT, DEFAULT_DISCHARGE_POWER_LEVEL_2),
+    (CONF_DISCHARGE_POWER_LEVEL_3, True, _POS_INT, DEFAULT_DISCHARGE_POWER_LEVEL_3),
+    (CONF_DISCHARGE_POWER_LEVEL_4, True, _POS_INT, DEFAULT_DISCHARGE_POWER_LEVEL_4),
+    (CONF_DISCHARGE_POWER_LEVEL_5, True, _POS_INT, DEFAULT_DISCHARGE_POWER_LEVEL_5),
+    (CONF_MIN_SURPLUS, True, _POS_INT, DEFAULT_MIN_SURPLUS),
+    (CONF_MIN_CONSUMPTION, True, _POS_INT, DEFAULT_MIN_CONSUMPTION),
+    (CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING, True, _POS_INT, DEFAULT_MAX_LIMIT_BREACHES_BEFORE_ZEROING),
+    (CONF_POWER_STAGE_DISCHARGE_1, True, _POS_INT, DEFAULT_POWER_STAGE_DISCHARGE_1),
+    (CONF_POWER_STAGE_DISCHARGE_2, True, _POS_INT, DEFAULT_POWER_STAGE_DISCHARGE_2),
+    (CONF_POWER_STAGE_CHARGE_1, True, _POS_INT, DEFAULT_POWER_STAGE_CHARGE_1),
+    (CONF_POWER_STAGE_CHARGE_2, True, _POS_INT, DEFAULT_POWER_STAGE_CHARGE_2),
+    (CONF_POWER_STAGE_OFFSET, True, _POS_INT, DEFAULT_POWER_STAGE_OFFSET),
+    (CONF_PRIORITY_INTERVAL, True, _POS_INT, DEFAULT_PRIORITY_INTERVAL),
+)
+
+_WALLBOX_FIELDS = (
+    (CONF_WALLBOX_MAX_SURPLUS, False, _POS_INT, DEFAULT_WALLBOX_MAX_SURPLUS),
+    (CONF_WALLBOX_POWER_STABILITY_THRESHOLD, False, _POS_INT, DEFAULT_WALLBOX_POWER_STABILITY_THRESHOLD),
+    (CONF_WALLBOX_STABILITY_MIN_POWER_GAP, False, _POS_INT, DEFAULT_WALLBOX_STABILITY_MIN_POWER_GAP),
+    (CONF_WALLBOX_STABILITY_MIN_GAP_DURATION_SECONDS, False, _POS_INT, DEFAULT_WALLBOX_STABILITY_MIN_GAP_DURATION_SECONDS),
+    (CONF_WALLBOX_RESUME_CHECK_SECONDS, False, _POS_INT, DEFAULT_WALLBOX_RESUME_CHECK_SECONDS),
+    (CONF_WALLBOX_START_DELAY_SECONDS, False, _POS_INT, DEFAULT_WALLBOX_START_DELAY_SECONDS),
+    (CONF_WALLBOX_RETRY_MINUTES, False, _POS_INT, DEFAULT_WALLBOX_RETRY_MINUTES),
+)
+
+_PID_FIELDS = (
+    (CONF_PID_ENABLED, True, bool, DEFAULT_PID_ENABLED),
+    (CONF_PID_KP, True, _POS_FLOAT, DEFAULT_PID_KP),
+    (CONF_PID_KI, True, _POS_FLOAT, DEFAULT_PID_KI),
+    (CONF_PID_KD, True, _POS_FLOAT, DEFAULT_PID_KD),
+    (CONF_PID_RESET_ON_ZERO_CROSSING, True, bool, DEFAULT_PID_RESET_ON_ZERO_CROSSING),
+    (CONF_PID_DEADBAND, True, _POS_FLOAT, DEFAULT_PID_DEADBAND),
+)
+
+
+def _fields_schema(fields, default_fn=None) -> dict:
+    """Build the voluptuous schema dict for a field table.
+
+    default_fn(key, default) returns the prefilled value; without it the default is used.
+    """
+    return {
+        (vol.Required if required else vol.Optional)(
+            key, default=default if default_fn is None else default_fn(key, default)
+        ): validator
+        for key, required, validator, default in fields
+    }
+
+
+# Config flow schemas only use static defaults, so they are built once at import
+USER_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_CT_MODE, default=DEFAULT_CT_MODE): bool,
+        vol.Required(CONF_GRID_POWER_SENSOR): _SENSOR_SELECTOR,
+        vol.Optional(CONF_PV_POWER_SENSOR): _SENSOR_SELECTOR,
+        **_fields_schema(_BASIC_FIELDS),
+    }
+)
+
+BATTERIES_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_BATTERY_1_ENTITY): str,
+        vol.Optional(CONF_BATTERY_2_ENTITY, default=""): str,
+        vol.Optional(CONF_BATTERY_3_ENTITY, default=""): str,
+        **_fields_schema(_BATTERIES_FIELDS),
+    }
+)
+
+WALLBOX_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_WALLBOX_POWER_SENSOR): _SENSOR_SELECTOR,
+        vol.Optional(CONF_WALLBOX_CABLE_SENSOR): _BINARY_SENSOR_SELECTOR,
+        **_fields_schema(_WALLBOX_FIELDS),
+    }
+)
+
+PID_SCHEMA = vol.Schema(_fields_schema(_PID_FIELDS))
+
+_BATTERY_ENTITY_DOMAINS = ("sensor", "number", "select", "switch")
+_BATTERY_KEYS = (CONF_BATTERY_1_ENTITY, CONF_BATTERY_2_ENTITY, CONF_BATTERY_3_ENTITY)
+# The battery step descriptions always reference {missing}
+_NO_MISSING_PLACEHOLDERS = {"missing": ""}
+
+
+def _validate_battery_entities(known_entity_ids: set[str], user_input: dict) -> list[str]:
+    """Return the expected battery entities that do not exist, sorted and without duplicates."""
+    base_ids = [
+        base
+        for value in (user_input.get(key) for key in _BATTERY_KEYS)
+        if isinstance(value, str) and (base := value.strip())
+    ]
+
+    if not base_ids:
+        return []
+
+    expected = {
+        prefix + base + suffix
+        for base, (prefix, suffix) in product(base_ids, BATTERY_ENTITY_PARTS.values())
+    }
+    # Entity ids are lowercase in the state machine; hass.states.get() used to match mixed-case input too.
+    # Report the ids as the user entered them.
+    return sorted(entity_id for entity_id in expected if entity_id.lower() not in known_entity_ids)
+
+
+class _MarstekFlowMixin:
+    """Step handling shared by the config flow and the options flow."""
+
+    def _check_batteries(self, user_input: dict) -> dict[str, str] | None:
+        """Return the description placeholders listing missing entities, or None if all exist."""
+        # One snapshot of the battery domain entity ids per check
+        known_entity_ids = set(self.hass.states.async_entity_ids(_BATTERY_ENTITY_DOMAINS))
+        missing = _validate_battery_entities(known_entity_ids, user_input)
+        if missing:
+            return {"missing": ", ".join(missing)}
+        return None
+
+    def _show_batteries_form(self, data_schema, placeholders: dict[str, str] | None = None):
+        if placeholders is None:
+            return self.async_show_form(
+                step_id="batteries",
+                data_schema=data_schema,
+                description_placeholders=_NO_MISSING_PLACEHOLDERS,
+            )
+        return self.async_show_form(
+            step_id="batteries",
+            data_schema=data_schema,
+            errors={"base": "missing_battery_entities"},
+            description_placeholders=placeholders,
+        )
+
+
+class MarstekConfigFlow(_MarstekFlowMixin, config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Marstek Venus HA."""
 
     VERSION = 1
@@ -103,104 +269,20 @@ class MarstekConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             self._data = dict(user_input)
             return await self.async_step_batteries()
 
-        data_schema = vol.Schema(
-            {
-                vol.Required(CONF_CT_MODE, default=DEFAULT_CT_MODE): bool,
-                vol.Required(CONF_GRID_POWER_SENSOR): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain="sensor")
-                ),
-                vol.Optional(CONF_PV_POWER_SENSOR): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain="sensor")
-                ),
-                vol.Required(CONF_SMOOTHING_SECONDS, default=DEFAULT_SMOOTHING_SECONDS): int,
-                vol.Required(
-                    CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS,
-                    default=DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS,
-                ): int,
-                vol.Required(
-                    CONF_SERVICE_CALL_CACHE_SECONDS,
-                    default=DEFAULT_SERVICE_CALL_CACHE_SECONDS,
-                ): int,
-            }
-        )
-
         return self.async_show_form(
-            step_id="user", data_schema=data_schema, errors=errors
+            step_id="user", data_schema=USER_SCHEMA, errors=errors
         )
 
     async def async_step_batteries(self, user_input=None):
         """Battery configuration step."""
-        errors = {}
-        placeholders: dict[str, str] = {"missing": ""}
+        placeholders = None
         if user_input is not None:
-            missing = self._validate_battery_entities(user_input)
-            if missing:
-                errors["base"] = "missing_battery_entities"
-                placeholders["missing"] = ", ".join(missing)
-            else:
+            placeholders = self._check_batteries(user_input)
+            if placeholders is None:
                 self._data.update(user_input)
                 return await self.async_step_wallbox()
 
-        data_schema = vol.Schema(
-            {
-                vol.Required(CONF_BATTERY_1_ENTITY): str,
-                vol.Optional(CONF_BATTERY_2_ENTITY, default=""): str,
-                vol.Optional(CONF_BATTERY_3_ENTITY, default=""): str,
-                vol.Required(CONF_MIN_SOC, default=DEFAULT_MIN_SOC): int,
-                vol.Required(CONF_MAX_SOC, default=DEFAULT_MAX_SOC): int,
-                vol.Required(CONF_MAX_DISCHARGE_POWER, default=DEFAULT_MAX_DISCHARGE_POWER): int,
-                vol.Required(CONF_MAX_CHARGE_POWER, default=DEFAULT_MAX_CHARGE_POWER): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_1, default=DEFAULT_CHARGE_POWER_LEVEL_1): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_2, default=DEFAULT_CHARGE_POWER_LEVEL_2): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_3, default=DEFAULT_CHARGE_POWER_LEVEL_3): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_4, default=DEFAULT_CHARGE_POWER_LEVEL_4): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_5, default=DEFAULT_CHARGE_POWER_LEVEL_5): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_1, default=DEFAULT_DISCHARGE_POWER_LEVEL_1): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_2, default=DEFAULT_DISCHARGE_POWER_LEVEL_2): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_3, default=DEFAULT_DISCHARGE_POWER_LEVEL_3): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_4, default=DEFAULT_DISCHARGE_POWER_LEVEL_4): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_5, default=DEFAULT_DISCHARGE_POWER_LEVEL_5): int,
-                vol.Required(CONF_MIN_SURPLUS, default=DEFAULT_MIN_SURPLUS): int,
-                vol.Required(CONF_MIN_CONSUMPTION, default=DEFAULT_MIN_CONSUMPTION): int,
-                vol.Required(CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING, default=DEFAULT_MAX_LIMIT_BREACHES_BEFORE_ZEROING): int,
-                vol.Required(CONF_POWER_STAGE_DISCHARGE_1, default=DEFAULT_POWER_STAGE_DISCHARGE_1): int,
-                vol.Required(CONF_POWER_STAGE_DISCHARGE_2, default=DEFAULT_POWER_STAGE_DISCHARGE_2): int,
-                vol.Required(CONF_POWER_STAGE_CHARGE_1, default=DEFAULT_POWER_STAGE_CHARGE_1): int,
-                vol.Required(CONF_POWER_STAGE_CHARGE_2, default=DEFAULT_POWER_STAGE_CHARGE_2): int,
-                vol.Required(CONF_POWER_STAGE_OFFSET, default=DEFAULT_POWER_STAGE_OFFSET): int,
-                vol.Required(CONF_PRIORITY_INTERVAL, default=DEFAULT_PRIORITY_INTERVAL): int,
-            }
-        )
-
-        return self.async_show_form(
-            step_id="batteries",
-            data_schema=data_schema,
-            errors=errors,
-            description_placeholders=placeholders,
-        )
-
-    def _validate_battery_entities(self, user_input: dict) -> list[str]:
-        missing: list[str] = []
-        base_ids = [
-            user_input.get(CONF_BATTERY_1_ENTITY),
-            user_input.get(CONF_BATTERY_2_ENTITY),
-            user_input.get(CONF_BATTERY_3_ENTITY),
-        ]
-        base_ids = [b.strip() for b in base_ids if b and isinstance(b, str) and b.strip()]
-
-        for base in base_ids:
-            expected = [
-                f"sensor.{base}_ac_power",
-                f"sensor.{base}_battery_soc",
-                f"number.{base}_modbus_set_forcible_charge_power",
-                f"number.{base}_modbus_set_forcible_discharge_power",
-                f"select.{base}_modbus_force_mode",
-                f"switch.{base}_modbus_rs485_control_mode",
-            ]
-            for ent_id in expected:
-                if self.hass.states.get(ent_id) is None:
-                    missing.append(ent_id)
-        return missing
+        return self._show_batteries_form(BATTERIES_SCHEMA, placeholders)
 
     async def async_step_wallbox(self, user_input=None):
         """Wallbox configuration step."""
@@ -209,26 +291,8 @@ class MarstekConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             self._data.update(user_input)
             return await self.async_step_pid()
 
-        data_schema = vol.Schema(
-            {
-                vol.Optional(CONF_WALLBOX_POWER_SENSOR): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain="sensor")
-                ),
-                vol.Optional(CONF_WALLBOX_MAX_SURPLUS, default=DEFAULT_WALLBOX_MAX_SURPLUS): int,
-                vol.Optional(CONF_WALLBOX_CABLE_SENSOR): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain="binary_sensor")
-                ),
-                vol.Optional(CONF_WALLBOX_POWER_STABILITY_THRESHOLD, default=DEFAULT_WALLBOX_POWER_STABILITY_THRESHOLD): int,
-                vol.Optional(CONF_WALLBOX_STABILITY_MIN_POWER_GAP, default=DEFAULT_WALLBOX_STABILITY_MIN_POWER_GAP): int,
-                vol.Optional(CONF_WALLBOX_STABILITY_MIN_GAP_DURATION_SECONDS, default=DEFAULT_WALLBOX_STABILITY_MIN_GAP_DURATION_SECONDS): int,
-                vol.Optional(CONF_WALLBOX_RESUME_CHECK_SECONDS, default=DEFAULT_WALLBOX_RESUME_CHECK_SECONDS): int,
-                vol.Optional(CONF_WALLBOX_START_DELAY_SECONDS, default=DEFAULT_WALLBOX_START_DELAY_SECONDS): int,
-                vol.Optional(CONF_WALLBOX_RETRY_MINUTES, default=DEFAULT_WALLBOX_RETRY_MINUTES): int,
-            }
-        )
-
         return self.async_show_form(
-            step_id="wallbox", data_schema=data_schema, errors=errors
+            step_id="wallbox", data_schema=WALLBOX_SCHEMA, errors=errors
         )
 
     async def async_step_pid(self, user_input=None):
@@ -241,15 +305,7 @@ class MarstekConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 data=self._data,
             )
 
-        data_schema = vol.Schema(
-            {
-                vol.Required(CONF_PID_ENABLED, default=DEFAULT_PID_ENABLED): bool,
-                vol.Required(CONF_PID_KP, default=DEFAULT_PID_KP): vol.Coerce(float),
-                vol.Required(CONF_PID_KI, default=DEFAULT_PID_KI): vol.Coerce(float),
-                vol.Required(CONF_PID_KD, default=DEFAULT_PID_KD): vol.Coerce(float),
-            }
-        )
-        return self.async_show_form(step_id="pid", data_schema=data_schema, errors=errors)
+        return self.async_show_form(step_id="pid", data_schema=PID_SCHEMA, errors=errors)
 
     @staticmethod
     def async_get_options_flow(config_entry):
@@ -257,16 +313,31 @@ class MarstekConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         return MarstekOptionsFlowHandler()
 
 
-class MarstekOptionsFlowHandler(config_entries.OptionsFlow):
+class MarstekOptionsFlowHandler(_MarstekFlowMixin, config_entries.OptionsFlow):
     """Handle options flow."""
 
     def __init__(self) -> None:
         self._options: dict = {}
+        self._defaults: ChainMap = ChainMap(self._options)
         self._all_mode: bool = False
 
+    def _load_options(self) -> None:
+        """Start from the stored options; form defaults fall back to the entry data."""
+        self._options = dict(self.config_entry.options)
+        self._defaults = ChainMap(self._options, self.config_entry.data)
+
+    def _default(self, key: str, fallback=None):
+        return self._defaults.get(key, fallback)
+
+    async def _async_next_or_finish(self, next_step):
+        """Continue with next_step in 'all' mode, otherwise save the options."""
+        if self._all_mode:
+            return await next_step()
+        return self.async_create_entry(title="", data=self._options)
+
     async def async_step_init(self, user_input=None):
         """Manage the options."""
-        self._options = dict(self.config_entry.options)
+        self._load_options()
         self._all_mode = False
         return self.async_show_menu(
             step_id="init",
@@ -275,7 +346,7 @@ class MarstekOptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_all(self, user_input=None):
         """Run through all option sections sequentially."""
-        self._options = dict(self.config_entry.options)
+        self._load_options()
         self._all_mode = True
         return await self.async_step_basic()
 
@@ -287,129 +358,60 @@ class MarstekOptionsFlowHandler(config_entries.OptionsFlow):
                 user_input[CONF_PV_POWER_SENSOR] = None
 
             self._options.update(user_input)
-            if self._all_mode:
-                return await self.async_step_batteries()
-            return self.async_create_entry(title="", data=self._options)
+            return await self._async_next_or_finish(self.async_step_batteries)
 
         data_schema = vol.Schema(
             {
                 vol.Required(
                     CONF_CT_MODE,
-                    default=self._options.get(CONF_CT_MODE, self.config_entry.data.get(CONF_CT_MODE, DEFAULT_CT_MODE)),
+                    default=self._default(CONF_CT_MODE, DEFAULT_CT_MODE),
                 ): bool,
                 vol.Required(
                     CONF_GRID_POWER_SENSOR,
-                    default=self._options.get(CONF_GRID_POWER_SENSOR, self.config_entry.data.get(CONF_GRID_POWER_SENSOR)),
-                ): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
+                    default=self._default(CONF_GRID_POWER_SENSOR),
+                ): _SENSOR_SELECTOR,
                 vol.Optional(
                     CONF_PV_POWER_SENSOR,
-                    description={"suggested_value": self._options.get(CONF_PV_POWER_SENSOR, self.config_entry.data.get(CONF_PV_POWER_SENSOR))},
-                ): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
-                vol.Required(
-                    CONF_SMOOTHING_SECONDS,
-                    default=self._options.get(CONF_SMOOTHING_SECONDS, self.config_entry.data.get(CONF_SMOOTHING_SECONDS, DEFAULT_SMOOTHING_SECONDS)),
-                ): int,
-                vol.Required(
-                    CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS,
-                    default=self._options.get(CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS, self.config_entry.data.get(CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS, DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS)),
-                ): int,
-                vol.Required(
-                    CONF_SERVICE_CALL_CACHE_SECONDS,
-                    default=self._options.get(CONF_SERVICE_CALL_CACHE_SECONDS, self.config_entry.data.get(CONF_SERVICE_CALL_CACHE_SECONDS, DEFAULT_SERVICE_CALL_CACHE_SECONDS)),
-                ): int
+                    description={"suggested_value": self._default(CONF_PV_POWER_SENSOR)},
+                ): _SENSOR_SELECTOR,
+                **_fields_schema(_BASIC_FIELDS, self._default),
             }
         )
         return self.async_show_form(step_id="basic", data_schema=data_schema)
 
     async def async_step_batteries(self, user_input=None):
         """Battery configuration step."""
-        errors: dict = {}
-        placeholders: dict[str, str] = {"missing": ""}
+        placeholders = None
         if user_input is not None:
             # Batterien explizit leeren wenn Feld gelöscht
             for field in [CONF_BATTERY_2_ENTITY, CONF_BATTERY_3_ENTITY]:
                 if field not in user_input or user_input[field] is None:
                     user_input[field] = ""
 
-            missing = self._validate_battery_entities(user_input)
-            if missing:
-                errors["base"] = "missing_battery_entities"
-                placeholders["missing"] = ", ".join(missing)
-            else:
+            placeholders = self._check_batteries(user_input)
+            if placeholders is None:
                 self._options.update(user_input)
-                if self._all_mode:
-                    return await self.async_step_wallbox()
-                return self.async_create_entry(title="", data=self._options)
+                return await self._async_next_or_finish(self.async_step_wallbox)
 
         data_schema = vol.Schema(
             {
                 vol.Required(
                     CONF_BATTERY_1_ENTITY,
-                    default=self._options.get(CONF_BATTERY_1_ENTITY, self.config_entry.data.get(CONF_BATTERY_1_ENTITY)),
+                    default=self._default(CONF_BATTERY_1_ENTITY),
                 ): str,
                 vol.Optional(
                     CONF_BATTERY_2_ENTITY,
-                    description={"suggested_value": self._options.get(CONF_BATTERY_2_ENTITY, self.config_entry.data.get(CONF_BATTERY_2_ENTITY, ""))},
+                    description={"suggested_value": self._default(CONF_BATTERY_2_ENTITY, "")},
                 ): str,
                 vol.Optional(
                     CONF_BATTERY_3_ENTITY,
-                    description={"suggested_value": self._options.get(CONF_BATTERY_3_ENTITY, self.config_entry.data.get(CONF_BATTERY_3_ENTITY, ""))},
+                    description={"suggested_value": self._default(CONF_BATTERY_3_ENTITY, "")},
                 ): str,
-                vol.Required(CONF_MIN_SOC, default=self._options.get(CONF_MIN_SOC, self.config_entry.data.get(CONF_MIN_SOC, DEFAULT_MIN_SOC))): int,
-                vol.Required(CONF_MAX_SOC, default=self._options.get(CONF_MAX_SOC, self.config_entry.data.get(CONF_MAX_SOC, DEFAULT_MAX_SOC))): int,
-                vol.Required(CONF_MAX_DISCHARGE_POWER, default=self._options.get(CONF_MAX_DISCHARGE_POWER, self.config_entry.data.get(CONF_MAX_DISCHARGE_POWER, DEFAULT_MAX_DISCHARGE_POWER))): int,
-                vol.Required(CONF_MAX_CHARGE_POWER, default=self._options.get(CONF_MAX_CHARGE_POWER, self.config_entry.data.get(CONF_MAX_CHARGE_POWER, DEFAULT_MAX_CHARGE_POWER))): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_1, default=self._options.get(CONF_CHARGE_POWER_LEVEL_1, self.config_entry.data.get(CONF_CHARGE_POWER_LEVEL_1, DEFAULT_CHARGE_POWER_LEVEL_1))): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_2, default=self._options.get(CONF_CHARGE_POWER_LEVEL_2, self.config_entry.data.get(CONF_CHARGE_POWER_LEVEL_2, DEFAULT_CHARGE_POWER_LEVEL_2))): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_3, default=self._options.get(CONF_CHARGE_POWER_LEVEL_3, self.config_entry.data.get(CONF_CHARGE_POWER_LEVEL_3, DEFAULT_CHARGE_POWER_LEVEL_3))): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_4, default=self._options.get(CONF_CHARGE_POWER_LEVEL_4, self.config_entry.data.get(CONF_CHARGE_POWER_LEVEL_4, DEFAULT_CHARGE_POWER_LEVEL_4))): int,
-                vol.Required(CONF_CHARGE_POWER_LEVEL_5, default=self._options.get(CONF_CHARGE_POWER_LEVEL_5, self.config_entry.data.get(CONF_CHARGE_POWER_LEVEL_5, DEFAULT_CHARGE_POWER_LEVEL_5))): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_1, default=self._options.get(CONF_DISCHARGE_POWER_LEVEL_1, self.config_entry.data.get(CONF_DISCHARGE_POWER_LEVEL_1, DEFAULT_DISCHARGE_POWER_LEVEL_1))): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_2, default=self._options.get(CONF_DISCHARGE_POWER_LEVEL_2, self.config_entry.data.get(CONF_DISCHARGE_POWER_LEVEL_2, DEFAULT_DISCHARGE_POWER_LEVEL_2))): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_3, default=self._options.get(CONF_DISCHARGE_POWER_LEVEL_3, self.config_entry.data.get(CONF_DISCHARGE_POWER_LEVEL_3, DEFAULT_DISCHARGE_POWER_LEVEL_3))): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_4, default=self._options.get(CONF_DISCHARGE_POWER_LEVEL_4, self.config_entry.data.get(CONF_DISCHARGE_POWER_LEVEL_4, DEFAULT_DISCHARGE_POWER_LEVEL_4))): int,
-                vol.Required(CONF_DISCHARGE_POWER_LEVEL_5, default=self._options.get(CONF_DISCHARGE_POWER_LEVEL_5, self.config_entry.data.get(CONF_DISCHARGE_POWER_LEVEL_5, DEFAULT_DISCHARGE_POWER_LEVEL_5))): int,
-                vol.Required(CONF_MIN_SURPLUS, default=self._options.get(CONF_MIN_SURPLUS, self.config_entry.data.get(CONF_MIN_SURPLUS, DEFAULT_MIN_SURPLUS))): int,
-                vol.Required(CONF_MIN_CONSUMPTION, default=self._options.get(CONF_MIN_CONSUMPTION, self.config_entry.data.get(CONF_MIN_CONSUMPTION, DEFAULT_MIN_CONSUMPTION))): int,
-                vol.Required(CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING, default=self._options.get(CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING, self.config_entry.data.get(CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING, DEFAULT_MAX_LIMIT_BREACHES_BEFORE_ZEROING))): int,
-                vol.Required(CONF_POWER_STAGE_DISCHARGE_1, default=self._options.get(CONF_POWER_STAGE_DISCHARGE_1, self.config_entry.data.get(CONF_POWER_STAGE_DISCHARGE_1, DEFAULT_POWER_STAGE_DISCHARGE_1))): int,
-                vol.Required(CONF_POWER_STAGE_DISCHARGE_2, default=self._options.get(CONF_POWER_STAGE_DISCHARGE_2, self.config_entry.data.get(CONF_POWER_STAGE_DISCHARGE_2, DEFAULT_POWER_STAGE_DISCHARGE_2))): int,
-                vol.Required(CONF_POWER_STAGE_CHARGE_1, default=self._options.get(CONF_POWER_STAGE_CHARGE_1, self.config_entry.data.get(CONF_POWER_STAGE_CHARGE_1, DEFAULT_POWER_STAGE_CHARGE_1))): int,
-                vol.Required(CONF_POWER_STAGE_CHARGE_2, default=self._options.get(CONF_POWER_STAGE_CHARGE_2, self.config_entry.data.get(CONF_POWER_STAGE_CHARGE_2, DEFAULT_POWER_STAGE_CHARGE_2))): int,
-                vol.Required(CONF_POWER_STAGE_OFFSET, default=self._options.get(CONF_POWER_STAGE_OFFSET, self.config_entry.data.get(CONF_POWER_STAGE_OFFSET, DEFAULT_POWER_STAGE_OFFSET))): int,
-                vol.Required(CONF_PRIORITY_INTERVAL, default=self._options.get(CONF_PRIORITY_INTERVAL, self.config_entry.data.get(CONF_PRIORITY_INTERVAL, DEFAULT_PRIORITY_INTERVAL))): int,
+                **_fields_schema(_BATTERIES_FIELDS, self._default),
             }
         )
 
-        return self.async_show_form(
-            step_id="batteries",
-            data_schema=data_schema,
-            errors=errors,
-            description_placeholders=placeholders,
-        )
-
-    def _validate_battery_entities(self, user_input: dict) -> list[str]:
-        missing: list[str] = []
-        base_ids = [
-            user_input.get(CONF_BATTERY_1_ENTITY),
-            user_input.get(CONF_BATTERY_2_ENTITY),
-            user_input.get(CONF_BATTERY_3_ENTITY),
-        ]
-        base_ids = [b.strip() for b in base_ids if b and isinstance(b, str) and b.strip()]
-
-        for base in base_ids:
-            expected = [
-                f"sensor.{base}_ac_power",
-                f"sensor.{base}_battery_soc",
-                f"number.{base}_modbus_set_forcible_charge_power",
-                f"number.{base}_modbus_set_forcible_discharge_power",
-                f"select.{base}_modbus_force_mode",
-                f"switch.{base}_modbus_rs485_control_mode",
-            ]
-            for ent_id in expected:
-                if self.hass.states.get(ent_id) is None:
-                    missing.append(ent_id)
-        return missing
+        return self._show_batteries_form(data_schema, placeholders)
 
     async def async_step_wallbox(self, user_input=None):
         """Wallbox configuration step."""
@@ -420,48 +422,19 @@ class MarstekOptionsFlowHandler(config_entries.OptionsFlow):
                     user_input[field] = None
 
             self._options.update(user_input)
-            if self._all_mode:
-                return await self.async_step_pid()
-            return self.async_create_entry(title="", data=self._options)
+            return await self._async_next_or_finish(self.async_step_pid)
 
         data_schema = vol.Schema(
             {
                 vol.Optional(
                     CONF_WALLBOX_POWER_SENSOR,
-                    description={"suggested_value": self._options.get(CONF_WALLBOX_POWER_SENSOR, self.config_entry.data.get(CONF_WALLBOX_POWER_SENSOR))},
-                ): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
+                    description={"suggested_value": self._default(CONF_WALLBOX_POWER_SENSOR)},
+                ): _SENSOR_SELECTOR,
                 vol.Optional(
                     CONF_WALLBOX_CABLE_SENSOR,
-                    description={"suggested_value": self._options.get(CONF_WALLBOX_CABLE_SENSOR, self.config_entry.data.get(CONF_WALLBOX_CABLE_SENSOR))},
-                ): selector.EntitySelector(selector.EntitySelectorConfig(domain="binary_sensor")),
-                vol.Optional(
-                    CONF_WALLBOX_MAX_SURPLUS,
-                    default=self._options.get(CONF_WALLBOX_MAX_SURPLUS, self.config_entry.data.get(CONF_WALLBOX_MAX_SURPLUS, DEFAULT_WALLBOX_MAX_SURPLUS)),
-                ): int,
-                vol.Optional(
-                    CONF_WALLBOX_POWER_STABILITY_THRESHOLD,
-                    default=self._options.get(CONF_WALLBOX_POWER_STABILITY_THRESHOLD, self.config_entry.data.get(CONF_WALLBOX_POWER_STABILITY_THRESHOLD, DEFAULT_WALLBOX_POWER_STABILITY_THRESHOLD)),
-                ): int,
-                vol.Optional(
-                    CONF_WALLBOX_STABILITY_MIN_POWER_GAP,
-                    default=self._options.get(CONF_WALLBOX_STABILITY_MIN_POWER_GAP, self.config_entry.data.get(CONF_WALLBOX_STABILITY_MIN_POWER_GAP, DEFAULT_WALLBOX_STABILITY_MIN_POWER_GAP)),
-                ): int,
-                 vol.Optional(
-                    CONF_WALLBOX_STABILITY_MIN_GAP_DURATION_SECONDS,
-                    default=self._options.get(CONF_WALLBOX_STABILITY_MIN_GAP_DURATION_SECONDS, self.config_entry.data.get(CONF_WALLBOX_STABILITY_MIN_GAP_DURATION_SECONDS, DEFAULT_WALLBOX_STABILITY_MIN_GAP_DURATION_SECONDS)),
-                ): int,
-                vol.Optional(
-                    CONF_WALLBOX_RESUME_CHECK_SECONDS,
-                    default=self._options.get(CONF_WALLBOX_RESUME_CHECK_SECONDS, self.config_entry.data.get(CONF_WALLBOX_RESUME_CHECK_SECONDS, DEFAULT_WALLBOX_RESUME_CHECK_SECONDS)),
-                ): int,
-                vol.Optional(
-                    CONF_WALLBOX_START_DELAY_SECONDS,
-                    default=self._options.get(CONF_WALLBOX_START_DELAY_SECONDS, self.config_entry.data.get(CONF_WALLBOX_START_DELAY_SECONDS, DEFAULT_WALLBOX_START_DELAY_SECONDS)),
-                ): int,
-                vol.Optional(
-                    CONF_WALLBOX_RETRY_MINUTES,
-                    default=self._options.get(CONF_WALLBOX_RETRY_MINUTES, self.config_entry.data.get(CONF_WALLBOX_RETRY_MINUTES, DEFAULT_WALLBOX_RETRY_MINUTES)),
-                ): int,
+                    description={"suggested_value": self._default(CONF_WALLBOX_CABLE_SENSOR)},
+                ): _BINARY_SENSOR_SELECTOR,
+                **_fields_schema(_WALLBOX_FIELDS, self._default),
             }
         )
         return self.async_show_form(step_id="wallbox", data_schema=data_schema)
@@ -472,24 +445,5 @@ class MarstekOptionsFlowHandler(config_entries.OptionsFlow):
             self._options.update(user_input)
             return self.async_create_entry(title="", data=self._options)
 
-        data_schema = vol.Schema(
-            {
-                vol.Required(
-                    CONF_PID_ENABLED,
-                    default=self._options.get(CONF_PID_ENABLED, self.config_entry.data.get(CONF_PID_ENABLED, DEFAULT_PID_ENABLED)),
-                ): bool,
-                vol.Required(
-                    CONF_PID_KP,
-                    default=self._options.get(CONF_PID_KP, self.config_entry.data.get(CONF_PID_KP, DEFAULT_PID_KP)),
-                ): vol.Coerce(float),
-                vol.Required(
-                    CONF_PID_KI,
-                    default=self._options.get(CONF_PID_KI, self.config_entry.data.get(CONF_PID_KI, DEFAULT_PID_KI)),
-                ): vol.Coerce(float),
-                vol.Required(
-                    CONF_PID_KD,
-                    default=self._options.get(CONF_PID_KD, self.config_entry.data.get(CONF_PID_KD, DEFAULT_PID_KD)),
-                ): vol.Coerce(float),
-            }
-        )
+        data_schema = vol.Schema(_fields_schema(_PID_FIELDS, self._default))
         return self.async_show_form(step_id="pid", data_schema=data_schema)
\ No newline at end of file
@@ -47,6 +47,8 @@ CONF_PID_ENABLED = "pid_enabled"
 CONF_PID_KP = "pid_kp"
 CONF_PID_KI = "pid_ki"
 CONF_PID_KD = "pid_kd"
+CONF_PID_RESET_ON_ZERO_CROSSING = "pid_reset_on_zero_crossing"
+CONF_PID_DEADBAND = "pid_deadband"
 # Default values
 DEFAULT_CT_MODE = False
 DEFAULT_SMOOTHING_SECONDS = 0
@@ -107,3 +109,15 @@ DEFAULT_PID_ENABLED = False
 DEFAULT_PID_KP = 0.6
 DEFAULT_PID_KI = 0.02
 DEFAULT_PID_KD = 0.0
+DEFAULT_PID_RESET_ON_ZERO_CROSSING = False
+DEFAULT_PID_DEADBAND = 0
+
+# Entities derived from a battery base id, as key -> (domain prefix, suffix)
+BATTERY_ENTITY_PARTS = {
+    "ac": ("sensor.", "_ac_power"),
+    "soc": ("sensor.", "_battery_soc"),
+    "charge": ("number.", "_modbus_set_forcible_charge_power"),
+    "discharge": ("number.", "_modbus_set_forcible_discharge_power"),
+    "mode": ("select.", "_modbus_force_mode"),
+    "ctrl": ("switch.", "_modbus_rs485_control_mode"),
+}
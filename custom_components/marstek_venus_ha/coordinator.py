@@ -1,15 +1,19 @@
 """Coordinator for the Marstek Venus HA integration."""
 import logging
-from collections import deque
+import math
+import time
+from collections import ChainMap, deque
 from datetime import datetime, timedelta
+from operator import itemgetter
 import asyncio
-from typing import Any, cast
+from typing import Any, Callable, Mapping, cast
 from enum import IntEnum
 
 from homeassistant.core import HomeAssistant, State, callback
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event, async_track_time_interval
 from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN, STATE_ON
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.util import dt as dt_util
 from homeassistant.helpers.storage import Store
@@ -17,6 +21,7 @@ from homeassistant.helpers.storage import Store
 
 from .const import (
     DOMAIN,
+    BATTERY_ENTITY_PARTS,
     SIGNAL_DIAGNOSTICS_UPDATED,
     CONF_CT_MODE,
     CONF_GRID_POWER_SENSOR,
@@ -76,10 +81,20 @@ from .const import (
     CONF_PID_KP,
     CONF_PID_KI,
     CONF_PID_KD,
+    CONF_PID_RESET_ON_ZERO_CROSSING,
+    CONF_PID_DEADBAND,
+    DEFAULT_MIN_SURPLUS,
+    DEFAULT_MIN_CONSUMPTION,
     DEFAULT_PID_ENABLED,
     DEFAULT_PID_KP,
     DEFAULT_PID_KI,
     DEFAULT_PID_KD,
+    DEFAULT_PID_RESET_ON_ZERO_CROSSING,
+    DEFAULT_PID_DEADBAND,
+    DEFAULT_POWER_STAGE_CHARGE_1,
+    DEFAULT_POWER_STAGE_CHARGE_2,
+    DEFAULT_POWER_STAGE_DISCHARGE_1,
+    DEFAULT_POWER_STAGE_DISCHARGE_2,
     DEFAULT_CHARGE_POWER_LEVEL_1,
     DEFAULT_CHARGE_POWER_LEVEL_2,
     DEFAULT_CHARGE_POWER_LEVEL_3,
@@ -98,30 +113,159 @@ _LOGGER = logging.getLogger(__name__)
 STORAGE_VERSION = 1
 STORAGE_KEY = f"{DOMAIN}_settings"
 
+# Fallback update period while no trigger sensor changes
+SAFETY_UPDATE_INTERVAL = timedelta(seconds=30)
+
+# Attempts for the write sequence of a single battery before giving up for this cycle
+SET_POWER_MAX_ATTEMPTS = 3
+# Minimum seconds between two battery priority recalculations (unless the direction changes)
+PRIORITY_RATE_LIMIT_SECONDS = 10.0
+# Seconds during which further switch toggles are merged into one update request
+SWITCH_REFRESH_COOLDOWN = 0.2
+# Seconds to merge a burst of trigger sensor changes into one update request
+STATE_CHANGE_COALESCE_DELAY = 0.05
+# Seconds to collect diagnostic changes (e.g. switch toggles) before notifying entities
+DIAGNOSTICS_BATCH_DELAY = 0.1
+# Options that change subscriptions or the battery set; these need a full entry reload
+RELOAD_REQUIRED_KEYS = (
+    CONF_BATTERY_1_ENTITY,
+    CONF_BATTERY_2_ENTITY,
+    CONF_BATTERY_3_ENTITY,
+    CONF_GRID_POWER_SENSOR,
+    CONF_PV_POWER_SENSOR,
+    CONF_WALLBOX_POWER_SENSOR,
+    CONF_WALLBOX_CABLE_SENSOR,
+    CONF_CT_MODE,
+)
+
+def _isoformat(value: datetime | None) -> str | None:
+    return None if value is None else value.isoformat()
+
+def _is_available(state: State | None) -> bool:
+    """Return True if the state exists and is neither unavailable nor unknown."""
+    return state is not None and state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN)
+
 class PowerDir(IntEnum):
     NEUTRAL = 0
     CHARGE = 1
     DISCHARGE = -1
 
+# Indexed by sign(real_power) + 1: surplus (negative) charges, consumption (positive) discharges
+_DIRECTION_BY_SIGN = (PowerDir.CHARGE, PowerDir.NEUTRAL, PowerDir.DISCHARGE)
+
+def _direction_for(real_power: float) -> PowerDir:
+    """Battery direction that compensates real_power."""
+    return _DIRECTION_BY_SIGN[(real_power > 0) - (real_power < 0) + 1]
+
+# Direction -> (key of the forcible power number in the battery entity map, force mode option).
+# NEUTRAL has no power number: both charge and discharge power are set to 0.
+_DIRECTION_TABLE: dict[int, tuple[str | None, str]] = {
+    PowerDir.CHARGE: ("charge", "charge"),
+    PowerDir.DISCHARGE: ("discharge", "discharge"),
+    PowerDir.NEUTRAL: (None, "stop"),
+}
+
+class SlidingMinMax:
+    """Fixed-size sliding window of samples with amortized O(1) min/max.
+
+    Keeps two monotonic deques of (index, value) instead of the samples themselves.
+    """
+
+    def __init__(self, maxlen: int) -> None:
+        self.maxlen = maxlen
+        self._next_index = 0
+        self._mins: deque[tuple[int, float]] = deque()
+        self._maxes: deque[tuple[int, float]] = deque()
+
+    def __len__(self) -> int:
+        return min(self._next_index, self.maxlen)
+
+    def append(self, value: float) -> None:
+        index = self._next_index
+        mins = self._mins
+        maxes = self._maxes
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((index, value))
+        while maxes and maxes[-1][1] <= value:
+            maxes.pop()
+        maxes.append((index, value))
+
+        self._next_index = index + 1
+        # Drop samples that fell out of the window
+        oldest = self._next_index - self.maxlen
+        while mins[0][0] < oldest:
+            mins.popleft()
+        while maxes[0][0] < oldest:
+            maxes.popleft()
+
+    def clear(self) -> None:
+        self._next_index = 0
+        self._mins.clear()
+        self._maxes.clear()
+
+    def min(self) -> float:
+        if not self._mins:
+            raise ValueError("min() of empty window")
+        return self._mins[0][1]
+
+    def max(self) -> float:
+        if not self._maxes:
+            raise ValueError("max() of empty window")
+        return self._maxes[0][1]
+
+class MovingAverage:
+    """Fixed-size ring buffer of samples with an O(1) running average."""
+
+    __slots__ = ("maxlen", "_buf", "_index", "_count", "_sum")
+
+    def __init__(self, maxlen: int) -> None:
+        self.maxlen = max(1, maxlen)
+        self._buf = [0.0] * self.maxlen
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value: float) -> None:
+        index = self._index
+        if self._count < self.maxlen:
+            self._count += 1
+            self._sum += value
+        else:
+            self._sum += value - self._buf[index]
+        self._buf[index] = value
+        index += 1
+        if index == self.maxlen:
+            index = 0
+            # Re-sum once per pass over the buffer so float rounding cannot accumulate
+            self._sum = sum(self._buf[: self._count])
+        self._index = index
+
+    def clear(self) -> None:
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+
+    @property
+    def average(self) -> float:
+        if not self._count:
+            raise ValueError("average of empty window")
+        return self._sum / self._count
+
+
 class MarstekCoordinator:
     """The main coordinator for handling battery logic."""
 
-    def _as_aware_datetime(self, value: datetime | None) -> datetime | None:
-        if value is None:
-            return None
-        if value.tzinfo is None:
-            return value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-        return value
-
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         """Initialize the coordinator."""
         self.hass = hass
         self.entry = entry
-        # Erstelle eine kombinierte Konfiguration.
-        # Beginne mit den Daten aus der Ersteinrichtung...
-        self.config = dict(entry.data)
-        # ...und überschreibe sie mit den Werten aus dem Options-Flow.
-        self.config.update(entry.options)
+        # Kombinierte Konfiguration ohne Kopie: Werte aus dem Options-Flow
+        # überschreiben die Daten aus der Ersteinrichtung.
+        self.config: Mapping[str, Any] = ChainMap(entry.options, entry.data)
         # Store for persisting settings or state if needed
         self._store = Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}_{entry.entry_id}")
         # Default Values
@@ -133,55 +277,97 @@ class MarstekCoordinator:
         # Version will be loaded asynchronously
         self._manifest_version = "unknown"
 
-        self._service_call_cache: dict[tuple[str, str, str, str], tuple[Any, datetime]] = {}
-        self._service_call_cache_ttl_seconds = self.config.get(
-            CONF_SERVICE_CALL_CACHE_SECONDS,
-            DEFAULT_SERVICE_CALL_CACHE_SECONDS,
-        )
-
-        self._pid_enabled = self.config.get(CONF_PID_ENABLED, DEFAULT_PID_ENABLED)
-        self._pid_kp = self.config.get(CONF_PID_KP, DEFAULT_PID_KP)
-        self._pid_ki = self.config.get(CONF_PID_KI, DEFAULT_PID_KI)
-        self._pid_kd = self.config.get(CONF_PID_KD, DEFAULT_PID_KD)
+        # (domain, service, entity_id, field) -> (value, time.monotonic() of the call)
+        self._service_call_cache: dict[tuple[str, str, str, str], tuple[Any, float]] = {}
+        self._last_service_call_cache_prune = -math.inf
+        # Per cache key lock held while that service call is in flight (keys are bounded per battery)
+        self._service_call_locks: dict[tuple[str, str, str, str], asyncio.Lock] = {}
+        # (domain, service) pairs seen registered; services are not expected to go away while running
+        self._available_services: set[tuple[str, str]] = set()
+        # id() of the event loop the locks above and in _battery_locks were created on
+        self._locks_loop_id: int | None = None
+        # Last (power, direction) sent per battery, used to skip unchanged writes
+        self._last_battery_setpoints: dict[str, tuple[int, int]] = {}
+        self._keepalive_index = 0
+        # Per-tick snapshot of (ac_power, soc) per battery; reset in _async_update.
+        self._tick_cache: dict[str, tuple[float | None, float | None]] | None = None
 
         self._pid_integral = 0.0
         self._pid_prev_error: float | None = None
-        self._pid_prev_ts: datetime | None = None
+        self._pid_prev_mono: float | None = None
+        # Whether the last output hit the charge/discharge limit (freezes the integrator)
+        self._pid_saturated_high = False
+        self._pid_saturated_low = False
+        # PID output applied by the last full pass; None forces the next pass (see _pid_control_step)
+        self._pid_last_output: float | None = None
+        self._pid_last_priority_ids: tuple[str, ...] = ()
         self._pid_suspended = False
         self._pid_suspend_direction: PowerDir = PowerDir.NEUTRAL
 
         self._is_running = False
         self._unsub_listeners: list[Any] = []
+        self._mono_wall_offset = time.time() - time.monotonic()
+        self._local_tz = dt_util.DEFAULT_TIME_ZONE
+
+        # Diagnostic values by key; entities subscribe to diagnostic_signal(key)
+        self._diagnostic_sources: dict[str, Callable[["MarstekCoordinator"], Any]] = {}
+        self._diagnostic_values: dict[str, Any] = {}
+        self._unsub_diagnostics_flush: Callable[[], None] | None = None
+        # Rapid switch toggles collapse into one update request
+        self._switch_refresh_debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=SWITCH_REFRESH_COOLDOWN,
+            immediate=True,
+            function=self._async_request_switch_update,
+        )
+
+        # Pending coalesced state-change request and the reason it will carry
+        self._state_change_handle: asyncio.TimerHandle | None = None
+        self._state_change_reason = ""
 
         self._instance_id = id(self)
 
         self._update_task: asyncio.Task | None = None
-        self._update_lock = asyncio.Lock()
+        self._last_update_mono = -math.inf  # time.monotonic() of the last update start
         self._last_update_start: datetime | None = None
+        # Cached result of _get_effective_update_interval and the inputs it was computed from
+        self._interval_inputs: tuple[bool, bool, Any] | None = None
+        self._effective_interval: int = DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS
 
         # State variables
-        self._power_history = deque(maxlen=self._get_deque_size("smoothing"))
-        self._battery_priority = []
-        self._last_priority_update = datetime.min
+        # Grid power smoothing window with a running sum (see _get_smoothed_grid_power)
+        self._power_history = MovingAverage(self._get_deque_size("smoothing"))
+        # Battery priority as parallel tuples (ids and their SoC), best candidate first
+        self._priority_ids: tuple[str, ...] = ()
+        self._priority_socs: tuple[float, ...] = ()
+        # (_priority_ids, its space-joined text) for the diagnostics sensor
+        self._priority_ids_joined: tuple[tuple[str, ...], str] = ((), "")
+        self._last_priority_update_mono = -math.inf
+        # _last_priority_update_mono + PRIORITY_RATE_LIMIT_SECONDS, kept in step with it
+        self._priority_rate_limit_deadline_mono = -math.inf
+        # time.monotonic() taken once at the start of each update cycle
+        self._now = time.monotonic()
         self._last_power_direction: PowerDir = PowerDir.NEUTRAL
         self._last_grid_power_raw: float | None = None
-        self._below_min_cycles_to_zero = self.config.get(CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING, 10)
+        # real_power of the last full staging pass; None forces the next pass (see _is_steady_state)
+        self._last_real_power: float | None = None
 
         
         # Wallbox state (persisted via ConfigEntry options key "wallbox_priority")
         self._wallbox_charge_paused = False
         self._wallbox_power_is_stable = False
-        self._wallbox_wait_start: datetime | None = None
-        self._wallbox_stabilization_start: datetime | None = None
-        self._wallbox_power_history = deque(maxlen=self._get_deque_size("wallbox"))
-        self._wallbox_power_gap_history = deque(maxlen=self._get_deque_size("wallbox_power_gap"))
+        self._wallbox_wait_start_mono: float | None = None
+        self._wallbox_stabilization_start_mono: float | None = None
+        self._wallbox_power_history = SlidingMinMax(self._get_deque_size("wallbox"))
+        self._wallbox_power_gap_history = SlidingMinMax(self._get_deque_size("wallbox_power_gap"))
         self._wallbox_min_power: int = 0
         self._wallbox_max_power: int = 0
         self._wallbox_power_difference: int = 0
         self._wallbox_free_power: int = 0
-        self._last_wallbox_pause_attempt = datetime.min # For 60-minute cooldown
-        self._wallbox_wait_start = None # Initialisiert: Timer für den Start-Delay
-        self._wallbox_stabilization_start = None # Initialisiert: Startzeitpunkt der Stabilisierung nach Start-Delay
+        self._last_wallbox_pause_attempt_mono = -math.inf # For 60-minute cooldown
+        self._wallbox_wait_start_mono = None # Initialisiert: Timer für den Start-Delay
+        self._wallbox_stabilization_start_mono = None # Initialisiert: Startzeitpunkt der Stabilisierung nach Start-Delay
         self._wallbox_cable_was_on = False # Trackt den vorherigen Kabelzustand
         self._last_wallbox_power = 0.0
         # CT-Mode state
@@ -192,14 +378,191 @@ class MarstekCoordinator:
         self._below_min_charge_count = 0
         self._below_min_discharge_count = 0
 
-        # Collect battery entities
-        self._battery_entities = [
-            b for b in [
+        # Collect battery entities; validated once so the control loop can trust them
+        self._battery_entities: tuple[str, ...] = tuple(
+            b for b in (
                 self.config.get(CONF_BATTERY_1_ENTITY),
                 self.config.get(CONF_BATTERY_2_ENTITY),
                 self.config.get(CONF_BATTERY_3_ENTITY),
-            ] if b
-        ]
+            ) if isinstance(b, str) and b
+        )
+        self._bat_ids = self._build_battery_entity_map(self._battery_entities)
+        # Created lazily by _get_lock on the running loop
+        self._battery_locks: dict[str, asyncio.Lock] = {}
+        # Service calls for the 'all to zero' setpoint never change, build them once per battery
+        self._zero_calls = {
+            b: self._build_power_calls(ids, 0, PowerDir.NEUTRAL) for b, ids in self._bat_ids.items()
+        }
+
+        self._reload_config()
+
+    @staticmethod
+    def _build_battery_entity_map(battery_entities: list[str]) -> dict[str, dict[str, str]]:
+        """Derive all entity ids used per battery from its base id, once."""
+        return {
+            b: {key: prefix + b + suffix for key, (prefix, suffix) in BATTERY_ENTITY_PARTS.items()}
+            for b in battery_entities
+        }
+
+    def _reload_config(self) -> None:
+        """Bind the config values used on every update cycle to attributes.
+
+        Avoids repeated dict lookups and conversions in the control loop.
+        Call again whenever self.config changes.
+        """
+        config = self.config
+        grid_power_sensor = config.get(CONF_GRID_POWER_SENSOR)
+        self._cfg_grid_power_sensor: str | None = (
+            grid_power_sensor if isinstance(grid_power_sensor, str) and grid_power_sensor else None
+        )
+        self._cfg_pv_power_sensor = config.get(CONF_PV_POWER_SENSOR)
+        try:
+            self._cfg_update_interval = max(1, int(
+                config.get(CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS, DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS)
+                or DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS
+            ))
+        except (TypeError, ValueError):
+            self._cfg_update_interval = int(DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS)
+        try:
+            self._cfg_smoothing_seconds = int(config.get(CONF_SMOOTHING_SECONDS, DEFAULT_SMOOTHING_SECONDS) or 0)
+        except (TypeError, ValueError):
+            self._cfg_smoothing_seconds = 0
+
+        # Thresholds and limits compared against every sample, coerced once here
+        try:
+            self._cfg_min_surplus = float(config.get(CONF_MIN_SURPLUS, 50))
+            self._cfg_min_consumption = float(config.get(CONF_MIN_CONSUMPTION, 50))
+        except (TypeError, ValueError):
+            self._cfg_min_surplus = float(DEFAULT_MIN_SURPLUS)
+            self._cfg_min_consumption = float(DEFAULT_MIN_CONSUMPTION)
+        try:
+            self._cfg_max_charge_power = int(config.get(CONF_MAX_CHARGE_POWER, 2500))
+            self._cfg_max_discharge_power = int(config.get(CONF_MAX_DISCHARGE_POWER, 2500))
+        except (TypeError, ValueError):
+            self._cfg_max_charge_power = int(DEFAULT_MAX_CHARGE_POWER)
+            self._cfg_max_discharge_power = int(DEFAULT_MAX_DISCHARGE_POWER)
+        try:
+            self._cfg_min_soc = float(config.get(CONF_MIN_SOC, DEFAULT_MIN_SOC) or DEFAULT_MIN_SOC)
+        except (TypeError, ValueError):
+            self._cfg_min_soc = float(DEFAULT_MIN_SOC)
+        try:
+            self._cfg_max_soc = float(config.get(CONF_MAX_SOC, DEFAULT_MAX_SOC) or DEFAULT_MAX_SOC)
+        except (TypeError, ValueError):
+            self._cfg_max_soc = float(DEFAULT_MAX_SOC)
+
+        try:
+            self._cfg_stage_offset = float(config.get(CONF_POWER_STAGE_OFFSET, 50) or 0)
+        except (TypeError, ValueError):
+            self._cfg_stage_offset = 50.0
+        # Load change still treated as steady (see _is_steady_state)
+        self._steady_state_tolerance = 0.1 * max(self._cfg_stage_offset, self._cfg_min_surplus, self._cfg_min_consumption)
+        self._cfg_stage_charge_1 = config.get(CONF_POWER_STAGE_CHARGE_1)
+        self._cfg_stage_charge_2 = config.get(CONF_POWER_STAGE_CHARGE_2)
+        self._cfg_stage_discharge_1 = config.get(CONF_POWER_STAGE_DISCHARGE_1)
+        self._cfg_stage_discharge_2 = config.get(CONF_POWER_STAGE_DISCHARGE_2)
+        # Hysteresis thresholds (up1, up2, down1, down2) per direction, keyed by "is discharging".
+        # A missing stage falls back to its default, as in the config flow.
+        self._stage_thresholds = {
+            False: self._build_stage_thresholds(
+                self._cfg_stage_charge_1,
+                self._cfg_stage_charge_2,
+                DEFAULT_POWER_STAGE_CHARGE_1,
+                DEFAULT_POWER_STAGE_CHARGE_2,
+            ),
+            True: self._build_stage_thresholds(
+                self._cfg_stage_discharge_1,
+                self._cfg_stage_discharge_2,
+                DEFAULT_POWER_STAGE_DISCHARGE_1,
+                DEFAULT_POWER_STAGE_DISCHARGE_2,
+            ),
+        }
+
+        # Per-battery caps by SoC level (see _distribute_power)
+        try:
+            self._cfg_charge_levels = [
+                int(config.get(CONF_CHARGE_POWER_LEVEL_1, DEFAULT_CHARGE_POWER_LEVEL_1)),
+                int(config.get(CONF_CHARGE_POWER_LEVEL_2, DEFAULT_CHARGE_POWER_LEVEL_2)),
+                int(config.get(CONF_CHARGE_POWER_LEVEL_3, DEFAULT_CHARGE_POWER_LEVEL_3)),
+                int(config.get(CONF_CHARGE_POWER_LEVEL_4, DEFAULT_CHARGE_POWER_LEVEL_4)),
+                int(config.get(CONF_CHARGE_POWER_LEVEL_5, DEFAULT_CHARGE_POWER_LEVEL_5)),
+            ]
+            self._cfg_discharge_levels = [
+                int(config.get(CONF_DISCHARGE_POWER_LEVEL_1, DEFAULT_DISCHARGE_POWER_LEVEL_1)),
+                int(config.get(CONF_DISCHARGE_POWER_LEVEL_2, DEFAULT_DISCHARGE_POWER_LEVEL_2)),
+                int(config.get(CONF_DISCHARGE_POWER_LEVEL_3, DEFAULT_DISCHARGE_POWER_LEVEL_3)),
+                int(config.get(CONF_DISCHARGE_POWER_LEVEL_4, DEFAULT_DISCHARGE_POWER_LEVEL_4)),
+                int(config.get(CONF_DISCHARGE_POWER_LEVEL_5, DEFAULT_DISCHARGE_POWER_LEVEL_5)),
+            ]
+        except (TypeError, ValueError):
+            self._cfg_charge_levels = [DEFAULT_CHARGE_POWER_LEVEL_1, DEFAULT_CHARGE_POWER_LEVEL_2, DEFAULT_CHARGE_POWER_LEVEL_3, DEFAULT_CHARGE_POWER_LEVEL_4, DEFAULT_CHARGE_POWER_LEVEL_5]
+            self._cfg_discharge_levels = [DEFAULT_DISCHARGE_POWER_LEVEL_1, DEFAULT_DISCHARGE_POWER_LEVEL_2, DEFAULT_DISCHARGE_POWER_LEVEL_3, DEFAULT_DISCHARGE_POWER_LEVEL_4, DEFAULT_DISCHARGE_POWER_LEVEL_5]
+
+        try:
+            priority_minutes = float(config.get(CONF_PRIORITY_INTERVAL, DEFAULT_PRIORITY_INTERVAL) or DEFAULT_PRIORITY_INTERVAL)
+        except (TypeError, ValueError):
+            priority_minutes = float(DEFAULT_PRIORITY_INTERVAL)
+        self._cfg_priority_interval_seconds = priority_minutes * 60.0
+
+        self._cfg_wallbox_power_sensor = config.get(CONF_WALLBOX_POWER_SENSOR)
+        self._cfg_wallbox_cable_sensor = config.get(CONF_WALLBOX_CABLE_SENSOR)
+        # None (or invalid) max surplus disables the wallbox logic
+        try:
+            self._cfg_wallbox_max_surplus = float(config[CONF_WALLBOX_MAX_SURPLUS])
+        except (KeyError, TypeError, ValueError):
+            self._cfg_wallbox_max_surplus = None
+        try:
+            self._cfg_wallbox_stability_threshold = float(
+                config.get(CONF_WALLBOX_POWER_STABILITY_THRESHOLD) or DEFAULT_WALLBOX_POWER_STABILITY_THRESHOLD
+            )
+        except (TypeError, ValueError):
+            self._cfg_wallbox_stability_threshold = float(DEFAULT_WALLBOX_POWER_STABILITY_THRESHOLD)
+        self._cfg_wallbox_stability_min_power_gap = config.get(CONF_WALLBOX_STABILITY_MIN_POWER_GAP, DEFAULT_WALLBOX_STABILITY_MIN_POWER_GAP)
+        try:
+            self._cfg_wallbox_start_delay = int(config.get(CONF_WALLBOX_START_DELAY_SECONDS, DEFAULT_WALLBOX_START_DELAY_SECONDS) or 0)
+        except (TypeError, ValueError):
+            self._cfg_wallbox_start_delay = int(DEFAULT_WALLBOX_START_DELAY_SECONDS)
+        try:
+            self._cfg_wallbox_retry_seconds = int(config.get(CONF_WALLBOX_RETRY_MINUTES, 60)) * 60
+        except (TypeError, ValueError):
+            self._cfg_wallbox_retry_seconds = 60 * 60
+        wallbox_enabled = bool(
+            self._cfg_wallbox_power_sensor
+            and self._cfg_wallbox_cable_sensor
+            and self._cfg_wallbox_max_surplus is not None
+        )
+        if wallbox_enabled != getattr(self, "_wallbox_enabled", None):
+            if not wallbox_enabled:
+                _LOGGER.debug("Wallbox configuration incomplete. Wallbox logic disabled.")
+                self._wallbox_charge_paused = False
+                self._wallbox_cable_was_on = False
+        self._wallbox_enabled = wallbox_enabled
+        # W per sensor unit; resolved from the sensor's unit_of_measurement on first read.
+        self._wb_unit_scale: float | None = None
+        self._pv_unit_scale: float | None = None
+
+        try:
+            ttl = int(config.get(CONF_SERVICE_CALL_CACHE_SECONDS, DEFAULT_SERVICE_CALL_CACHE_SECONDS))
+        except (TypeError, ValueError):
+            ttl = int(DEFAULT_SERVICE_CALL_CACHE_SECONDS)
+        self._service_call_cache_ttl_seconds = float(max(0, ttl))
+        self._below_min_cycles_to_zero = config.get(CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING, 10)
+
+        self._pid_enabled = config.get(CONF_PID_ENABLED, DEFAULT_PID_ENABLED)
+        try:
+            self._pid_kp = float(config.get(CONF_PID_KP, DEFAULT_PID_KP))
+            self._pid_ki = float(config.get(CONF_PID_KI, DEFAULT_PID_KI))
+            self._pid_kd = float(config.get(CONF_PID_KD, DEFAULT_PID_KD))
+        except (TypeError, ValueError):
+            self._pid_kp = float(DEFAULT_PID_KP)
+            self._pid_ki = float(DEFAULT_PID_KI)
+            self._pid_kd = float(DEFAULT_PID_KD)
+        self._pid_reset_on_zero_crossing = config.get(
+            CONF_PID_RESET_ON_ZERO_CROSSING, DEFAULT_PID_RESET_ON_ZERO_CROSSING
+        )
+        try:
+            self._pid_deadband = max(0.0, float(config.get(CONF_PID_DEADBAND, DEFAULT_PID_DEADBAND)))
+        except (TypeError, ValueError):
+            self._pid_deadband = float(DEFAULT_PID_DEADBAND)
     
     async def async_load_settings(self) -> None:
         """Fetch settings from the Store helper."""
@@ -283,6 +646,12 @@ class MarstekCoordinator:
         samples = max(1, (seconds_int + interval_seconds - 1) // interval_seconds)
         return samples
 
+    def _mono_to_datetime(self, value: float | None) -> datetime | None:
+        """Convert a time.monotonic() timestamp to a wall-clock datetime for display."""
+        if value is None or value == -math.inf:
+            return None
+        return datetime.now(self._local_tz) - timedelta(seconds=time.monotonic() - value)
+
     @property
     def is_running(self) -> bool:
         return self._is_running
@@ -316,7 +685,7 @@ class MarstekCoordinator:
 
     @property
     def last_update_start(self) -> datetime | None:
-        return self._as_aware_datetime(self._last_update_start)
+        return self._last_update_start
 
     @property
     def service_call_cache_size(self) -> int:
@@ -363,7 +732,7 @@ class MarstekCoordinator:
 
     @property
     def wallbox_wait_start(self) -> datetime | None:
-        return self._as_aware_datetime(self._wallbox_wait_start)
+        return self._mono_to_datetime(self._wallbox_wait_start_mono)
 
     @property
     def wallbox_stabilization_start_iso(self) -> str | None:
@@ -374,21 +743,19 @@ class MarstekCoordinator:
 
     @property
     def wallbox_stabilization_start(self) -> datetime | None:
-        return self._as_aware_datetime(self._wallbox_stabilization_start)
+        return self._mono_to_datetime(self._wallbox_stabilization_start_mono)
 
     @property
     def battery_priority_ids(self) -> str:
-        try:
-            return " ".join(str(b.get("id")) for b in self._battery_priority if isinstance(b, dict))
-        except Exception:
-            return ""
+        # Joined again only when _priority_ids was replaced by a new tuple
+        ids = self._priority_ids
+        if ids is not self._priority_ids_joined[0]:
+            self._priority_ids_joined = (ids, " ".join(ids))
+        return self._priority_ids_joined[1]
 
     @property
     def last_power_direction_name(self) -> str:
-        try:
-            return PowerDir(self._last_power_direction).name
-        except Exception:
-            return str(self._last_power_direction)
+        return self._last_power_direction.name
 
     @property
     def below_min_charge_count(self) -> int:
@@ -412,106 +779,42 @@ class MarstekCoordinator:
 
     @property
     def wallbox_cooldown_end_iso(self) -> str | None:
-        try:
-            if self._last_wallbox_pause_attempt == datetime.min:
-                return None
-            retry_minutes = self.config.get(CONF_WALLBOX_RETRY_MINUTES, 60)
-            retry_seconds = int(retry_minutes) * 60
-            end = self._last_wallbox_pause_attempt + timedelta(seconds=retry_seconds)
-            end_dt = self._as_aware_datetime(end)
-            return None if end_dt is None else end_dt.isoformat()
-        except Exception:
-            return None
+        return _isoformat(self.wallbox_cooldown_end)
 
     @property
     def wallbox_cooldown_end(self) -> datetime | None:
-        try:
-            if self._last_wallbox_pause_attempt == datetime.min:
-                return None
-            retry_minutes = self.config.get(CONF_WALLBOX_RETRY_MINUTES, 60)
-            retry_seconds = int(retry_minutes) * 60
-            end = self._last_wallbox_pause_attempt + timedelta(seconds=retry_seconds)
-            return self._as_aware_datetime(end)
-        except Exception:
-            return None
+        # -inf (no pause attempt yet) stays -inf and maps to None
+        return self._mono_to_datetime(self._last_wallbox_pause_attempt_mono + self._cfg_wallbox_retry_seconds)
 
     @property
     def wallbox_start_delay_end_iso(self) -> str | None:
-        try:
-            if self._wallbox_wait_start is None:
-                return None
-            start_delay = int(self.config.get(CONF_WALLBOX_START_DELAY_SECONDS, 0))
-            end = self._wallbox_wait_start + timedelta(seconds=start_delay)
-            end_dt = self._as_aware_datetime(end)
-            return None if end_dt is None else end_dt.isoformat()
-        except Exception:
-            return None
+        return _isoformat(self.wallbox_start_delay_end)
 
     @property
     def wallbox_start_delay_end(self) -> datetime | None:
-        try:
-            if self._wallbox_wait_start is None:
-                return None
-            start_delay = int(self.config.get(CONF_WALLBOX_START_DELAY_SECONDS, 0))
-            end = self._wallbox_wait_start + timedelta(seconds=start_delay)
-            return self._as_aware_datetime(end)
-        except Exception:
+        if self._wallbox_wait_start_mono is None:
             return None
+        return self._mono_to_datetime(self._wallbox_wait_start_mono + self._cfg_wallbox_start_delay)
 
     @property
     def priority_next_update_iso(self) -> str | None:
-        try:
-            if self._last_priority_update == datetime.min:
-                return None
-            minutes = self.config.get(CONF_PRIORITY_INTERVAL)
-            interval_minutes = int(minutes) if minutes is not None else 0
-            end = self._last_priority_update + timedelta(minutes=interval_minutes)
-            end_dt = self._as_aware_datetime(end)
-            return None if end_dt is None else end_dt.isoformat()
-        except Exception:
-            return None
+        return _isoformat(self.priority_next_update)
 
     @property
     def priority_next_update(self) -> datetime | None:
-        try:
-            if self._last_priority_update == datetime.min:
-                return None
-            minutes = self.config.get(CONF_PRIORITY_INTERVAL)
-            interval_minutes = int(minutes) if minutes is not None else 0
-            end = self._last_priority_update + timedelta(minutes=interval_minutes)
-            return self._as_aware_datetime(end)
-        except Exception:
-            return None
+        return self._mono_to_datetime(self._last_priority_update_mono + self._cfg_priority_interval_seconds)
 
     @property
     def priority_rate_limit_end_iso(self) -> str | None:
-        try:
-            if self._last_priority_update == datetime.min:
-                return None
-            end = self._last_priority_update + timedelta(seconds=10)
-            end_dt = self._as_aware_datetime(end)
-            return None if end_dt is None else end_dt.isoformat()
-        except Exception:
-            return None
+        return _isoformat(self.priority_rate_limit_end)
 
     @property
     def priority_rate_limit_end(self) -> datetime | None:
-        try:
-            if self._last_priority_update == datetime.min:
-                return None
-            end = self._last_priority_update + timedelta(seconds=10)
-            return self._as_aware_datetime(end)
-        except Exception:
-            return None
+        return self._mono_to_datetime(self._priority_rate_limit_deadline_mono)
 
-    def _get_service_call_cache_ttl(self) -> timedelta:
-        try:
-            seconds = int(self._service_call_cache_ttl_seconds)
-        except (ValueError, TypeError):
-            seconds = int(DEFAULT_SERVICE_CALL_CACHE_SECONDS)
-        if seconds <= 0:
-            return timedelta(seconds=0)
-        return timedelta(seconds=seconds)
+    def _get_service_call_cache_ttl(self) -> float:
+        """Cache TTL in seconds; 0 means cached values never expire."""
+        return self._service_call_cache_ttl_seconds
 
     async def _async_call_cached(
         self,
@@ -524,52 +827,100 @@ class MarstekCoordinator:
         *,
         blocking: bool = True,
         force: bool = False,
-    ) -> None:
-        ttl = self._get_service_call_cache_ttl()
-        now = datetime.now()
-        cache_key = (domain, service, entity_id, cache_field)
+        raise_on_timeout: bool = False,
+    ) -> bool:
+        """Call a service unless the same value was sent recently.
 
-        if not force:
-            cached = self._service_call_cache.get(cache_key)
-            if cached is not None:
-                last_value, last_ts = cached
-                is_same_value = last_value == cache_value
-                is_expired = ttl.total_seconds() > 0 and (now - last_ts) > ttl
-                if is_same_value and not is_expired:
-                    return
+        Returns False if the call could not be made or failed, True otherwise
+        (including when it was skipped because of the cache). With raise_on_timeout,
+        a timed out call raises asyncio.TimeoutError instead so the caller can retry it.
+        """
+        cache_key = (domain, service, entity_id, cache_field)
+        if not force and self._is_call_cached(cache_key, cache_value):
+            return True
 
-        if not self.hass.services.has_service(domain, service):
-            _LOGGER.warning(
-                "Service %s.%s not available. Skipping call for %s",
-                domain,
-                service,
-                entity_id,
-            )
-            return
+        if (domain, service) not in self._available_services:
+            if not self.hass.services.has_service(domain, service):
+                _LOGGER.warning(
+                    "Service %s.%s not available. Skipping call for %s",
+                    domain,
+                    service,
+                    entity_id,
+                )
+                return False
+            self._available_services.add((domain, service))
+
+        # One call per key in flight; a concurrent caller waits and then usually hits the cache
+        async with self._get_lock(self._service_call_locks, cache_key):
+            if not force and self._is_call_cached(cache_key, cache_value):
+                return True
+            now = time.monotonic()
+            try:
+                await asyncio.wait_for(
+                    self.hass.services.async_call(domain, service, service_data, blocking=blocking),
+                    timeout=15.0,
+                )
+            except asyncio.TimeoutError:
+                _LOGGER.warning(
+                    "Service call %s.%s timed out for %s",
+                    domain,
+                    service,
+                    entity_id,
+                )
+                if raise_on_timeout:
+                    raise
+                return False
+            except Exception as err:
+                _LOGGER.warning(
+                    "Service call %s.%s failed for %s: %s",
+                    domain,
+                    service,
+                    entity_id,
+                    err,
+                )
+                return False
+            # Re-insert so the cache stays ordered by call time (oldest first), see _prune_service_call_cache
+            self._service_call_cache.pop(cache_key, None)
+            self._service_call_cache[cache_key] = (cache_value, now)
+        return True
+
+    def _is_call_cached(self, cache_key: tuple[str, str, str, str], cache_value: Any) -> bool:
+        """Return True if cache_value was sent for cache_key and has not expired."""
+        cached = self._service_call_cache.get(cache_key)
+        if cached is None:
+            return False
+        last_value, last_ts = cached
+        if last_value != cache_value:
+            return False
+        ttl = self._get_service_call_cache_ttl()
+        return ttl <= 0 or (time.monotonic() - last_ts) <= ttl
 
-        try:
-            await asyncio.wait_for(
-                self.hass.services.async_call(domain, service, service_data, blocking=blocking),
-                timeout=15.0,
-            )
-        except asyncio.TimeoutError:
-            _LOGGER.warning(
-                "Service call %s.%s timed out for %s",
-                domain,
-                service,
-                entity_id,
-            )
-            return
-        except Exception as err:
-            _LOGGER.warning(
-                "Service call %s.%s failed for %s: %s",
-                domain,
-                service,
-                entity_id,
-                err,
-            )
+    def _prune_service_call_cache(self, now: float) -> None:
+        """Drop expired cache entries, at most once per TTL period."""
+        ttl = self._get_service_call_cache_ttl()
+        if ttl <= 0 or now - self._last_service_call_cache_prune < ttl:
             return
-        self._service_call_cache[cache_key] = (cache_value, now)
+        self._last_service_call_cache_prune = now
+        cache = self._service_call_cache
+        expired = []
+        for key, (_value, ts) in cache.items():
+            if now - ts <= ttl:
+                break
+            expired.append(key)
+        for key in expired:
+            del cache[key]
+
+    def _get_lock(self, locks: dict[Any, asyncio.Lock], key: Any) -> asyncio.Lock:
+        """Return the lock for key, dropping all locks created on a previous event loop."""
+        loop_id = id(asyncio.get_running_loop())
+        if loop_id != self._locks_loop_id:
+            self._service_call_locks.clear()
+            self._battery_locks.clear()
+            self._locks_loop_id = loop_id
+        lock = locks.get(key)
+        if lock is None:
+            lock = locks[key] = asyncio.Lock()
+        return lock
 
     async def wait_for_entity_available(self, entity_id, timeout=10):
         """Wait until the entity is available or timeout."""
@@ -577,22 +928,21 @@ class MarstekCoordinator:
         if not entity_id:
             _LOGGER.warning("wait_for_entity_available called with empty entity_id.")
             return
-        wait_event = asyncio.Event()
-    
-        def _listener(event):
-            new_state = event.data.get("new_state")
-            if new_state and new_state.state not in ("unavailable", "unknown"):
-                wait_event.set()
-    
+
         # Check if already available
-        state = self.hass.states.get(entity_id)
-        if state and state.state not in ("unavailable", "unknown"):
+        if _is_available(self.hass.states.get(entity_id)):
             return
-    
+
+        available = self.hass.loop.create_future()
+
+        def _listener(event):
+            if not available.done() and _is_available(event.data.get("new_state")):
+                available.set_result(None)
+
         remove = async_track_state_change_event(self.hass, [entity_id], _listener)
 
         try:
-            await asyncio.wait_for(wait_event.wait(), timeout=timeout)
+            await asyncio.wait_for(available, timeout=timeout)
         except asyncio.TimeoutError:
             pass
         finally:
@@ -609,21 +959,13 @@ class MarstekCoordinator:
         self._pid_suspended = False
         self._pid_suspend_direction = PowerDir.NEUTRAL
 
-        # Wait concurrently for configured entities (avoids additive timeouts)
-        wait_entities = []
-        grid_power_sensor = self.config.get(CONF_GRID_POWER_SENSOR)
-        if grid_power_sensor:
-            wait_entities.append(grid_power_sensor)
-
-        for key in (CONF_BATTERY_1_ENTITY, CONF_BATTERY_2_ENTITY, CONF_BATTERY_3_ENTITY):
-            ent = self.config.get(key)
-            if ent:
-                wait_entities.append(ent)
-
-        wallbox_cable_sensor = self.config.get(CONF_WALLBOX_CABLE_SENSOR)
-        if wallbox_cable_sensor:
-            wait_entities.append(wallbox_cable_sensor)
-
+        # Wait concurrently for configured entities (avoids additive timeouts).
+        # Usually all entities are up already; only subscribe for the ones that are not.
+        wait_entities = [
+            e
+            for e in (self._cfg_grid_power_sensor, *self._battery_entities, self._cfg_wallbox_cable_sensor)
+            if e and not _is_available(self.hass.states.get(e))
+        ]
         if wait_entities:
             # run all waits in parallel; total wait <= max individual timeout (default 60s)
             await asyncio.gather(*(self.wait_for_entity_available(e) for e in wait_entities))
@@ -631,23 +973,28 @@ class MarstekCoordinator:
             
         if not self._is_running:
             self._service_call_cache.clear()
-            _LOGGER.debug(f"Running version {self._manifest_version}")
+            self._last_battery_setpoints.clear()
+            self._last_real_power = None
+            _LOGGER.debug("Running version %s", self._manifest_version)
             _LOGGER.debug("Service call cache cleared on coordinator start")
             self._below_min_charge_count = 0
             self._below_min_discharge_count = 0
             # Re-initialize deques on start
-            self._power_history = deque(maxlen=self._get_deque_size("smoothing"))
-            self._wallbox_power_history = deque(maxlen=self._get_deque_size("wallbox"))
-            self._last_wallbox_pause_attempt = datetime.min # Reset cooldown on start
+            self._power_history = MovingAverage(self._get_deque_size("smoothing"))
+            self._wallbox_power_history = SlidingMinMax(self._get_deque_size("wallbox"))
+            self._last_wallbox_pause_attempt_mono = -math.inf # Reset cooldown on start
             #Reset Batteries to 0 on Start-Up in background to avoid blocking startup
-            self.hass.async_create_task(self._set_all_batteries_to_zero())            
-            coordinator_update_interval = self.config.get(CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS)
+            self.hass.async_create_task(self._set_all_batteries_to_zero())
             # CT-Mode: Disable RS485 control mode (use automatic mode)
             if self._ct_mode:
                 _LOGGER.info("CT-Mode enabled. Disabling RS485 Modbus control mode (setting batteries to automatic).")
-                for battery_base_id in self._battery_entities:
-                    modbus_control_mode = f"switch.{battery_base_id}_modbus_rs485_control_mode"
-                    await self.hass.services.async_call("switch", "turn_off", {"entity_id": modbus_control_mode}, blocking=True)
+                # One blocking call per battery, sent concurrently
+                await asyncio.gather(
+                    *(
+                        self.hass.services.async_call("switch", "turn_off", {"entity_id": ids["ctrl"]}, blocking=True)
+                        for ids in self._bat_ids.values()
+                    )
+                )
             else:
                 _LOGGER.info("CT-Mode disabled. Batteries remain in manual/forcible mode.")
 
@@ -657,44 +1004,84 @@ class MarstekCoordinator:
                 coordinator_update_interval,
             )
 
-            # Subscribe to relevant sensor updates (grid power, PV power, wallbox cable).
-            trigger_entities: list[str] = []
-
-            grid_power_sensor = self.config.get(CONF_GRID_POWER_SENSOR)
-            if grid_power_sensor:
-                trigger_entities.append(grid_power_sensor)
-
-            pv_power_sensor = self.config.get(CONF_PV_POWER_SENSOR)
-            if pv_power_sensor:
-                trigger_entities.append(pv_power_sensor)
-
-            wb_cable_sensor = self.config.get(CONF_WALLBOX_CABLE_SENSOR)
-            if wb_cable_sensor:
-                trigger_entities.append(wb_cable_sensor)
+            # Subscribe to relevant sensor updates (grid power, PV power, wallbox power/cable).
+            trigger_entities: list[str] = [
+                e
+                for e in (
+                    self._cfg_grid_power_sensor,
+                    self._cfg_pv_power_sensor,
+                    self._cfg_wallbox_power_sensor,
+                    self._cfg_wallbox_cable_sensor,
+                )
+                if e
+            ]
 
             @callback
             def _on_state_change(event):
                 entity_id = event.data.get("entity_id")
+                old_state = event.data.get("old_state")
+                new_state = event.data.get("new_state")
+                # Attribute-only updates do not change any input of the control loop. HA keeps
+                # last_changed for those only; a repeated force_update reading moves it as well.
+                if (
+                    old_state is not None
+                    and new_state is not None
+                    and new_state.last_changed != new_state.last_updated
+                ):
+                    return
 
-                def _schedule_update() -> None:
-                    self.hass.async_create_task(
-                        self.async_request_update(reason=f"state_change:{entity_id}")
-                    )
-
-                # Home Assistant may execute state-change callbacks from a non-event-loop thread.
-                # Always schedule the task in a thread-safe way.
-                self.hass.loop.call_soon_threadsafe(_schedule_update)
+                reason = f"state_change:{entity_id}"
+                try:
+                    running_loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    running_loop = None
+                # Normally called on the event loop; only hop threads if HA ever calls us from elsewhere.
+                if running_loop is self.hass.loop:
+                    self._coalesce_state_change(reason)
+                else:
+                    self.hass.loop.call_soon_threadsafe(self._coalesce_state_change, reason)
 
             if trigger_entities:
                 remove = async_track_state_change_event(self.hass, trigger_entities, _on_state_change)
                 self._unsub_listeners.append(remove)
 
+            # Safety tick in case the sensors stop reporting changes (e.g. a constant grid value).
+            @callback
+            def _on_safety_tick(now):
+                self.hass.async_create_task(self.async_request_update(reason="safety_tick"))
+
+            self._unsub_listeners.append(
+                async_track_time_interval(self.hass, _on_safety_tick, SAFETY_UPDATE_INTERVAL)
+            )
+
             # Run one initial update after startup.
             self.hass.async_create_task(self.async_request_update(reason="startup"))
 
             self._is_running = True
+            self.async_dispatch_diagnostics(force=True)
             _LOGGER.info("Marstek Venus HA Integration coordinator started (id=%s).", self._instance_id)
 
+    @callback
+    def _coalesce_state_change(self, reason: str) -> None:
+        """Collect a burst of sensor changes into a single update request."""
+        self._state_change_reason = reason
+        if self._state_change_handle is None:
+            self._state_change_handle = self.hass.loop.call_later(
+                STATE_CHANGE_COALESCE_DELAY, self._flush_state_change
+            )
+
+    @callback
+    def _flush_state_change(self) -> None:
+        self._state_change_handle = None
+        self.hass.async_create_task(self.async_request_update(reason=self._state_change_reason))
+
+    async def async_request_switch_update(self) -> None:
+        """Request an update after a switch toggle; rapid toggles are coalesced."""
+        await self._switch_refresh_debouncer.async_call()
+
+    async def _async_request_switch_update(self) -> None:
+        await self.async_request_update(reason="switch_toggle")
+
     async def async_request_update(self, *, reason: str = "manual") -> None:
         """Request a coordinator update.
 
@@ -704,29 +1091,30 @@ class MarstekCoordinator:
         if not self._is_running:
             return
 
-        min_interval = float(self._get_effective_update_interval())
+        if not reason.startswith("state_change:"):
+            # Toggles, services and the safety tick always get a full control pass.
+            self._last_real_power = None
+            self._pid_last_output = None
 
-        async with self._update_lock:
-            now = datetime.now()
-            if self._last_update_start is not None:
-                elapsed = (now - self._last_update_start).total_seconds()
-                if elapsed < min_interval:
-                    delay = min_interval - elapsed
-                    if self._update_task is not None and not self._update_task.done():
-                        return
-                    self._update_task = self.hass.async_create_task(self._delayed_update(delay, reason))
-                    return
+        min_interval = float(self._get_effective_update_interval())
 
-            if self._update_task is not None and not self._update_task.done():
-                return
-            self._update_task = self.hass.async_create_task(self._run_update(reason))
+        # Runs only on the event loop, so check-then-schedule needs no lock
+        if self._update_task is not None and not self._update_task.done():
+            return
+        elapsed = time.monotonic() - self._last_update_mono
+        if elapsed < min_interval:
+            self._update_task = self.hass.async_create_task(self._delayed_update(min_interval - elapsed, reason))
+            return
+        self._update_task = self.hass.async_create_task(self._run_update(reason))
 
     async def _delayed_update(self, delay: float, reason: str) -> None:
         await asyncio.sleep(max(0.0, delay))
         await self._run_update(reason)
 
     async def _run_update(self, reason: str) -> None:
-        self._last_update_start = datetime.now()
+        # One clock read; shown on the same timeline as the other monotonic diagnostics
+        self._last_update_mono = time.monotonic()
+        self._last_update_start = datetime.fromtimestamp(self._last_update_mono + self._mono_wall_offset, self._local_tz)
         _LOGGER.debug("Coordinator update triggered (%s).", reason)
         try:
             await asyncio.wait_for(self._async_update(), timeout=60.0)
@@ -735,7 +1123,45 @@ class MarstekCoordinator:
         except Exception as err:
             _LOGGER.exception("Coordinator update failed (%s): %s", reason, err)
         finally:
-            async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
+            self.async_dispatch_diagnostics()
+
+    def diagnostic_signal(self, key: str) -> str:
+        """Dispatcher signal for a single diagnostic value of this entry."""
+        return f"{SIGNAL_DIAGNOSTICS_UPDATED}_{self.entry.entry_id}_{key}"
+
+    def register_diagnostic(self, key: str, value_fn: Callable[["MarstekCoordinator"], Any]) -> None:
+        """Register how to read the diagnostic value published under key."""
+        self._diagnostic_sources[key] = value_fn
+
+    def diagnostic_value(self, key: str) -> Any:
+        """Return the value last sent for a diagnostic key."""
+        return self._diagnostic_values.get(key)
+
+    @callback
+    def async_schedule_diagnostics(self) -> None:
+        """Dispatch changed diagnostics after a short delay, coalescing bursts of changes."""
+        if self._unsub_diagnostics_flush is not None:
+            return
+
+        @callback
+        def _flush(_now: Any) -> None:
+            self._unsub_diagnostics_flush = None
+            self.async_dispatch_diagnostics()
+
+        self._unsub_diagnostics_flush = async_call_later(self.hass, DIAGNOSTICS_BATCH_DELAY, _flush)
+
+    @callback
+    def async_dispatch_diagnostics(self, *, force: bool = False) -> None:
+        """Signal only the diagnostic keys whose value changed (all keys with force)."""
+        last_values = self._diagnostic_values
+        for key, value_fn in self._diagnostic_sources.items():
+            try:
+                value = value_fn(self)
+            except Exception:
+                value = None
+            if force or key not in last_values or last_values[key] != value:
+                last_values[key] = value
+                async_dispatcher_send(self.hass, self.diagnostic_signal(key))
 
     async def async_stop_listening(self):
         """Stop the coordinator's update loop."""
@@ -750,22 +1176,70 @@ class MarstekCoordinator:
             self._update_task.cancel()
         self._update_task = None
         self._is_running = False
+        self._switch_refresh_debouncer.async_cancel()
+        if self._state_change_handle is not None:
+            self._state_change_handle.cancel()
+            self._state_change_handle = None
+        if self._unsub_diagnostics_flush is not None:
+            self._unsub_diagnostics_flush()
+            self._unsub_diagnostics_flush = None
+        self.async_dispatch_diagnostics(force=True)
         await self._set_all_batteries_to_zero()
         _LOGGER.info("Marstek Venus HA Integration coordinator stopped (id=%s).", self._instance_id)
 
+    def async_update_options(self, options: Mapping[str, Any]) -> bool:
+        """Apply changed options to the running coordinator.
+
+        Returns False if a changed option needs a full reload (see RELOAD_REQUIRED_KEYS).
+        """
+        config = ChainMap(options, self.entry.data)
+        if any(config.get(key) != self.config.get(key) for key in RELOAD_REQUIRED_KEYS):
+            return False
+
+        self.config = config
+        self._reload_config()
+        self._reset_pid_state()
+
+        # Window sizes depend on the configured seconds and update interval
+        size = self._get_deque_size("smoothing")
+        if size != self._power_history.maxlen:
+            self._power_history = MovingAverage(size)
+        elif self._cfg_smoothing_seconds <= 0:
+            self._power_history.clear()  # Drop stale samples so re-enabling starts fresh
+        size = self._get_deque_size("wallbox")
+        if size != self._wallbox_power_history.maxlen:
+            self._wallbox_power_history = SlidingMinMax(size)
+        size = self._get_deque_size("wallbox_power_gap")
+        if size != self._wallbox_power_gap_history.maxlen:
+            self._wallbox_power_gap_history = SlidingMinMax(size)
+
+        # New limits and thresholds: force a full staging pass with fresh service calls
+        self._service_call_cache.clear()
+        self._last_real_power = None
+        self._priority_ids = ()
+        self._last_priority_update_mono = -math.inf
+        self._priority_rate_limit_deadline_mono = -math.inf
+        if self._is_running:
+            self.hass.async_create_task(self.async_request_update(reason="options_updated"))
+        self.async_dispatch_diagnostics()
+        return True
+
     def _get_entity_state(self, entity_id: str) -> State | None:
         """Safely get the state of an entity."""
         if not entity_id:
             return None
         state = self.hass.states.get(entity_id)
         if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
-            _LOGGER.warning(f"Entity '{entity_id}' is unavailable or unknown.")
+            _LOGGER.warning("Entity '%s' is unavailable or unknown.", entity_id)
             return None
         return state
 
     async def _async_update(self, now=None):
         """Fetch new data and run the logic."""
         # Note: logging is handled by _run_update to include a reason.
+        self._tick_cache = None
+        self._now = time.monotonic()
+        self._prune_service_call_cache(self._now)
 
         # Net grid power (import/export). This is the signal PID should drive towards 0W.
         smoothed_grid_power = self._get_smoothed_grid_power()
@@ -785,25 +1259,27 @@ class MarstekCoordinator:
         if wallbox_took_control:
             _LOGGER.info("Wallbox logic took control. Ending update cycle.")
             self._pid_prev_error = None
-            self._pid_prev_ts = None
+            self._pid_prev_mono = None
+            self._last_real_power = None
+            self._pid_last_output = None
             return
 
         if not self._ct_mode and self._pid_enabled:
             if self._pid_suspended:
-                min_surplus_for_charging = self.config.get(CONF_MIN_SURPLUS, 50)
-                min_consumption_for_discharging = self.config.get(CONF_MIN_CONSUMPTION, 50)
+                min_surplus_for_charging = self._cfg_min_surplus
+                min_consumption_for_discharging = self._cfg_min_consumption
 
                 should_resume = False
                 if self._pid_suspend_direction == PowerDir.CHARGE:
-                    should_resume = real_power < -float(min_surplus_for_charging)
+                    should_resume = real_power < -min_surplus_for_charging
                 elif self._pid_suspend_direction == PowerDir.DISCHARGE:
-                    should_resume = real_power > float(min_consumption_for_discharging)
+                    should_resume = real_power > min_consumption_for_discharging
 
                 opposite_direction_valid = False
                 if self._pid_suspend_direction == PowerDir.CHARGE:
-                    opposite_direction_valid = real_power > float(min_consumption_for_discharging)
+                    opposite_direction_valid = real_power > min_consumption_for_discharging
                 elif self._pid_suspend_direction == PowerDir.DISCHARGE:
-                    opposite_direction_valid = real_power < -float(min_surplus_for_charging)
+                    opposite_direction_valid = real_power < -min_surplus_for_charging
 
                 if not should_resume and not opposite_direction_valid:
                     # Keep batteries at 0 and keep PID state reset until load crosses the threshold again.
@@ -818,6 +1294,11 @@ class MarstekCoordinator:
             await self._pid_control_step(smoothed_grid_power, real_power)
             return
 
+        if self._is_steady_state(real_power):
+            _LOGGER.debug("Real power %sW unchanged since last pass. Skipping distribution.", round(real_power, 0))
+            return
+        self._last_real_power = real_power
+
         # Get battery priority
         await self._update_battery_priority_if_needed(real_power)
 
@@ -832,32 +1313,79 @@ class MarstekCoordinator:
             # Distribute power among batteries via Modbus control
             await self._distribute_power(real_power, number_of_batteries)
 
+    def _is_steady_state(self, real_power: float) -> bool:
+        """Return True if the last staging pass still applies to real_power.
+
+        The pass is kept while the load moved less than 10% of the smallest
+        relevant threshold, the power direction is unchanged, no wallbox
+        pause or below-min countdown is in progress and no battery that is
+        being driven has reached the SoC limit of its direction.
+        """
+        last = self._last_real_power
+        if last is None or self._wallbox_charge_paused:
+            return False
+        if self._below_min_charge_count or self._below_min_discharge_count:
+            return False
+        if _direction_for(real_power) != self._last_power_direction:
+            return False
+        if abs(real_power - last) >= self._steady_state_tolerance:
+            return False
+
+        # The SoC exclusion in _distribute_power must not wait for the next forced update
+        return not self._driven_battery_at_soc_limit()
+
+    def _driven_battery_at_soc_limit(self) -> bool:
+        """Return True if a battery with a non-zero setpoint reached the SoC limit of its direction."""
+        samples = self._sample_batteries()
+        min_soc = self._cfg_min_soc
+        max_soc = self._cfg_max_soc
+        for base_entity_id, (power, direction) in self._last_battery_setpoints.items():
+            if not power:
+                continue
+            soc = samples[base_entity_id][1]
+            if soc is None:
+                continue
+            if (soc >= max_soc) if direction == PowerDir.CHARGE else (soc <= min_soc):
+                return True
+        return False
+
     async def _pid_control_step(self, smoothed_grid_power: float, real_power: float) -> None:
         """Run one PID control step to drive smoothed_grid_power towards 0W."""
         # Error is defined such that:
         # - Surplus (smoothed_grid_power < 0) -> positive error -> positive output -> charging
         # - Import  (smoothed_grid_power > 0) -> negative error -> negative output -> discharging
         error = -float(smoothed_grid_power)
-        now = datetime.now()
+        now = self._now
 
-        min_surplus_for_charging = self.config.get(CONF_MIN_SURPLUS, 50)
-        min_consumption_for_discharging = self.config.get(CONF_MIN_CONSUMPTION, 50)
+        min_surplus_for_charging = self._cfg_min_surplus
+        min_consumption_for_discharging = self._cfg_min_consumption
 
-        if self._pid_prev_ts is None:
+        if self._pid_prev_mono is None:
             dt = 0.0
         else:
-            dt = max(0.0, (now - self._pid_prev_ts).total_seconds())
+            dt = max(0.0, now - self._pid_prev_mono)
 
         derivative = 0.0
         if dt > 0 and self._pid_prev_error is not None:
             derivative = (error - self._pid_prev_error) / dt
 
+        # The grid flow crossed the 0W target by more than the activation threshold (a real
+        # load step, not meter noise around 0W): drop the integral accumulated on the other
+        # side instead of winding it down, which would overshoot in the new direction.
+        if (
+            self._pid_reset_on_zero_crossing
+            and self._pid_prev_error is not None
+            and self._pid_prev_error * error < 0.0
+            and (error > min_surplus_for_charging if error > 0 else -error > min_consumption_for_discharging)
+        ):
+            self._pid_integral = 0.0
+
         # NEU: Die Richtung wird NICHT mehr vom Error bestimmt, 
         # sondern vom tatsächlichen Fluss am Hausanschluss - Batterien.
         intended_direction = PowerDir.NEUTRAL
-        if real_power < -float(min_surplus_for_charging):  # Tatsächlicher Überschuss (Einspeisung) -> Laden
+        if real_power < -min_surplus_for_charging:  # Tatsächlicher Überschuss (Einspeisung) -> Laden
             intended_direction = PowerDir.CHARGE
-        elif real_power > float(min_consumption_for_discharging): # Tatsächlicher Bezug -> Entladen
+        elif real_power > min_consumption_for_discharging: # Tatsächlicher Bezug -> Entladen
             intended_direction = PowerDir.DISCHARGE
         else:
             # Wenn wir sehr nah an 0 sind, behalten wir die letzte Richtung bei,
@@ -868,18 +1396,14 @@ class MarstekCoordinator:
         await self._update_battery_priority_if_needed(power_direction=intended_direction)
 
         # If no batteries are available for the intended direction, reset PID and exit.
-        if not self._battery_priority:
+        if not self._priority_ids:
             _LOGGER.debug("PID: no available batteries for direction %s — resetting PID state.", intended_direction.name)
             self._reset_pid_state()
             await self._set_all_batteries_to_zero()  # Ensure batteries are at 0 if PID cannot operate
             return
 
-        try:
-            max_discharge_power = int(self.config.get(CONF_MAX_DISCHARGE_POWER, 2500))
-            max_charge_power = int(self.config.get(CONF_MAX_CHARGE_POWER, 2500))
-        except (ValueError, TypeError):
-            max_discharge_power = int(DEFAULT_MAX_DISCHARGE_POWER)
-            max_charge_power = int(DEFAULT_MAX_CHARGE_POWER)
+        max_discharge_power = self._cfg_max_discharge_power
+        max_charge_power = self._cfg_max_charge_power
 
         raw_output = self._pid_compute_output(error, derivative)
         requested_abs_power = int(round(abs(raw_output)))
@@ -897,7 +1421,23 @@ class MarstekCoordinator:
         )
 
         self._pid_prev_error = error
-        self._pid_prev_ts = now
+        self._pid_prev_mono = now
+
+        # No-op cycle: the integrator has advanced, but the output moved less than the deadband
+        # in the same direction and the set of batteries is unchanged, so the last distribution
+        # still applies.
+        last_output = self._pid_last_output
+        if (
+            last_output is not None
+            and abs(output - last_output) < self._pid_deadband
+            and (output > 0) == (last_output > 0)
+            and (output < 0) == (last_output < 0)
+            and not (self._below_min_charge_count or self._below_min_discharge_count)
+            and self._priority_ids == self._pid_last_priority_ids
+            and not self._driven_battery_at_soc_limit()
+        ):
+            return
+        self._pid_last_output = output
 
         if output == 0:
             await self._set_all_batteries_to_zero()
@@ -921,23 +1461,22 @@ class MarstekCoordinator:
 
         # _distribute_power uses abs(power) and self._last_power_direction for mode,
         # so just feed it the magnitude here.
+        self._pid_last_priority_ids = self._priority_ids
         await self._distribute_power(float(requested_abs_power), number_of_batteries, from_pid=True)
 
     def _reset_pid_state(self) -> None:
         self._pid_integral = 0.0
         self._pid_prev_error = None
-        self._pid_prev_ts = None
+        self._pid_prev_mono = None
+        self._pid_saturated_high = False
+        self._pid_saturated_low = False
+        self._pid_last_output = None
 
     def _pid_compute_output(self, error: float, derivative: float) -> float:
         """Compute PID output in Watts (signed)."""
-        try:
-            kp = float(self._pid_kp)
-            ki = float(self._pid_ki)
-            kd = float(self._pid_kd)
-        except (ValueError, TypeError):
-            kp = float(DEFAULT_PID_KP)
-            ki = float(DEFAULT_PID_KI)
-            kd = float(DEFAULT_PID_KD)
+        kp = self._pid_kp
+        ki = self._pid_ki
+        kd = self._pid_kd
 
         output = (kp * error) + (ki * self._pid_integral) + (kd * derivative)
 
@@ -954,42 +1493,28 @@ class MarstekCoordinator:
         sat_pos: float,
         sat_neg: float,
     ) -> float:
-        try:
-            kp = float(self._pid_kp)
-            ki = float(self._pid_ki)
-            kd = float(self._pid_kd)
-        except (ValueError, TypeError):
-            kp = float(DEFAULT_PID_KP)
-            ki = float(DEFAULT_PID_KI)
-            kd = float(DEFAULT_PID_KD)
-
-        if ki == 0:
-            output = (kp * error) + (kd * derivative)
-            output = max(-sat_neg, min(sat_pos, output))
-            return 0.0 if abs(output) < 1.0 else output
-
-        # Integrate first (this yields the "unconstrained" integral state for this step)
-        if dt > 0:
-            self._pid_integral += error * dt
-
-        # Compute unconstrained output with the updated integral
-        u_unsat = (kp * error) + (ki * self._pid_integral) + (kd * derivative)
-        u_sat = max(-sat_neg, min(sat_pos, u_unsat))
-
-        # Back-calculation / tracking anti-windup:
-        # When saturated, pull the integrator back so that the controller output matches u_sat.
-        if u_sat != u_unsat:
-            self._pid_integral += (u_sat - u_unsat) / ki
-
-        # Safety clamp on integral so it cannot drive output beyond saturation on its own.
-        if ki != 0:
+        kp = self._pid_kp
+        ki = self._pid_ki
+        kd = self._pid_kd
+        integral = self._pid_integral
+
+        # Conditional integration: while the last output was saturated, do not
+        # integrate an error that would push it further into the limit.
+        frozen = (self._pid_saturated_high and error > 0) or (self._pid_saturated_low and error < 0)
+        if ki != 0 and dt > 0 and not frozen:
+            integral += error * dt
+
+            # Safety clamp on integral so it cannot drive output beyond saturation on its own.
             max_integral = max(sat_pos, sat_neg) / abs(ki)
-            if self._pid_integral > max_integral:
-                self._pid_integral = max_integral
-            elif self._pid_integral < -max_integral:
-                self._pid_integral = -max_integral
-
-        output = (kp * error) + (ki * self._pid_integral) + (kd * derivative)
+            if integral > max_integral:
+                integral = max_integral
+            elif integral < -max_integral:
+                integral = -max_integral
+            self._pid_integral = integral
+
+        output = (kp * error) + (ki * integral) + (kd * derivative)
+        self._pid_saturated_high = output >= sat_pos
+        self._pid_saturated_low = output <= -sat_neg
         output = max(-sat_neg, min(sat_pos, output))
 
         if abs(output) < 1.0:
@@ -997,44 +1522,64 @@ class MarstekCoordinator:
 
         return output
 
-    def _get_float_state(self, entity_id: str) -> float | None:
-        """Safely get a float value from a state."""
-        state = self._get_entity_state(entity_id)
+    def _sample_batteries(self) -> dict[str, tuple[float | None, float | None]]:
+        """Return (ac_power, soc) for every battery, read once per update cycle."""
+        samples = self._tick_cache
+        if samples is None:
+            fast_float = self._fast_float
+            samples = {
+                b: (fast_float(ids["ac"]), fast_float(ids["soc"]))
+                for b, ids in self._bat_ids.items()
+            }
+            self._tick_cache = samples
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                missing = [b for b, (ac, soc) in samples.items() if ac is None or soc is None]
+                if missing:
+                    _LOGGER.debug("Battery readings unavailable this cycle: %s", missing)
+        return samples
+
+    def _total_battery_power(self) -> float:
+        """Sum of the sampled battery AC power; unavailable readings count as 0W."""
+        total = 0.0
+        for ac_power, _ in self._sample_batteries().values():
+            if ac_power:
+                total += ac_power
+        return total
+
+    def _fast_float(self, entity_id: str) -> float | None:
+        """Hot-path float read: no logging, None for missing/unavailable/unparsable states."""
+        state = self.hass.states.get(entity_id)
         if state is None:
             return None
+        value = state.state
+        if value == STATE_UNAVAILABLE or value == STATE_UNKNOWN:
+            return None
         try:
-            return float(state.state)
+            return float(value)
         except (ValueError, TypeError):
-            _LOGGER.warning(f"Could not parse state of '{entity_id}' as float: '{state.state}'")
             return None
 
     def _get_smoothed_grid_power(self) -> float | None:
         """Get the current power from the grid sensor and calculate the smoothed average."""
-        grid_sensor_id = self.config.get(CONF_GRID_POWER_SENSOR)
-        if not isinstance(grid_sensor_id, str) or not grid_sensor_id:
+        grid_sensor_id = self._cfg_grid_power_sensor
+        if grid_sensor_id is None:
             return None
-        current_power = self._get_float_state(grid_sensor_id)
+        current_power = self._fast_float(grid_sensor_id)
         if current_power is None:
             return None
 
         self._last_grid_power_raw = current_power
-            
-        self._power_history.append(current_power)
-        if not self._power_history:
-            return 0.0
-        try:
-            smoothing = int(self.config.get(CONF_SMOOTHING_SECONDS, DEFAULT_SMOOTHING_SECONDS) or 0)
-        except (TypeError, ValueError):
-            smoothing = 0
-        if smoothing > 0:
-            avg_power = sum(self._power_history) / len(self._power_history)
-        else:
-            return current_power
-        _LOGGER.debug(f"Current grid power: {current_power}W, Smoothed grid power: {avg_power:.2f}W")
+        if self._cfg_smoothing_seconds <= 0:
+            return current_power  # Smoothing disabled: keep the window untouched
+
+        history = self._power_history
+        history.append(current_power)
+        avg_power = history.average
+        _LOGGER.debug("Current grid power: %sW, Smoothed grid power: %.2fW", current_power, avg_power)
         return avg_power
 
     def _get_pv_power(self) -> float | None:
-        pv_sensor_id = self.config.get(CONF_PV_POWER_SENSOR)
+        pv_sensor_id = self._cfg_pv_power_sensor
         if not pv_sensor_id:
             return None
         pv_state = self._get_entity_state(pv_sensor_id)
@@ -1043,13 +1588,13 @@ class MarstekCoordinator:
         try:
             pv_power = float(pv_state.state)
         except (ValueError, TypeError):
-            _LOGGER.warning(f"Could not parse state of '{pv_sensor_id}' as float: '{pv_state.state}'")
+            _LOGGER.warning("Could not parse state of '%s' as float: '%s'", pv_sensor_id, pv_state.state)
             return None
 
-        unit = pv_state.attributes.get("unit_of_measurement")
-        if unit and unit.lower() == "kw":
-            pv_power *= 1000
-        return pv_power
+        if self._pv_unit_scale is None:
+            unit = pv_state.attributes.get("unit_of_measurement")
+            self._pv_unit_scale = 1000.0 if unit and unit.lower() == "kw" else 1.0
+        return pv_power * self._pv_unit_scale
 
     def _get_real_power(self, smoothed_grid_power: float | None) -> float | None:
         """Get the real power of the house excluding the batteries. A positiv value means the house uses more power than it produced excluding the batteries. 
@@ -1058,69 +1603,37 @@ class MarstekCoordinator:
             return None
 
         # Get the current power of all batteries
-        battery_powers: dict[str, float | None] = {
-            b: self._get_float_state(f"sensor.{b}_ac_power") for b in self._battery_entities
-        }
-        total_battery_power = sum(p for p in battery_powers.values() if p is not None)
-        
+        total_battery_power = self._total_battery_power()
+
         # Calculate real power based on batterie power
-        if total_battery_power != 0:
-            real_power = (smoothed_grid_power + total_battery_power)
-        else:
-            real_power = smoothed_grid_power
-        
-        _LOGGER.debug(
-            "Battery AC power readings: %s (total=%sW)",
-            battery_powers,
-            round(total_battery_power, 2),
-        )
-        _LOGGER.debug(f"Current real power without batteries: {real_power}W")
+        real_power = smoothed_grid_power + total_battery_power
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Battery AC power readings: %s (total=%sW)",
+                {b: ac for b, (ac, _) in self._sample_batteries().items()},
+                round(total_battery_power, 2),
+            )
+        _LOGGER.debug("Current real power without batteries: %sW", real_power)
         return real_power
 
     async def _handle_wallbox_logic(self, real_power: float) -> bool:
         """Implement the wallbox charging logic. Returns True if it took control."""
-        wb_power_sensor = self.config.get(CONF_WALLBOX_POWER_SENSOR)
-        wb_cable_sensor = self.config.get(CONF_WALLBOX_CABLE_SENSOR)
-        max_surplus = self.config.get(CONF_WALLBOX_MAX_SURPLUS)
-        stability_threshold = self.config.get(CONF_WALLBOX_POWER_STABILITY_THRESHOLD)
-        wallbox_stability_min_power_gap: int = self.config.get(CONF_WALLBOX_STABILITY_MIN_POWER_GAP, DEFAULT_WALLBOX_STABILITY_MIN_POWER_GAP)
-        try:
-            start_delay = int(self.config.get(CONF_WALLBOX_START_DELAY_SECONDS, DEFAULT_WALLBOX_START_DELAY_SECONDS) or 0)
-        except (TypeError, ValueError):
-            start_delay = int(DEFAULT_WALLBOX_START_DELAY_SECONDS)
-        retry_minutes = self.config.get(CONF_WALLBOX_RETRY_MINUTES, 60)
-        retry_seconds = retry_minutes * 60
-
-        # 0. Grundvoraussetzungen prüfen
-        if not all([
-            isinstance(wb_power_sensor, str) and wb_power_sensor,
-            isinstance(wb_cable_sensor, str) and wb_cable_sensor,
-            max_surplus is not None,
-        ]):
-            _LOGGER.debug("Wallbox configuration incomplete. Skipping wallbox logic.")
-            self._wallbox_charge_paused = False
-            self._wallbox_cable_was_on = False # Zurücksetzen des Kabelzustands
+        # 0. Grundvoraussetzungen prüfen (einmalig in _reload_config ermittelt)
+        if not self._wallbox_enabled:
             return False
 
+        wb_power_sensor = self._cfg_wallbox_power_sensor
+        wallbox_stability_min_power_gap: int = self._cfg_wallbox_stability_min_power_gap
+        start_delay = self._cfg_wallbox_start_delay
+        retry_seconds = self._cfg_wallbox_retry_seconds
         wb_power_sensor_id = cast(str, wb_power_sensor)
-        wb_cable_sensor_id = cast(str, wb_cable_sensor)
-        try:
-            max_surplus_w = float(cast(Any, max_surplus))
-        except (TypeError, ValueError):
-            _LOGGER.debug("Wallbox max_surplus invalid (%s). Skipping wallbox logic.", max_surplus)
-            return False
+        wb_cable_sensor_id = cast(str, self._cfg_wallbox_cable_sensor)
+        max_surplus_w = cast(float, self._cfg_wallbox_max_surplus)
+        stability_threshold_w = self._cfg_wallbox_stability_threshold
 
-        if stability_threshold is None:
-            stability_threshold_w = float(DEFAULT_WALLBOX_POWER_STABILITY_THRESHOLD)
-        else:
-            try:
-                stability_threshold_w = float(cast(Any, stability_threshold))
-            except (TypeError, ValueError):
-                stability_threshold_w = float(DEFAULT_WALLBOX_POWER_STABILITY_THRESHOLD)
-
-        cable_state = self._get_entity_state(wb_cable_sensor_id)
-
-        cable_on = cable_state and cable_state.state == STATE_ON
+        cable_state = self.hass.states.get(wb_cable_sensor_id)
+        cable_on = cable_state is not None and cable_state.state == STATE_ON
 
         if not cable_on:
             _LOGGER.debug("Wallbox cable unplugged or unavailable. Skipping wallbox logic.")
@@ -1129,28 +1642,28 @@ class MarstekCoordinator:
                 self._wallbox_charge_paused = False
                 self._wallbox_power_history.clear()
                 self._wallbox_power_gap_history.clear()
-                self._wallbox_wait_start = None
+                self._wallbox_wait_start_mono = None
                 self._wallbox_cable_was_on = False
-                self._last_wallbox_pause_attempt = datetime.min # Reset cooldown on unplug
+                self._last_wallbox_pause_attempt_mono = -math.inf # Reset cooldown on unplug
                 self._wallbox_power_is_stable = False # Reset Stabilitätsstatus, da Auto nicht geladen hat
-                self._wallbox_stabilization_start = None # Reset Stabilisierungstimer, da Auto nicht geladen hat
+                self._wallbox_stabilization_start_mono = None # Reset Stabilisierungstimer, da Auto nicht geladen hat
             return False
         
         self._wallbox_cable_was_on = True # Kabel ist jetzt eingesteckt
             
         wb_power = 0.0
-        wb_power_state = self._get_entity_state(wb_power_sensor_id)
-        if wb_power_state:
+        wb_power_state = self.hass.states.get(wb_power_sensor_id)
+        if wb_power_state is not None and wb_power_state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN):
             try:
-                wb_power = float(wb_power_state.state)
-                unit = wb_power_state.attributes.get("unit_of_measurement")
-                if unit and unit.lower() == 'kw':
-                    wb_power *= 1000
+                if self._wb_unit_scale is None:
+                    unit = wb_power_state.attributes.get("unit_of_measurement")
+                    self._wb_unit_scale = 1000.0 if unit and unit.lower() == "kw" else 1.0
+                wb_power = float(wb_power_state.state) * self._wb_unit_scale
                 if wb_power != self._last_wallbox_power:
-                    _LOGGER.debug(f"Wallbox power: {wb_power}W")
+                    _LOGGER.debug("Wallbox power: %sW", wb_power)
                 self._last_wallbox_power = wb_power
             except (ValueError, TypeError):
-                _LOGGER.warning(f"Could not parse state of '{wb_power_sensor}' as float: '{wb_power_state.state}'")
+                _LOGGER.warning("Could not parse state of '%s' as float: '%s'", wb_power_sensor, wb_power_state.state)
     
         self._wallbox_power_history.append(wb_power)
         if real_power <= 0:
@@ -1168,7 +1681,7 @@ class MarstekCoordinator:
         # 1. Höchste Priorität: Entladeschutz, wenn Wallbox aktiv ist und Blockierung aktiviert ist
         if wb_power > 100 and self._last_power_direction == PowerDir.DISCHARGE and self._block_discharging_while_carcharging:
             _LOGGER.debug("Wallbox is active, blocking is on, ensuring batteries do not discharge.")
-            await self._set_all_batteries_to_zero()
+            self._schedule_all_zero()
             return True
         
         if wb_power > 100 and self._last_power_direction == PowerDir.DISCHARGE and not self._block_discharging_while_carcharging:
@@ -1180,15 +1693,15 @@ class MarstekCoordinator:
             _LOGGER.debug("Wallbox priority switch is OFF. Skipping wallbox logic.")
             self._wallbox_charge_paused = False
             self._wallbox_power_is_stable = False # Reset Stabilitätsstatus, da Priorität ausgeschaltet ist
-            self._wallbox_stabilization_start = None # Reset Stabilisierungstimer, da
+            self._wallbox_stabilization_start_mono = None # Reset Stabilisierungstimer, da
             self._wallbox_power_history.clear() # Clear history to avoid stale data if priority is re-enabled
             self._wallbox_power_gap_history.clear() # Clear gap history to avoid stale data if priority is re-enabled
             # Reset min/max/threshold
             self._wallbox_min_power = 0 
             self._wallbox_max_power = 0
             self._wallbox_power_difference = 0
-            self._last_wallbox_pause_attempt = datetime.min # Reset cooldown when priority is turned off
-            self._wallbox_wait_start = None # Reset wait timer when priority is turned off
+            self._last_wallbox_pause_attempt_mono = -math.inf # Reset cooldown when priority is turned off
+            self._wallbox_wait_start_mono = None # Reset wait timer when priority is turned off
             return False
 
         # 2. Zustandsprüfung: Ist eine Ladepause für die Wallbox aktiv?
@@ -1197,57 +1710,70 @@ class MarstekCoordinator:
             _LOGGER.debug("Wallbox pause is currently active. Checking conditions to end pause.")
 
             # Regel (Timeout): Auto hat nicht angefangen zu laden? -> Pause beenden
-            if self._wallbox_wait_start is not None:
-                elapsed = (datetime.now() - self._wallbox_wait_start).total_seconds()
+            if self._wallbox_wait_start_mono is not None:
+                elapsed = self._now - self._wallbox_wait_start_mono
                 if elapsed > start_delay and wb_power <= 100:
-                    _LOGGER.info(f"Wallbox did not start charging in {start_delay}s. Releasing batteries.")
+                    _LOGGER.info("Wallbox did not start charging in %ss. Releasing batteries.", start_delay)
                     self._wallbox_charge_paused = False
                     self._wallbox_power_is_stable = False # Reset Stabilitätsstatus, da Auto nicht geladen hat
-                    self._wallbox_stabilization_start = None # Reset Stabilisierungstimer, da Auto nicht geladen hat
+                    self._wallbox_stabilization_start_mono = None # Reset Stabilisierungstimer, da Auto nicht geladen hat
                     self._wallbox_power_history.clear()
                     self._wallbox_power_gap_history.clear()
                     # Reset min/max/threshold
                     self._wallbox_min_power = 0 
                     self._wallbox_max_power = 0
                     self._wallbox_power_difference = 0
-                    self._wallbox_wait_start = None
+                    self._wallbox_wait_start_mono = None
                     return False
 
             # Regel: Auto lädt, ist die Leistung stabil? -> Pause beenden
             if wb_power > 100:
-                self._wallbox_wait_start = None # Timer wird irrelevant, sobald das Auto lädt
+                self._wallbox_wait_start_mono = None # Timer wird irrelevant, sobald das Auto lädt
                 if (len(self._wallbox_power_history) == self._wallbox_power_history.maxlen) and (len(self._wallbox_power_gap_history) == self._wallbox_power_gap_history.maxlen):
                     # NEUE LOGIK: Prüfe die Spanne (Min/Max) der History
-                    min_power = min(self._wallbox_power_history)
+                    min_power = self._wallbox_power_history.min()
                     self._wallbox_min_power = min_power # Für Debugging-Zwecke speichern
-                    max_power = max(self._wallbox_power_history)
+                    max_power = self._wallbox_power_history.max()
                     self._wallbox_max_power = max_power # Für Debugging-Zwecke speichern
                     power_spread = max_power - min_power # Die Differenz zwischen Min und Max
                     self._wallbox_power_difference = power_spread # Für Debugging-Zwecke speichern
-                    self._wallbox_free_power = abs(max(self._wallbox_power_gap_history))
-                    _LOGGER.debug(f"Wallbox resume check: Min={min_power:.0f}W, Max={max_power:.0f}W, Spread={power_spread:.0f}W, free power={self._wallbox_free_power:.0f}W")
+                    self._wallbox_free_power = abs(self._wallbox_power_gap_history.max())
+                    _LOGGER.debug(
+                        "Wallbox resume check: Min=%.0fW, Max=%.0fW, Spread=%.0fW, free power=%.0fW",
+                        min_power,
+                        max_power,
+                        power_spread,
+                        self._wallbox_free_power,
+                    )
 
                     if power_spread < stability_threshold_w and self._wallbox_free_power > wallbox_stability_min_power_gap:
-                        _LOGGER.debug(f"Wallbox power has stabilized (Spread < {stability_threshold_w}W and free power > {wallbox_stability_min_power_gap}W). Releasing batteries.")
-                        self._wallbox_stabilization_start = datetime.now() # Stabilization-Timer starten (für den aktuellen Versuch)
+                        _LOGGER.debug(
+                            "Wallbox power has stabilized (Spread < %sW and free power > %sW). Releasing batteries.",
+                            stability_threshold_w,
+                            wallbox_stability_min_power_gap,
+                        )
+                        self._wallbox_stabilization_start_mono = self._now # Stabilization-Timer starten (für den aktuellen Versuch)
                         self._wallbox_power_is_stable = True
                         self._wallbox_charge_paused = False
                         return False
                     else:
-                        _LOGGER.debug(f"Wallbox power not yet stable (Spread >= {stability_threshold_w}W or free power <= {wallbox_stability_min_power_gap}W). Keeping pause active.")
+                        _LOGGER.debug(
+                            "Wallbox power not yet stable (Spread >= %sW or free power <= %sW). Keeping pause active.",
+                            stability_threshold_w,
+                            wallbox_stability_min_power_gap,
+                        )
                         self._wallbox_power_is_stable = False
-                        self._wallbox_stabilization_start = None # Reset the stabilization timer zurücksetzen, da Leistung nicht stabil ist
+                        self._wallbox_stabilization_start_mono = None # Reset the stabilization timer zurücksetzen, da Leistung nicht stabil ist
                         
             # Regel: Auto lädt nicht mehr seit X-Minuten -> Pause beenden
             if wb_power < 100:
-                if self._wallbox_wait_start is None:
+                if self._wallbox_wait_start_mono is None:
                     _LOGGER.info("Wallbox: start new start-delay timer.")
-                    now = datetime.now()
-                    self._wallbox_wait_start = now        # Start-Delay-Timer (für den aktuellen Versuch) starten
-                elif self._wallbox_wait_start is not None:
-                    elapsed = (datetime.now() - self._wallbox_wait_start).total_seconds()
+                    self._wallbox_wait_start_mono = self._now        # Start-Delay-Timer (für den aktuellen Versuch) starten
+                elif self._wallbox_wait_start_mono is not None:
+                    elapsed = self._now - self._wallbox_wait_start_mono
                     if elapsed > start_delay:
-                        _LOGGER.info(f"Wallbox did not start charging again in {start_delay}s. Releasing batteries.")
+                        _LOGGER.info("Wallbox did not start charging again in %ss. Releasing batteries.", start_delay)
                         self._wallbox_charge_paused = False
                         self._wallbox_power_history.clear()
                         self._wallbox_power_gap_history.clear()
@@ -1255,15 +1781,15 @@ class MarstekCoordinator:
                         self._wallbox_min_power = 0 
                         self._wallbox_max_power = 0
                         self._wallbox_power_difference = 0
-                        self._wallbox_wait_start = None
+                        self._wallbox_wait_start_mono = None
                         return False
 
             # Keine Bedingung zum Beenden erfüllt -> Pause beibehalten
             _LOGGER.debug("Wallbox pause remains active. Batteries set to zero.")
             self._wallbox_charge_paused = True
             self._wallbox_power_is_stable = False # Reset Stabilitätsstatus, da Pause beibehalten wird
-            self._wallbox_stabilization_start = None # Reset Stabilisierungstimer, da Pause beibehalten wird
-            await self._set_all_batteries_to_zero()
+            self._wallbox_stabilization_start_mono = None # Reset Stabilisierungstimer, da Pause beibehalten wird
+            self._schedule_all_zero()
             return True
 
         # 3. Zustandsprüfung: Keine Ladepause aktiv. Prüfen, ob eine gestartet werden soll.
@@ -1271,62 +1797,55 @@ class MarstekCoordinator:
             #_LOGGER.debug("No wallbox pause active. Checking if conditions to start pause are met.")
             # Regel (Start): Genug Überschuss UND Auto lädt nicht UND Cooldown abgelaufen? -> Pause starten
             if real_power < -max_surplus_w and wb_power <= 100:
-                now = datetime.now()
-                time_since_last_attempt = (now - self._last_wallbox_pause_attempt).total_seconds()
-                
-                # *** Die Pause sofort starten, wenn dies der ERSTE Versuch ist (datetime.min),
-                # *** ODER wenn der Cooldown abgelaufen ist.
-                is_first_attempt = self._last_wallbox_pause_attempt == datetime.min
-                cooldown_elapsed = time_since_last_attempt > retry_seconds
-
-                if is_first_attempt or cooldown_elapsed:
-                    
-                    # Wenn es nicht der erste Versuch ist, aber der Cooldown abgelaufen ist,
-                    # wird dies als INFO geloggt, da es ein normaler Retry ist.
-                    if cooldown_elapsed:
-                         _LOGGER.info(f"High surplus ({abs(real_power):.0f}W) and inactive wallbox. Cooldown elapsed. Starting pause for car (batteries to 0 for {start_delay}s).")
-                    else: # is_first_attempt
-                         _LOGGER.info(f"High surplus ({abs(real_power):.0f}W) and wallbox just connected. Starting initial pause for car (batteries to 0 for {start_delay}s).")
-                         
-                    self._last_wallbox_pause_attempt = now # Cooldown-Timer (für den nächsten Versuch) starten
-                    self._wallbox_wait_start = now        # Start-Delay-Timer (für den aktuellen Versuch) starten
-                    self._wallbox_charge_paused = True 
-                    self._wallbox_power_is_stable = False # Reset Stabilitätsstatus für den neuen Versuch
-                    self._wallbox_stabilization_start = None # Reset Stabilisierungstimer für den neuen Versuch
-                    await self._set_all_batteries_to_zero() 
+                if self._try_start_wallbox_pause(abs(real_power), "inactive", retry_seconds, start_delay):
                     return True
-                # Regel 3 (WB Leistung erhöhen): Genug Überschuss UND Auto lädt UND Cooldown abgelaufen? -> Pause starten um Wallbox Prio zu geben
+            # Regel 3 (WB Leistung erhöhen): Genug Überschuss UND Auto lädt UND Cooldown abgelaufen? -> Pause starten um Wallbox Prio zu geben
             elif (real_power - wb_power) < -max_surplus_w and wb_power >= 100:
-                now = datetime.now()
-                time_since_last_attempt = (now - self._last_wallbox_pause_attempt).total_seconds()
-                
-                # *** Die Pause sofort starten, wenn dies der ERSTE Versuch ist (datetime.min),
-                # *** ODER wenn der Cooldown abgelaufen ist.
-                is_first_attempt = self._last_wallbox_pause_attempt == datetime.min
-                cooldown_elapsed = time_since_last_attempt > retry_seconds
-
-                if is_first_attempt or cooldown_elapsed:
-                    
-                    # Wenn es nicht der erste Versuch ist, aber der Cooldown abgelaufen ist,
-                    # wird dies als INFO geloggt, da es ein normaler Retry ist.
-                    if cooldown_elapsed:
-                         _LOGGER.info(f"High surplus ({abs(real_power - wb_power):.0f}W) and charging wallbox. Cooldown elapsed. Starting pause for car (batteries to 0 for {start_delay}s).")
-                    else: # is_first_attempt
-                         _LOGGER.info(f"High surplus ({abs(real_power - wb_power):.0f}W) and wallbox just connected. Starting initial pause for car (batteries to 0 for {start_delay}s).")
-                         
-                    self._last_wallbox_pause_attempt = now # Cooldown-Timer (für den nächsten Versuch) starten
-                    self._wallbox_wait_start = now        # Start-Delay-Timer (für den aktuellen Versuch) starten
-                    self._wallbox_charge_paused = True
-                    self._wallbox_power_is_stable = False # Reset Stabilitätsstatus für den neuen Versuch
-                    self._wallbox_stabilization_start = None # Reset Stabilisierungstimer für den neuen Versuch 
-                    await self._set_all_batteries_to_zero() 
+                if self._try_start_wallbox_pause(abs(real_power - wb_power), "charging", retry_seconds, start_delay):
                     return True
-                else:
-                    _LOGGER.debug(f"High surplus, but wallbox pause is on cooldown ({time_since_last_attempt:.0f}s / {retry_seconds}s).")
-        
+
         # Kein Grund zur Intervention -> Normale Batterielogik ausführen lassen
         return False
 
+    def _try_start_wallbox_pause(
+        self, surplus_w: float, wallbox_state: str, retry_seconds: float, start_delay: float
+    ) -> bool:
+        """Pause the batteries so the car can take the surplus, unless the retry cooldown is running.
+
+        Returns True if the pause was started.
+        """
+        now = self._now
+        last_attempt = self._last_wallbox_pause_attempt_mono
+        # Die Pause sofort starten, wenn dies der ERSTE Versuch ist (-inf), ODER wenn der Cooldown abgelaufen ist.
+        if last_attempt == -math.inf:
+            _LOGGER.info(
+                "High surplus (%.0fW) and wallbox just connected. Starting initial pause for car (batteries to 0 for %ss).",
+                surplus_w,
+                start_delay,
+            )
+        elif now - last_attempt > retry_seconds:
+            _LOGGER.info(
+                "High surplus (%.0fW) and %s wallbox. Cooldown elapsed. Starting pause for car (batteries to 0 for %ss).",
+                surplus_w,
+                wallbox_state,
+                start_delay,
+            )
+        else:
+            _LOGGER.debug(
+                "High surplus, but wallbox pause is on cooldown (%.0fs / %ss).",
+                now - last_attempt,
+                retry_seconds,
+            )
+            return False
+
+        self._last_wallbox_pause_attempt_mono = now # Cooldown-Timer (für den nächsten Versuch) starten
+        self._wallbox_wait_start_mono = now        # Start-Delay-Timer (für den aktuellen Versuch) starten
+        self._wallbox_charge_paused = True
+        self._wallbox_power_is_stable = False # Reset Stabilitätsstatus für den neuen Versuch
+        self._wallbox_stabilization_start_mono = None # Reset Stabilisierungstimer für den neuen Versuch
+        self._schedule_all_zero()
+        return True
+
     async def _update_battery_priority_if_needed(
         self,
         real_power: float | None = None,
@@ -1338,202 +1857,151 @@ class MarstekCoordinator:
         if power_direction is None:
             if real_power is None:
                 return
+            power_direction = _direction_for(real_power)
 
-            # power direction: CHARGE for charging, DISCHARGE for discharging, NEUTRAL for neutral
-            power_direction = PowerDir.NEUTRAL
-
-            # decide the new direction
-            if real_power < 0:
-                power_direction = PowerDir.CHARGE
-            elif real_power > 0:
-                power_direction = PowerDir.DISCHARGE
-
-        try:
-            priority_minutes = float(self.config.get(CONF_PRIORITY_INTERVAL, DEFAULT_PRIORITY_INTERVAL) or DEFAULT_PRIORITY_INTERVAL)
-        except (TypeError, ValueError):
-            priority_minutes = float(DEFAULT_PRIORITY_INTERVAL)
-        priority_interval = timedelta(minutes=priority_minutes)
-        time_since_last_update = datetime.now() - self._last_priority_update
-
-        # Rate limit: only allow updates at most once per 10 seconds
-        min_update_interval = timedelta(seconds=10)
-
+        direction_changed = power_direction != self._last_power_direction
         # If we have no priority list yet, allow an update immediately so the control loop can start.
-        needs_initial_priority = not self._battery_priority
+        needs_initial_priority = not self._priority_ids
 
+        # Common case: same direction, list present and the interval not yet elapsed
         if (
-            power_direction != self._last_power_direction or
-            time_since_last_update > priority_interval or
-            needs_initial_priority
+            not direction_changed
+            and not needs_initial_priority
+            and self._now - self._last_priority_update_mono <= self._cfg_priority_interval_seconds
         ):
-            # Check if enough time has passed since last update
-            direction_changed = power_direction != self._last_power_direction
-            if direction_changed or needs_initial_priority or time_since_last_update >= min_update_interval:
-                _LOGGER.info(f"Recalculating battery priority. Reason: {'Power direction changed' if power_direction != self._last_power_direction else 'Time interval elapsed'}")
-                await self._calculate_battery_priority(power_direction)
-                self._last_power_direction = power_direction
-                self._last_priority_update = datetime.now()
-            else:
-                _LOGGER.debug(f"Priority update triggered but rate-limited. Will retry in {(min_update_interval - time_since_last_update).total_seconds():.0f}s")
+            return
+
+        # Check if enough time has passed since last update
+        if direction_changed or needs_initial_priority or self._now >= self._priority_rate_limit_deadline_mono:
+            _LOGGER.info(
+                "Recalculating battery priority. Reason: %s",
+                "Power direction changed" if direction_changed else "Time interval elapsed",
+            )
+            await self._calculate_battery_priority(power_direction)
+            self._last_power_direction = power_direction
+            self._last_priority_update_mono = self._now
+            self._priority_rate_limit_deadline_mono = self._now + PRIORITY_RATE_LIMIT_SECONDS
+        else:
+            _LOGGER.debug(
+                "Priority update triggered but rate-limited. Will retry in %.0fs",
+                self._priority_rate_limit_deadline_mono - self._now,
+            )
 
     async def _calculate_battery_priority(self, power_direction: PowerDir):
         """Calculate the sorted list of batteries based on SoC."""
+        self._priority_ids = ()
+        self._priority_socs = ()
         if power_direction == PowerDir.NEUTRAL:
-            self._battery_priority = []
             return
         
         # If charging or discharging is not allowed, set priority to empty to prevent any battery from being used in that direction.
         if self._allow_charging is False and power_direction == PowerDir.CHARGE:
-            self._battery_priority = []
             _LOGGER.debug("Charging is disabled. Setting battery priority to empty for charging.")
             return
         if self._allow_discharging is False and power_direction == PowerDir.DISCHARGE:
-            self._battery_priority = []
             _LOGGER.debug("Discharging is disabled. Setting battery priority to empty for discharging.")
             return
 
-        try:
-            min_soc = float(self.config.get(CONF_MIN_SOC, DEFAULT_MIN_SOC) or DEFAULT_MIN_SOC)
-        except (TypeError, ValueError):
-            min_soc = float(DEFAULT_MIN_SOC)
-        try:
-            max_soc = float(self.config.get(CONF_MAX_SOC, DEFAULT_MAX_SOC) or DEFAULT_MAX_SOC)
-        except (TypeError, ValueError):
-            max_soc = float(DEFAULT_MAX_SOC)
+        min_soc = self._cfg_min_soc
+        max_soc = self._cfg_max_soc
         
-        available_batteries = []
+        pairs: list[tuple[float, str]] = []
         missing_soc: list[str] = []
+        samples = self._sample_batteries()
+        add_pair = pairs.append
+        is_charge = power_direction == PowerDir.CHARGE
         for base_entity_id in self._battery_entities:
-            soc = self._get_float_state(f"sensor.{base_entity_id}_battery_soc")
+            soc = samples[base_entity_id][1]
             if soc is None:
                 missing_soc.append(base_entity_id)
                 continue
 
-            if power_direction == PowerDir.CHARGE and soc <= max_soc:
-                available_batteries.append({"id": base_entity_id, "soc": soc})
-            elif power_direction == PowerDir.DISCHARGE and soc >= min_soc:
-                available_batteries.append({"id": base_entity_id, "soc": soc})
+            if (soc <= max_soc) if is_charge else (soc >= min_soc):
+                add_pair((soc, base_entity_id))
 
-        is_reverse = (power_direction == PowerDir.DISCHARGE)
-        self._battery_priority = sorted(available_batteries, key=lambda x: x['soc'], reverse=is_reverse)
-        _LOGGER.debug(f"New battery priority: {self._battery_priority}")
+        # Sort by SoC only (C-level key) so equal SoC keeps the configured battery order
+        pairs.sort(key=itemgetter(0), reverse=not is_charge)
+        self._priority_socs = tuple(soc for soc, _ in pairs)
+        self._priority_ids = tuple(bid for _, bid in pairs)
+        _LOGGER.debug("New battery priority: %s (SoC %s)", self._priority_ids, self._priority_socs)
         if missing_soc:
             _LOGGER.debug("Battery SoC unavailable for priority calculation: %s", missing_soc)
 
+    def _build_stage_thresholds(
+        self, stage1: Any, stage2: Any, default1: float, default2: float
+    ) -> tuple[float, float, float, float]:
+        """Return (stage1 + offset, stage2 + offset, stage1 - offset, stage2 - offset)."""
+        offset = self._cfg_stage_offset
+        s1 = float(default1 if stage1 is None else stage1)
+        s2 = float(default2 if stage2 is None else stage2)
+        return (s1 + offset, s2 + offset, s1 - offset, s2 - offset)
+
     def _get_desired_number_of_batteries(self, power: float) -> int:
-        # Get the current allow_charging and allow_discharging states
         abs_power = abs(power)
-        stage_offset = self.config.get(CONF_POWER_STAGE_OFFSET, 50)
-        if self._last_power_direction == PowerDir.DISCHARGE: #Currently Discharging
-            stage1 = self.config.get(CONF_POWER_STAGE_DISCHARGE_1)
-            stage2 = self.config.get(CONF_POWER_STAGE_DISCHARGE_2)
-        else:
-            stage1 = self.config.get(CONF_POWER_STAGE_CHARGE_1)
-            stage2 = self.config.get(CONF_POWER_STAGE_CHARGE_2)
-        
-        num_available = len(self._battery_priority)
+        # Currently discharging -> discharge stages, otherwise charge stages
+        up1, up2, down1, down2 = self._stage_thresholds[self._last_power_direction == PowerDir.DISCHARGE]
+
+        num_available = len(self._priority_ids)
         if num_available == 0:
             _LOGGER.debug("No available batteries in priority list. Returning 0 target batteries.")
             return 0
         
         # 1. Ermittle die Anzahl der Batterien, die aktuell Leistung liefern/aufnehmen
-        num_currently_active = 0
-        for b_id in self._battery_entities:
-            power_state = self._get_float_state(f"sensor.{b_id}_ac_power")
-            # Zähle Batterien mit mehr als 10W (Toleranz für Rauschen)
-            if power_state is not None and abs(power_state) > 10:
-                num_currently_active += 1
+        # Zähle Batterien mit mehr als 10W (Toleranz für Rauschen)
+        samples = self._sample_batteries()
+        num_currently_active = sum(
+            1 for ac_power, _ in samples.values() if ac_power is not None and abs(ac_power) > 10
+        )
 
-        _LOGGER.debug(f"Hysteresis check: num_available={num_available}, num_currently_active={num_currently_active}, abs_power={abs_power:.0f}W")
+        _LOGGER.debug(
+            "Hysteresis check: num_available=%s, num_currently_active=%s, abs_power=%.0fW",
+            num_available,
+            num_currently_active,
+            abs_power,
+        )
         
         # 2. Implementiere Hysterese-Logik basierend auf dem aktuellen Zustand
-        target_num_batteries = 0
-
         if num_currently_active <= 1:
-            # Aktuell 0 oder 1 Batterie aktiv. Logik zum HOCHschalten:
-            # Schwelle = STUFE + OFFSET
-            if abs_power > (stage2 + stage_offset):
-                target_num_batteries = 3
-            elif abs_power > (stage1 + stage_offset):
-                target_num_batteries = 2
-            else:
-                # Leistung ist unter (stage1 + offset)
-                target_num_batteries = 1
-
+            # Aktuell 0 oder 1 Batterie aktiv. HOCHschalten bei STUFE + OFFSET
+            target_num_batteries = 3 if abs_power > up2 else 1 + (abs_power > up1)
         elif num_currently_active == 2:
-            # Aktuell 2 Batterien aktiv. Logik zum HOCH- oder RUNTERschalten:
-            if abs_power > (stage2 + stage_offset):  # HOCHschalten
-                target_num_batteries = 3
-            elif abs_power < (stage1 - stage_offset):  # RUNTERschalten
-                target_num_batteries = 1
-            else:
-                # Bleibe im Hysterese-Bereich: (stage1 - offset) <= power <= (stage2 + offset)
-                target_num_batteries = 2
-
+            # Aktuell 2 Batterien aktiv. HOCH- oder RUNTERschalten, sonst im Hysterese-Bereich bleiben
+            target_num_batteries = 3 if abs_power > up2 else (1 if abs_power < down1 else 2)
         else:  # num_currently_active >= 3
-            # Aktuell 3 Batterien aktiv. Logik zum RUNTERschalten:
-            # Schwelle = STUFE - OFFSET
-            if abs_power < (stage1 - stage_offset):
-                target_num_batteries = 1
-            elif abs_power < (stage2 - stage_offset):
-                target_num_batteries = 2
-            else:
-                # Bleibe im Hysterese-Bereich: power >= (stage2 - offset)
-                target_num_batteries = 3
-
-        # Berücksichtige die maximal verfügbaren Batterien (aus der Prioritätenliste)
-        if num_available == 1:
-            target_num_batteries = 1
-        elif num_available == 2:
-            target_num_batteries = min(target_num_batteries, 2)
-        else:
-            # Dies deckt num_available == 3 oder mehr ab
-            target_num_batteries = min(target_num_batteries, 3)
+            # Aktuell 3 Batterien aktiv. RUNTERschalten bei STUFE - OFFSET
+            target_num_batteries = 1 if abs_power < down1 else 3 - (abs_power < down2)
+
+        # Berücksichtige die maximal verfügbaren Batterien (aus der Prioritätenliste), höchstens 3
+        target_num_batteries = min(target_num_batteries, num_available, 3)
 
-        _LOGGER.debug(f"Determined target number of batteries: {target_num_batteries} (Available: {num_available}, Currently Active: {num_currently_active})")
+        _LOGGER.debug(
+            "Determined target number of batteries: %s (Available: %s, Currently Active: %s)",
+            target_num_batteries,
+            num_available,
+            num_currently_active,
+        )
         # Consider per-battery SoC-based caps: if the selected number of
         # batteries cannot supply the requested power because of their
         # per-battery caps, increase the number of batteries until the
         # requested power can be supplied or we exhaust available batteries.
-        try:
-            charge_levels = [
-                int(self.config.get(CONF_CHARGE_POWER_LEVEL_1, DEFAULT_CHARGE_POWER_LEVEL_1)),
-                int(self.config.get(CONF_CHARGE_POWER_LEVEL_2, DEFAULT_CHARGE_POWER_LEVEL_2)),
-                int(self.config.get(CONF_CHARGE_POWER_LEVEL_3, DEFAULT_CHARGE_POWER_LEVEL_3)),
-                int(self.config.get(CONF_CHARGE_POWER_LEVEL_4, DEFAULT_CHARGE_POWER_LEVEL_4)),
-                int(self.config.get(CONF_CHARGE_POWER_LEVEL_5, DEFAULT_CHARGE_POWER_LEVEL_5)),
-            ]
-            discharge_levels = [
-                int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_1, DEFAULT_DISCHARGE_POWER_LEVEL_1)),
-                int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_2, DEFAULT_DISCHARGE_POWER_LEVEL_2)),
-                int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_3, DEFAULT_DISCHARGE_POWER_LEVEL_3)),
-                int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_4, DEFAULT_DISCHARGE_POWER_LEVEL_4)),
-                int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_5, DEFAULT_DISCHARGE_POWER_LEVEL_5)),
-            ]
-        except Exception:
-            charge_levels = [DEFAULT_CHARGE_POWER_LEVEL_1, DEFAULT_CHARGE_POWER_LEVEL_2, DEFAULT_CHARGE_POWER_LEVEL_3, DEFAULT_CHARGE_POWER_LEVEL_4, DEFAULT_CHARGE_POWER_LEVEL_5]
-            discharge_levels = [DEFAULT_DISCHARGE_POWER_LEVEL_1, DEFAULT_DISCHARGE_POWER_LEVEL_2, DEFAULT_DISCHARGE_POWER_LEVEL_3, DEFAULT_DISCHARGE_POWER_LEVEL_4, DEFAULT_DISCHARGE_POWER_LEVEL_5]
+        charge_levels = self._cfg_charge_levels
+        discharge_levels = self._cfg_discharge_levels
 
         # Get the maximum power limits from config, with defaults
-        max_discharge_power = self.config.get(CONF_MAX_DISCHARGE_POWER, 2500)
-        max_charge_power = self.config.get(CONF_MAX_CHARGE_POWER, 2500)
-        # Determine intended direction from the provided power if possible
-        direction = self._last_power_direction
-        if power is not None:
-            try:
-                if float(power) < 0:
-                    direction = PowerDir.CHARGE
-                elif float(power) > 0:
-                    direction = PowerDir.DISCHARGE
-            except Exception:
-                pass
+        max_discharge_power = self._cfg_max_discharge_power
+        max_charge_power = self._cfg_max_charge_power
+        # Determine intended direction from the provided power; 0W keeps the last direction
+        direction = _direction_for(power) if power else self._last_power_direction
+
+        is_charge = direction == PowerDir.CHARGE
+        direction_max_power = max_charge_power if is_charge else max_discharge_power
 
         # Helper to compute cap for a battery based on its SoC and direction
         def _cap_for_batt(base_entity_id: str) -> int:
-            soc = self._get_float_state(f"sensor.{base_entity_id}_battery_soc")
+            soc = samples[base_entity_id][1]
             if soc is None:
-                return int(max_charge_power) if direction == PowerDir.CHARGE else int(max_discharge_power)
-            if direction == PowerDir.CHARGE:
+                return direction_max_power
+            if is_charge:
                 if soc >= 98:
                     cap = charge_levels[0]
                 elif soc >= 95:
@@ -1545,8 +2013,7 @@ class MarstekCoordinator:
                 elif soc >= 80:
                     cap = charge_levels[4]
                 else:
-                    cap = int(max_charge_power)
-                return min(cap, int(max_charge_power))
+                    cap = direction_max_power
             else:
                 if soc <= 13:
                     cap = discharge_levels[0]
@@ -1559,18 +2026,17 @@ class MarstekCoordinator:
                 elif soc <= 30:
                     cap = discharge_levels[4]
                 else:
-                    cap = int(max_discharge_power)
-                return min(cap, int(max_discharge_power))
+                    cap = direction_max_power
+            return min(cap, direction_max_power)
 
         # Try increasing the number of batteries if needed to meet the requested power
         requested = abs_power
         curr_target = target_num_batteries
-        # Build list of available battery ids according to current priority
-        # Only include batteries that have a string `id` value; cast for typing
-        available_ids: list[str] = [cast(str, b.get("id")) for b in self._battery_priority if isinstance(b, dict) and isinstance(b.get("id"), str)]
+        # Available battery ids according to current priority
+        available_ids = self._priority_ids
         while curr_target < len(available_ids):
             # Sum caps of top curr_target batteries
-            top_ids: list[str] = available_ids[:curr_target]
+            top_ids = available_ids[:curr_target]
             total_cap = sum(_cap_for_batt(bid) for bid in top_ids)
             if total_cap >= requested:
                 break
@@ -1578,7 +2044,7 @@ class MarstekCoordinator:
 
         # Ensure curr_target is not greater than allowed by available batteries
         curr_target = min(curr_target, len(available_ids))
-        _LOGGER.debug(f"Adjusted target batteries considering per-battery caps: {curr_target}")
+        _LOGGER.debug("Adjusted target batteries considering per-battery caps: %s", curr_target)
         return curr_target
 
     async def _distribute_power(self, power: float, target_num_batteries: int = 1, *, from_pid: bool = False):
@@ -1598,8 +2064,8 @@ class MarstekCoordinator:
 
         requested_abs_power = abs(power)
         abs_power = requested_abs_power
-        max_discharge_power = self.config.get(CONF_MAX_DISCHARGE_POWER, 2500)
-        max_charge_power = self.config.get(CONF_MAX_CHARGE_POWER, 2500)
+        max_discharge_power = self._cfg_max_discharge_power
+        max_charge_power = self._cfg_max_charge_power
 
         if self._last_power_direction == PowerDir.CHARGE:
             pv_power = self._get_pv_power()
@@ -1624,10 +2090,7 @@ class MarstekCoordinator:
                 except (TypeError, ValueError):
                     grid_power = 0.0
 
-                battery_powers: dict[str, float | None] = {
-                    b: self._get_float_state(f"sensor.{b}_ac_power") for b in self._battery_entities
-                }
-                total_battery_power = sum(p for p in battery_powers.values() if p is not None)
+                total_battery_power = self._total_battery_power()
 
                 grid_import = max(0.0, grid_power)
                 grid_export = max(0.0, -grid_power)
@@ -1658,8 +2121,8 @@ class MarstekCoordinator:
                 round(abs_power, 0),
             )
 
-        min_surplus_for_charging = self.config.get(CONF_MIN_SURPLUS, 50)
-        min_consumption_for_discharging = self.config.get(CONF_MIN_CONSUMPTION, 50)
+        min_surplus_for_charging = self._cfg_min_surplus
+        min_consumption_for_discharging = self._cfg_min_consumption
 
         # Check minimum thresholds to activate charging/discharging
         if self._last_power_direction == PowerDir.CHARGE and abs_power < min_surplus_for_charging:
@@ -1723,36 +2186,31 @@ class MarstekCoordinator:
             await self._set_all_batteries_to_zero()
             return
 
-        active_batteries = self._battery_priority[:target_num_batteries]
+        active_battery_ids = self._priority_ids[:target_num_batteries]
 
         # Safety: never command batteries beyond SoC limits, even if priority list is stale.
         # This is intentionally checked every cycle.
-        try:
-            min_soc = float(self.config.get(CONF_MIN_SOC, DEFAULT_MIN_SOC) or DEFAULT_MIN_SOC)
-        except (TypeError, ValueError):
-            min_soc = float(DEFAULT_MIN_SOC)
-        try:
-            max_soc = float(self.config.get(CONF_MAX_SOC, DEFAULT_MAX_SOC) or DEFAULT_MAX_SOC)
-        except (TypeError, ValueError):
-            max_soc = float(DEFAULT_MAX_SOC)
+        min_soc = self._cfg_min_soc
+        max_soc = self._cfg_max_soc
+        direction = self._last_power_direction
+        # (battery id, SoC) of the batteries that pass the SoC check
+        eligible: list[tuple[str, float]] = []
 
-        if active_batteries:
+        if active_battery_ids:
             # Try to filter out batteries that are at SoC limits. If any battery
             # is excluded due to reaching min/max SoC, immediately recalculate
             # the battery priority and retry distribution (up to a few attempts)
             # so the system can adapt within the same update cycle.
             max_attempts = 3
+            samples = self._sample_batteries()
             for attempt in range(max_attempts):
                 excluded_due_to_soc = False
-                eligible: list[dict[str, Any]] = []
-                for b in active_batteries:
-                    base_entity_id = b.get("id") if isinstance(b, dict) else None
-                    if not isinstance(base_entity_id, str) or not base_entity_id:
-                        continue
-                    soc = self._get_float_state(f"sensor.{base_entity_id}_battery_soc")
+                eligible.clear()
+                for base_entity_id in active_battery_ids:
+                    soc = samples[base_entity_id][1]
                     if soc is None:
                         continue
-                    if self._last_power_direction == PowerDir.CHARGE and soc >= max_soc:
+                    if direction == PowerDir.CHARGE and soc >= max_soc:
                         _LOGGER.debug(
                             "Excluding battery %s from CHARGE: soc=%s >= max_soc=%s",
                             base_entity_id,
@@ -1761,7 +2219,7 @@ class MarstekCoordinator:
                         )
                         excluded_due_to_soc = True
                         continue
-                    if self._last_power_direction == PowerDir.DISCHARGE and soc <= min_soc:
+                    if direction == PowerDir.DISCHARGE and soc <= min_soc:
                         _LOGGER.debug(
                             "Excluding battery %s from DISCHARGE: soc=%s <= min_soc=%s",
                             base_entity_id,
@@ -1770,9 +2228,7 @@ class MarstekCoordinator:
                         )
                         excluded_due_to_soc = True
                         continue
-                    eligible.append(b)
-
-                active_batteries = eligible
+                    eligible.append((base_entity_id, soc))
 
                 if not excluded_due_to_soc:
                     break
@@ -1781,11 +2237,14 @@ class MarstekCoordinator:
                 # rebuild the candidate list. This allows switching to the next
                 # suitable battery immediately in the same update.
                 _LOGGER.debug("Battery reached SoC limit; recalculating priority (attempt %s/%s)", attempt + 1, max_attempts)
-                await self._calculate_battery_priority(self._last_power_direction)
-                active_batteries = self._battery_priority[:target_num_batteries]
+                await self._calculate_battery_priority(direction)
+                active_battery_ids = self._priority_ids[:target_num_batteries]
+
+            # Only batteries that passed the last SoC check are commanded
+            active_battery_ids = tuple(b for b, _ in eligible)
 
-        # Safeguard: if active_batteries is empty (priority list empty), set all to zero and return
-        if not active_batteries:
+        # Safeguard: if active_battery_ids is empty (priority list empty), set all to zero and return
+        if not active_battery_ids:
             _LOGGER.debug(
                 "No eligible batteries in priority list (target: %s). Setting all to zero.",
                 target_num_batteries,
@@ -1799,60 +2258,44 @@ class MarstekCoordinator:
         # Determine per-battery caps based on SoC-level tables (configurable)
         # Charge levels: check high SoC ranges first (>=98, >=95, >=91, >=86, >=80), below -> use max_charge_power
         # Discharge levels: check low SoC ranges first (<=13, <=15, <=19, <=25, <=30), above -> use max_discharge_power
-        charge_levels = [
-            int(self.config.get(CONF_CHARGE_POWER_LEVEL_1, DEFAULT_CHARGE_POWER_LEVEL_1)),
-            int(self.config.get(CONF_CHARGE_POWER_LEVEL_2, DEFAULT_CHARGE_POWER_LEVEL_2)),
-            int(self.config.get(CONF_CHARGE_POWER_LEVEL_3, DEFAULT_CHARGE_POWER_LEVEL_3)),
-            int(self.config.get(CONF_CHARGE_POWER_LEVEL_4, DEFAULT_CHARGE_POWER_LEVEL_4)),
-            int(self.config.get(CONF_CHARGE_POWER_LEVEL_5, DEFAULT_CHARGE_POWER_LEVEL_5)),
-        ]
-        discharge_levels = [
-            int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_1, DEFAULT_DISCHARGE_POWER_LEVEL_1)),
-            int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_2, DEFAULT_DISCHARGE_POWER_LEVEL_2)),
-            int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_3, DEFAULT_DISCHARGE_POWER_LEVEL_3)),
-            int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_4, DEFAULT_DISCHARGE_POWER_LEVEL_4)),
-            int(self.config.get(CONF_DISCHARGE_POWER_LEVEL_5, DEFAULT_DISCHARGE_POWER_LEVEL_5)),
-        ]
+        charge_levels = self._cfg_charge_levels
+        discharge_levels = self._cfg_discharge_levels
 
-        active_battery_ids = [b["id"] for b in active_batteries]
+        # Direction-specific upper bound, applied once after the SoC level lookup
+        is_charge = direction == PowerDir.CHARGE
+        direction_max_power = int(max_charge_power) if is_charge else int(max_discharge_power)
 
+        # Reuse the SoC read during the eligibility check (unknown SoC never passes it)
         per_batt_cap: dict[str, int] = {}
-        for b in active_battery_ids:
-            soc = self._get_float_state(f"sensor.{b}_battery_soc")
-            if soc is None:
-                # If SoC unknown, allow full configured max
-                cap = int(max_charge_power) if self._last_power_direction == PowerDir.CHARGE else int(max_discharge_power)
+        for b, soc in eligible:
+            if is_charge:
+                if soc >= 98:
+                    cap = charge_levels[0]
+                elif soc >= 95:
+                    cap = charge_levels[1]
+                elif soc >= 91:
+                    cap = charge_levels[2]
+                elif soc >= 86:
+                    cap = charge_levels[3]
+                elif soc >= 80:
+                    cap = charge_levels[4]
+                else:
+                    cap = direction_max_power
             else:
-                if self._last_power_direction == PowerDir.CHARGE:
-                    if soc >= 98:
-                        cap = charge_levels[0]
-                    elif soc >= 95:
-                        cap = charge_levels[1]
-                    elif soc >= 91:
-                        cap = charge_levels[2]
-                    elif soc >= 86:
-                        cap = charge_levels[3]
-                    elif soc >= 80:
-                        cap = charge_levels[4]
-                    else:
-                        cap = int(max_charge_power)
-                    cap = min(cap, int(max_charge_power))
+                # Discharge
+                if soc <= 13:
+                    cap = discharge_levels[0]
+                elif soc <= 15:
+                    cap = discharge_levels[1]
+                elif soc <= 19:
+                    cap = discharge_levels[2]
+                elif soc <= 25:
+                    cap = discharge_levels[3]
+                elif soc <= 30:
+                    cap = discharge_levels[4]
                 else:
-                    # Discharge
-                    if soc <= 13:
-                        cap = discharge_levels[0]
-                    elif soc <= 15:
-                        cap = discharge_levels[1]
-                    elif soc <= 19:
-                        cap = discharge_levels[2]
-                    elif soc <= 25:
-                        cap = discharge_levels[3]
-                    elif soc <= 30:
-                        cap = discharge_levels[4]
-                    else:
-                        cap = int(max_discharge_power)
-                    cap = min(cap, int(max_discharge_power))
-            per_batt_cap[b] = max(0, int(cap))
+                    cap = direction_max_power
+            per_batt_cap[b] = max(0, min(int(cap), direction_max_power))
 
         # Allocate requested power among active batteries respecting per-battery caps using iterative water-filling
         remaining = int(round(abs_power))
@@ -1877,121 +2320,162 @@ class MarstekCoordinator:
             if not progress:
                 break
 
-        _LOGGER.debug(
-            "Distributing %sW (%s requested) to %s batteries: %s with allocations=%s",
-            round(abs_power, 0),
-            round(requested_abs_power, 0),
-            len(active_battery_ids),
-            active_battery_ids,
-            allocations,
-        )
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Distributing %sW (%s requested) to %s batteries: %s with allocations=%s",
+                round(abs_power, 0),
+                round(requested_abs_power, 0),
+                len(active_battery_ids),
+                active_battery_ids,
+                allocations,
+            )
 
+        # Submit the writes for all batteries at once and wait for completion a single time.
+        # Each battery still applies its own writes in order (mode switch -> power -> force mode).
+        # Only batteries whose setpoint changed are written. If nothing changed at all,
+        # refresh a single battery per cycle (round-robin) as keep-alive.
+        writes = []
+        last_setpoints = self._last_battery_setpoints
+        set_battery_power = self._set_battery_power
         for battery_base_id in self._battery_entities:
-            if battery_base_id in allocations and allocations[battery_base_id] > 0:
-                await self._set_battery_power(battery_base_id, allocations[battery_base_id], self._last_power_direction)
+            allocation = allocations.get(battery_base_id, 0)
+            if allocation > 0:
+                setpoint = (allocation, direction)
             else:
-                await self._set_battery_power(battery_base_id, 0, 0)
-
-    async def _set_battery_power(self, base_entity_id: str, power: int, direction: int):
-        """Set the charge or discharge power for a single battery."""
-        charge_entity = f"number.{base_entity_id}_modbus_set_forcible_charge_power"
-        discharge_entity = f"number.{base_entity_id}_modbus_set_forcible_discharge_power"
-        force_mode= f"select.{base_entity_id}_modbus_force_mode"
-        modbus_control_mode = f"switch.{base_entity_id}_modbus_rs485_control_mode"
-        # Ensure Modbus control mode is set to 'forcible'
-        await self._async_call_cached(
-            "switch",
-            "turn_on",
-            modbus_control_mode,
-            "state",
-            True,
-            {"entity_id": modbus_control_mode},
-            blocking=True,
-        )
-        
-        try:
-            if direction == 1: #Charging the Batteries
-                await self._async_call_cached(
-                    "number",
-                    "set_value",
-                    charge_entity,
-                    "value",
-                    power,
-                    {"entity_id": charge_entity, "value": power},
-                    blocking=True,
-                )
-                await self._async_call_cached(
-                    "select",
-                    "select_option",
-                    force_mode,
-                    "option",
-                    "charge",
-                    {"entity_id": force_mode, "option": "charge"},
-                    blocking=True,
-                )
-            elif direction == -1: #Discharging the Batteries
-                await self._async_call_cached(
-                    "number",
-                    "set_value",
-                    discharge_entity,
-                    "value",
-                    power,
-                    {"entity_id": discharge_entity, "value": power},
-                    blocking=True,
-                )
-                await self._async_call_cached(
-                    "select",
-                    "select_option",
-                    force_mode,
-                    "option",
-                    "discharge",
-                    {"entity_id": force_mode, "option": "discharge"},
-                    blocking=True,
-                )
-            else: #Set to 0
-                await self._async_call_cached(
-                    "number",
-                    "set_value",
-                    charge_entity,
-                    "value",
-                    0,
-                    {"entity_id": charge_entity, "value": 0},
-                    blocking=True,
-                )
-                await self._async_call_cached(
-                    "number",
-                    "set_value",
-                    discharge_entity,
-                    "value",
-                    0,
-                    {"entity_id": discharge_entity, "value": 0},
-                    blocking=True,
-                )
-                await self._async_call_cached(
-                    "select",
-                    "select_option",
-                    force_mode,
-                    "option",
-                    "stop",
-                    {"entity_id": force_mode, "option": "stop"},
-                    blocking=True,
-                )
+                setpoint = (0, PowerDir.NEUTRAL)
+            if last_setpoints.get(battery_base_id) != setpoint:
+                writes.append(set_battery_power(battery_base_id, *setpoint))
+
+        if not writes and self._battery_entities:
+            battery_base_id = self._battery_entities[self._keepalive_index % len(self._battery_entities)]
+            self._keepalive_index += 1
+            writes.append(
+                self._set_battery_power(battery_base_id, *self._last_battery_setpoints[battery_base_id], force=True)
+            )
+
+        await asyncio.gather(*writes)
+
+    async def _set_battery_power(self, base_entity_id: str, power: int, direction: int, *, force: bool = False):
+        """Set the charge or discharge power for a single battery.
+
+        Skipped if the same setpoint was written successfully before, unless force is set.
+        """
+        setpoint = (power, direction)
+        if not force and self._last_battery_setpoints.get(base_entity_id) == setpoint:
+            return
+        self._last_battery_setpoints[base_entity_id] = setpoint
+        if _DIRECTION_TABLE.get(direction, _DIRECTION_TABLE[PowerDir.NEUTRAL])[0] is None:
+            calls = self._zero_calls[base_entity_id]
+        else:
+            calls = self._build_power_calls(self._bat_ids[base_entity_id], power, direction)
 
-            # Add a small delay to prevent overwhelming the device APIs
-            await asyncio.sleep(0.1)
+        applied = False
+        try:
+            # One write sequence per battery at a time; different batteries proceed in parallel.
+            async with self._get_lock(self._battery_locks, base_entity_id):
+                for attempt in range(1, SET_POWER_MAX_ATTEMPTS + 1):
+                    try:
+                        if await self._async_call_stages(calls, force=force):
+                            applied = True
+                            return
+                        break  # Missing service or failed call: a retry would fail the same way
+                    except asyncio.TimeoutError:
+                        # Only a timeout is worth retrying; writes that already succeeded are skipped by the cache.
+                        if attempt < SET_POWER_MAX_ATTEMPTS:
+                            await asyncio.sleep(0.05 * 2 ** (attempt - 1))
+            _LOGGER.error(
+                "Failed to set power for %s after %s attempt(s)",
+                base_entity_id,
+                attempt,
+            )
         except Exception as e:
-            _LOGGER.error(f"Failed to set power for {base_entity_id}: {e}")
+            _LOGGER.error("Failed to set power for %s: %s", base_entity_id, e)
+        finally:
+            # Forget the setpoint on failure or cancellation (unless a newer one was requested
+            # meanwhile) so the next cycle writes it again.
+            if not applied and self._last_battery_setpoints.get(base_entity_id) == setpoint:
+                del self._last_battery_setpoints[base_entity_id]
+
+    @staticmethod
+    def _build_power_calls(
+        entity_ids: dict[str, str], power: int, direction: int
+    ) -> list[list[tuple[str, str, str, str, Any, dict[str, Any]]]]:
+        """Build the staged service calls for one battery setpoint (see _async_call_stages)."""
+        force_mode = entity_ids["mode"]
+        modbus_control_mode = entity_ids["ctrl"]
+
+        power_kind, force_option = _DIRECTION_TABLE.get(direction, _DIRECTION_TABLE[PowerDir.NEUTRAL])
+        if power_kind is None:
+            # Set to 0: clear both power registers
+            power_writes = (
+                (entity_ids["charge"], 0),
+                (entity_ids["discharge"], 0),
+            )
+        else:
+            power_writes = ((entity_ids[power_kind], power),)
+
+        # Stage 1: the Modbus control mode has to be 'forcible' before the power/mode writes.
+        # Thanks to the cache the switch is only sent on a mode transition.
+        # Stage 2: power value(s) and force mode target different registers and are sent concurrently.
+        return [
+            [("switch", "turn_on", modbus_control_mode, "state", True, {"entity_id": modbus_control_mode})],
+            [
+                *(
+                    ("number", "set_value", power_entity, "value", value, {"entity_id": power_entity, "value": value})
+                    for power_entity, value in power_writes
+                ),
+                ("select", "select_option", force_mode, "option", force_option, {"entity_id": force_mode, "option": force_option}),
+            ],
+        ]
+
+    async def _async_call_stages(self, stages, *, force: bool = False) -> bool:
+        """Run stages of cached service calls in order, the calls within a stage concurrently.
+
+        Stops after the first stage with a failing call. Raises asyncio.TimeoutError
+        if a call timed out (after the other calls of that stage have finished).
+        With force, calls are sent even if the cache says the value is already set.
+        """
+        for stage in stages:
+            results = await asyncio.gather(
+                *(
+                    self._async_call_cached(
+                        domain,
+                        service,
+                        entity_id,
+                        cache_field,
+                        cache_value,
+                        service_data,
+                        blocking=True,
+                        force=force,
+                        raise_on_timeout=True,
+                    )
+                    for domain, service, entity_id, cache_field, cache_value, service_data in stage
+                )
+            )
+            if not all(results):
+                return False
+        return True
+
+    def _schedule_all_zero(self) -> None:
+        """Set all batteries to 0W without waiting for the writes; no-op if they already are."""
+        zero = (0, PowerDir.NEUTRAL)
+        if all(self._last_battery_setpoints.get(b) == zero for b in self._battery_entities):
+            return
+        self.hass.async_create_task(self._set_all_batteries_to_zero())
 
     async def _set_all_batteries_to_zero(self):
-        """Set all configured batteries power to 0."""
+        """Set all configured batteries power to 0.
+
+        The writes are shielded: once started they complete even if the calling update is
+        cancelled (timeout, reload, shutdown), so no battery is left half switched. Each
+        service call is bounded by its own timeout in _async_call_cached.
+        """
+        await asyncio.shield(self._write_all_batteries_zero())
+
+    async def _write_all_batteries_zero(self) -> None:
         _LOGGER.debug("Setting all batteries to 0W.")
-        tasks = [self._set_battery_power(b_id, 0, 0) for b_id in self._battery_entities]
-        if not tasks:
-            return
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for res in results:
-            if isinstance(res, Exception):
-                _LOGGER.debug("Ignored error while setting batteries to 0W: %s", res)
+        # _set_battery_power logs and swallows its own errors, so one battery cannot stop the others
+        await asyncio.gather(*(self._set_battery_power(b_id, 0, 0) for b_id in self._battery_entities))
 
     async def _disable_modbus_control_mode(self, target_num_batteries: int = 1):
         """Disable Modbus RS485 control mode based on power stages and battery priority with Make-Before-Break logic.
@@ -2008,27 +2492,27 @@ class MarstekCoordinator:
 
 
         # Aktuelle Prioritätsliste IDs
-        target_ids = [b['id'] for b in self._battery_priority[:target_num_batteries]]
+        target_ids = self._priority_ids[:target_num_batteries]
+        target_id_set = set(target_ids)
 
         # 1. Bestimme, welche Batterien aktuell im Automatik-Modus sind (Modbus Switch OFF)
         current_auto_ids = []
         for b_id in self._battery_entities:
-            state = self.hass.states.get(f"switch.{b_id}_modbus_rs485_control_mode")
+            state = self.hass.states.get(self._bat_ids[b_id]["ctrl"])
             if state and state.state == "off":  # off bedeutet Automatik aktiv
                 current_auto_ids.append(b_id)
+        current_auto_id_set = set(current_auto_ids)
 
         # Batterien, die NEU in den Automatik-Modus sollen
-        to_activate_auto = [bid for bid in target_ids if bid not in current_auto_ids]
+        to_activate_auto = [bid for bid in target_ids if bid not in current_auto_id_set]
         # Batterien, die aus dem Automatik-Modus RAUS sollen (zurück auf Manual/Forcible)
-        to_deactivate_auto = [bid for bid in current_auto_ids if bid not in target_ids]
+        to_deactivate_auto = [bid for bid in current_auto_ids if bid not in target_id_set]
 
 
         # --- SCHRITT 1: Neue Batterien zuerst aktivieren ---
         if to_activate_auto:
             _LOGGER.debug("CT-Mode: Activating additional batteries for automatic mode: %s", to_activate_auto)
-            for b_id in to_activate_auto:
-                modbus_control_mode = f"switch.{b_id}_modbus_rs485_control_mode"
-                await self.hass.services.async_call("switch", "turn_off", {"entity_id": modbus_control_mode}, blocking=True)
+            await asyncio.gather(*(self._activate_automatic_mode(b_id) for b_id in to_activate_auto))
             
             # Wenn wir Batterien hinzugefügt haben, warten wir 10 Sekunden, bevor wir andere abschalten
             if to_deactivate_auto:
@@ -2038,29 +2522,57 @@ class MarstekCoordinator:
         # --- SCHRITT 2: Alte Batterien deaktivieren (auf Manual/Forcible zurücksetzen) ---
         if to_deactivate_auto:
             _LOGGER.debug("CT-Mode: Returning batteries to manual/forcible mode: %s", to_deactivate_auto)
-            for b_id in to_deactivate_auto:
-                modbus_control_mode = f"switch.{b_id}_modbus_rs485_control_mode"
-                # Erst Modbus-Steuerung wieder an
-                await self.hass.services.async_call("switch", "turn_on", {"entity_id": modbus_control_mode}, blocking=True)
-                # Dann auf 0W setzen, damit sie nicht "irgendwas" machen
-                await self._set_battery_power(b_id, 0, 0)
-
-        _LOGGER.debug(f"CT-Mode distribution finished. Active in Auto: {target_ids}")
+            await asyncio.gather(*(self._return_to_manual_mode(b_id) for b_id in to_deactivate_auto))
+
+        _LOGGER.debug("CT-Mode distribution finished. Active in Auto: %s", target_ids)
+
+    async def _activate_automatic_mode(self, base_entity_id: str) -> None:
+        """Hand a single battery over to its own (CT) automatic mode."""
+        modbus_control_mode = self._bat_ids[base_entity_id]["ctrl"]
+        # Forget the cached 'turn_on' and setpoint so the next manual write is sent again.
+        self._service_call_cache.pop(("switch", "turn_on", modbus_control_mode, "state"), None)
+        self._last_battery_setpoints.pop(base_entity_id, None)
+        await self.hass.services.async_call("switch", "turn_off", {"entity_id": modbus_control_mode}, blocking=True)
+
+    async def _return_to_manual_mode(self, base_entity_id: str) -> None:
+        """Put a single battery back into manual/forcible mode at 0W."""
+        modbus_control_mode = self._bat_ids[base_entity_id]["ctrl"]
+        # Erst Modbus-Steuerung wieder an (forced, the cache may be stale after automatic mode)
+        await self._async_call_cached(
+            "switch",
+            "turn_on",
+            modbus_control_mode,
+            "state",
+            True,
+            {"entity_id": modbus_control_mode},
+            force=True,
+        )
+        # Dann auf 0W setzen, damit sie nicht "irgendwas" machen
+        await self._set_battery_power(base_entity_id, 0, 0)
 
     def _get_effective_update_interval(self) -> int:
         """Calculate the effective update interval based on CT-Mode and wallbox activity."""
-        configured_interval = self.config.get(CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS, 60)
+        configured_interval = self._cfg_update_interval
+        interval_inputs = (bool(self._ct_mode), bool(self._wallbox_is_active), configured_interval)
+
+        # Only re-evaluate (and log) when one of the inputs actually changed.
+        if interval_inputs == self._interval_inputs:
+            return self._effective_interval
         
         # In CT-Mode, use 10s unless wallbox is active
         if self._ct_mode:
             if self._wallbox_is_active:
                 # Wallbox is in control, keep configured interval
-                _LOGGER.debug(f"CT-Mode: Wallbox active, using configured interval ({configured_interval}s)")
-                return configured_interval
+                _LOGGER.debug("CT-Mode: Wallbox active, using configured interval (%ss)", configured_interval)
+                effective_interval = configured_interval
             else:
                 # No wallbox activity, use 10s refresh rate
                 _LOGGER.debug("CT-Mode: No wallbox activity, using 10s refresh rate")
-                return 10
+                effective_interval = 10
         else:
             # Normal mode: use configured interval
-            return configured_interval
+            effective_interval = configured_interval
+
+        self._interval_inputs = interval_inputs
+        self._effective_interval = effective_interval
+        return effective_interval
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from operator import attrgetter
 from typing import Any, Callable
 
 from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
@@ -13,7 +14,7 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 
-from .const import DOMAIN, SIGNAL_DIAGNOSTICS_UPDATED
+from .const import DOMAIN
 from .coordinator import MarstekCoordinator
 
 
@@ -26,145 +27,145 @@ DIAGNOSTIC_SENSORS: tuple[DiagnosticSensorDescription, ...] = (
     DiagnosticSensorDescription(
         key="is_running",
         name="Is Running",
-        value_fn=lambda c: c.is_running,
+        value_fn=attrgetter("is_running"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="allow_charging",
         name="Allow Charging",
-        value_fn=lambda c: c._allow_charging,
+        value_fn=attrgetter("_allow_charging"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="allow_discharging",
         name="Allow Discharging",
-        value_fn=lambda c: c._allow_discharging,
+        value_fn=attrgetter("_allow_discharging"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="service_call_cache_entries",
         name="Service Call Cache Entries",
-        value_fn=lambda c: c.service_call_cache_size,
+        value_fn=attrgetter("service_call_cache_size"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_cable_plugged_in",
         name="Wallbox Plugged In",
-        value_fn=lambda c: c.wallbox_cable_was_on,
+        value_fn=attrgetter("wallbox_cable_was_on"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_charge_paused",
         name="Wallbox: Batterie charging paused for carcharging",
-        value_fn=lambda c: c.wallbox_charge_paused,
+        value_fn=attrgetter("wallbox_charge_paused"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_power_is_stable",
         name="Wallbox Power is stable",
-        value_fn=lambda c: c.wallbox_power_is_stable,
+        value_fn=attrgetter("wallbox_power_is_stable"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_min_power",
         name="Wallbox Min Power (Stability Check)",
-        value_fn=lambda c: c.wallbox_min_power,
+        value_fn=attrgetter("wallbox_min_power"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_max_power",
         name="Wallbox Max Power (Stability Check)",
-        value_fn=lambda c: c.wallbox_max_power,
+        value_fn=attrgetter("wallbox_max_power"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_power_difference",
         name="Wallbox Power Difference (Stability Check)",
-        value_fn=lambda c: c.wallbox_power_difference,
+        value_fn=attrgetter("wallbox_power_difference"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_free_power",
         name="Wallbox Min Free Power (Stability Check)",
-        value_fn=lambda c: c.wallbox_free_power,
+        value_fn=attrgetter("wallbox_free_power"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_wait_start",
         name="Wallbox Wait Start",
-        value_fn=lambda c: c.wallbox_wait_start,
+        value_fn=attrgetter("wallbox_wait_start"),
         device_class=SensorDeviceClass.TIMESTAMP,
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_start_delay_end",
         name="Wallbox Start Delay End",
-        value_fn=lambda c: c.wallbox_start_delay_end,
+        value_fn=attrgetter("wallbox_start_delay_end"),
         device_class=SensorDeviceClass.TIMESTAMP,
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_cooldown_end",
         name="Wallbox Cooldown End",
-        value_fn=lambda c: c.wallbox_cooldown_end,
+        value_fn=attrgetter("wallbox_cooldown_end"),
         device_class=SensorDeviceClass.TIMESTAMP,
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="wallbox_stabilization_start",
         name="Wallbox Stabilization Start",
-        value_fn=lambda c: c.wallbox_stabilization_start,
+        value_fn=attrgetter("wallbox_stabilization_start"),
         device_class=SensorDeviceClass.TIMESTAMP,
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="battery_priority",
         name="Battery Priority",
-        value_fn=lambda c: c.battery_priority_ids,
+        value_fn=attrgetter("battery_priority_ids"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="priority_next_update",
         name="Priority Next Update",
-        value_fn=lambda c: c.priority_next_update,
+        value_fn=attrgetter("priority_next_update"),
         device_class=SensorDeviceClass.TIMESTAMP,
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="priority_rate_limit_end",
         name="Priority Rate Limit End",
-        value_fn=lambda c: c.priority_rate_limit_end,
+        value_fn=attrgetter("priority_rate_limit_end"),
         device_class=SensorDeviceClass.TIMESTAMP,
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="last_power_direction",
         name="Last Power Direction",
-        value_fn=lambda c: c.last_power_direction_name,
+        value_fn=attrgetter("last_power_direction_name"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="below_min_charge_count",
         name="Below Min Charge Count",
-        value_fn=lambda c: c.below_min_charge_count,
+        value_fn=attrgetter("below_min_charge_count"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="below_min_discharge_count",
         name="Below Min Discharge Count",
-        value_fn=lambda c: c.below_min_discharge_count,
+        value_fn=attrgetter("below_min_discharge_count"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="pid_integral",
         name="PID Integral",
-        value_fn=lambda c: c.pid_integral,
+        value_fn=attrgetter("pid_integral"),
         has_entity_name=True,
     ),
     DiagnosticSensorDescription(
         key="pid_prev_error",
         name="PID Previous Error",
-        value_fn=lambda c: c.pid_prev_error,
+        value_fn=attrgetter("pid_prev_error"),
         has_entity_name=True,
     ),
 )
@@ -177,56 +178,55 @@ async def async_setup_entry(
 ) -> None:
     coordinator: MarstekCoordinator = hass.data[DOMAIN][entry.entry_id]
 
+    device_info = DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        name="Marstek Venus HA",
+    )
     async_add_entities(
-        MarstekDiagnosticSensor(coordinator, entry, description)
-        for description in DIAGNOSTIC_SENSORS
+        [
+            MarstekDiagnosticSensor(coordinator, entry, description, device_info)
+            for description in DIAGNOSTIC_SENSORS
+        ]
     )
 
 
 class MarstekDiagnosticSensor(SensorEntity):
     _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_has_entity_name = True
 
     def __init__(
         self,
         coordinator: MarstekCoordinator,
         entry: ConfigEntry,
         description: DiagnosticSensorDescription,
+        device_info: DeviceInfo,
     ) -> None:
         self._coordinator = coordinator
         self._entry = entry
         self.entity_description = description
 
         self._attr_unique_id = f"{entry.entry_id}_diag_{description.key}"
-        self._attr_has_entity_name = True
-        self._attr_name = description.name
-        self._attr_device_class = description.device_class
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._entry.entry_id)},
-            name="Marstek Venus HA",
-        )
+        self._attr_device_info = device_info
 
     @property
     def available(self) -> bool:
         return self._coordinator.is_running
 
-    @property
-    def native_value(self) -> Any:
-        if self.entity_description.value_fn is None:
-            return None
-        return self.entity_description.value_fn(self._coordinator)
-
     async def async_added_to_hass(self) -> None:
+        key = self.entity_description.key
+        if self.entity_description.value_fn is not None:
+            self._coordinator.register_diagnostic(key, self.entity_description.value_fn)
+            self._attr_native_value = self.entity_description.value_fn(self._coordinator)
         self.async_on_remove(
             async_dispatcher_connect(
                 self.hass,
-                SIGNAL_DIAGNOSTICS_UPDATED,
+                self._coordinator.diagnostic_signal(key),
                 self._handle_coordinator_update,
             )
         )
 
     @callback
     def _handle_coordinator_update(self) -> None:
+        # The coordinator only signals changed values; reuse the value it already computed
+        self._attr_native_value = self._coordinator.diagnostic_value(self.entity_description.key)
         self.async_write_ha_state()
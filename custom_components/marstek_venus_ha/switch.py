@@ -1,81 +1,46 @@
-from datetime import datetime
+import math
+from operator import attrgetter
 
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import callback
-from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from .coordinator import MarstekCoordinator, PowerDir
-from .const import DOMAIN, SIGNAL_DIAGNOSTICS_UPDATED
+from .const import DOMAIN
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
     coordinator = hass.data[DOMAIN][entry.entry_id]
-    async_add_entities([ChargingSwitch(entry, coordinator), DischargingSwitch(entry, coordinator), WallboxPrioritySwitch(entry, coordinator), BlockDischargingCCSwitch(entry, coordinator)])
+    device_info = DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        name="Marstek Venus HA",
+    )
+    async_add_entities(
+        [
+            switch_cls(entry, coordinator, device_info)
+            for switch_cls in (ChargingSwitch, DischargingSwitch, WallboxPrioritySwitch, BlockDischargingCCSwitch)
+        ]
+    )
 
 
-class ChargingSwitch(SwitchEntity):
-    def __init__(self, entry: ConfigEntry, data_object: MarstekCoordinator):
-        self._entry = entry
-        self._data = data_object
-        self._attr_name = "Allow Charging"
-        self._attr_unique_id = f"{entry.entry_id}_charging_switch"
-
-    @property
-    def available(self) -> bool:
-        return bool(self._data.is_running)
-
-    @property
-    def is_on(self) -> bool:
-        return bool(self._data._allow_charging)
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._entry.entry_id)},
-            name="Marstek Venus HA",
-        )
-
-    async def async_added_to_hass(self) -> None:
-        self.async_on_remove(
-            async_dispatcher_connect(
-                self.hass,
-                SIGNAL_DIAGNOSTICS_UPDATED,
-                self._handle_coordinator_update,
-            )
-        )
-
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-
-    async def async_turn_on(self, **kwargs):
-        self._data._allow_charging = True
-        await self._data.async_save_settings()
-        self._data._battery_priority = []  # Clear battery priority to force recalculation on next update
-        self._data._last_power_direction = PowerDir.NEUTRAL  # Reset power direction to force recalculation
-        self.async_write_ha_state()
-        async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
-        if hasattr(self._data, "async_request_update"):
-            self.hass.async_create_task(self._data.async_request_update(reason="switch_toggle"))
+class MarstekSettingSwitch(SwitchEntity):
+    """Switch for a persisted boolean setting of the coordinator.
 
-    async def async_turn_off(self, **kwargs):
-        self._data._allow_charging = False
-        await self._data.async_save_settings()
-        self._data._battery_priority = []  # Clear battery priority to force recalculation on next update
-        self._data._last_power_direction = PowerDir.NEUTRAL  # Reset power direction to force recalculation
-        self.async_write_ha_state()
-        async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
-        if hasattr(self._data, "async_request_update"):
-            self.hass.async_create_task(self._data.async_request_update(reason="switch_toggle"))
+    Subclasses set the coordinator attribute (_setting), name and unique id suffix,
+    and may override _apply_side_effects for extra state resets.
+    """
 
+    _setting: str
+    _unique_id_suffix: str
 
-class DischargingSwitch(SwitchEntity):
-    def __init__(self, entry: ConfigEntry, data_object: MarstekCoordinator):
+    def __init__(self, entry: ConfigEntry, data_object: MarstekCoordinator, device_info: DeviceInfo):
         self._entry = entry
         self._data = data_object
-        self._attr_name = "Allow Discharging"
-        self._attr_unique_id = f"{entry.entry_id}_discharging_switch"
+        self._attr_unique_id = f"{entry.entry_id}_{self._unique_id_suffix}"
+        self._attr_device_info = device_info
+        # Diagnostic key is the setting name without the leading underscore
+        self._diagnostic_key = self._setting.lstrip("_")
 
     @property
     def available(self) -> bool:
@@ -83,20 +48,14 @@ class DischargingSwitch(SwitchEntity):
 
     @property
     def is_on(self) -> bool:
-        return bool(self._data._allow_discharging)
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._entry.entry_id)},
-            name="Marstek Venus HA",
-        )
+        return bool(getattr(self._data, self._setting))
 
     async def async_added_to_hass(self) -> None:
+        self._data.register_diagnostic(self._diagnostic_key, attrgetter(self._setting))
         self.async_on_remove(
             async_dispatcher_connect(
                 self.hass,
-                SIGNAL_DIAGNOSTICS_UPDATED,
+                self._data.diagnostic_signal(self._diagnostic_key),
                 self._handle_coordinator_update,
             )
         )
@@ -106,133 +65,61 @@ class DischargingSwitch(SwitchEntity):
         self.async_write_ha_state()
 
     async def async_turn_on(self, **kwargs):
-        self._data._allow_discharging = True
-        await self._data.async_save_settings()
-        self._data._battery_priority = []  # Clear battery priority to force recalculation on next update
-        self._data._last_power_direction = PowerDir.NEUTRAL  # Reset power direction to force recalculation
-        self.async_write_ha_state()
-        async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
-        if hasattr(self._data, "async_request_update"):
-            self.hass.async_create_task(self._data.async_request_update(reason="switch_toggle"))
+        await self._async_set(True)
 
     async def async_turn_off(self, **kwargs):
-        self._data._allow_discharging = False
-        await self._data.async_save_settings()
-        self._data._battery_priority = []  # Clear battery priority to force recalculation on next update
-        self._data._last_power_direction = PowerDir.NEUTRAL  # Reset power direction to force recalculation
-        self.async_write_ha_state()
-        async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
-        if hasattr(self._data, "async_request_update"):
-            self.hass.async_create_task(self._data.async_request_update(reason="switch_toggle"))
-
-class WallboxPrioritySwitch(SwitchEntity):
-    def __init__(self, entry: ConfigEntry, data_object: MarstekCoordinator):
-        self._entry = entry
-        self._data = data_object
-        self._attr_name = "Wallbox Priority"
-        self._attr_unique_id = f"{entry.entry_id}_wallbox_priority_switch"
-
-    @property
-    def available(self) -> bool:
-        return bool(self._data.is_running)
-
-    @property
-    def is_on(self) -> bool:
-        return bool(self._data._wallbox_priority)
+        await self._async_set(False)
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._entry.entry_id)},
-            name="Marstek Venus HA",
-        )
+    async def _async_set(self, value: bool) -> None:
+        if bool(getattr(self._data, self._setting)) == value:
+            return  # Nothing changes, skip save, resets and the forced update
+        setattr(self._data, self._setting, value)
+        await self._data.async_save_settings()
+        self._apply_side_effects(value)
+        self._data.async_schedule_diagnostics()
+        await self._data.async_request_switch_update()
 
-    async def async_added_to_hass(self) -> None:
-        self.async_on_remove(
-            async_dispatcher_connect(
-                self.hass,
-                SIGNAL_DIAGNOSTICS_UPDATED,
-                self._handle_coordinator_update,
-            )
-        )
+    def _apply_side_effects(self, value: bool) -> None:
+        """Reset coordinator state that depends on this setting."""
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
 
-    async def async_turn_on(self, **kwargs):
-        self._data._wallbox_priority = True
-        await self._data.async_save_settings()
-        self._data._wallbox_wait_start = None  # Reset wallbox wait timer to allow immediate priority
-        self._data._last_wallbox_pause_attempt = datetime.min  # Reset last pause attempt to allow immediate action
-        self._data._wallbox_power_history.clear()  # Clear power history to allow immediate stability assessment
-        self._data._wallbox_power_is_stable = False  # Reset stability flag to force reassessment
-        self._data._wallbox_stabilization_start = None  # Reset stabilization timer
-        self.async_write_ha_state()
-        async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
-        if hasattr(self._data, "async_request_update"):
-            self.hass.async_create_task(self._data.async_request_update(reason="switch_toggle"))
+class ChargingSwitch(MarstekSettingSwitch):
+    _setting = "_allow_charging"
+    _unique_id_suffix = "charging_switch"
+    _attr_name = "Allow Charging"
 
-    async def async_turn_off(self, **kwargs):
-        self._data._wallbox_priority = False
-        await self._data.async_save_settings()
-        self._data._wallbox_charge_paused = False  # Release Batteries from blockade
-        self._data._last_wallbox_pause_attempt = datetime.min  # Reset last pause attempt to allow immediate action
-        self._data._wallbox_power_history.clear()  # Clear power history to allow immediate stability assessment
-        self._data._wallbox_power_is_stable = False  # Reset stability flag to force reassessment
-        self._data._wallbox_stabilization_start = None  # Reset stabilization timer
-        self.async_write_ha_state()
-        async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
-        if hasattr(self._data, "async_request_update"):
-            self.hass.async_create_task(self._data.async_request_update(reason="switch_toggle"))
+    def _apply_side_effects(self, value: bool) -> None:
+        self._data._priority_ids = ()  # Clear battery priority to force recalculation on next update
+        self._data._last_power_direction = PowerDir.NEUTRAL  # Reset power direction to force recalculation
 
-class BlockDischargingCCSwitch(SwitchEntity):
-    def __init__(self, entry: ConfigEntry, data_object: MarstekCoordinator):
-        self._entry = entry
-        self._data = data_object
-        self._attr_name = "Block discharging while carcharging"
-        self._attr_unique_id = f"{entry.entry_id}_block_discharging_cc_switch"
 
-    @property
-    def available(self) -> bool:
-        return bool(self._data.is_running)
+class DischargingSwitch(MarstekSettingSwitch):
+    _setting = "_allow_discharging"
+    _unique_id_suffix = "discharging_switch"
+    _attr_name = "Allow Discharging"
 
-    @property
-    def is_on(self) -> bool:
-        return bool(self._data._block_discharging_while_carcharging)
+    def _apply_side_effects(self, value: bool) -> None:
+        self._data._priority_ids = ()  # Clear battery priority to force recalculation on next update
+        self._data._last_power_direction = PowerDir.NEUTRAL  # Reset power direction to force recalculation
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._entry.entry_id)},
-            name="Marstek Venus HA",
-        )
 
-    async def async_added_to_hass(self) -> None:
-        self.async_on_remove(
-            async_dispatcher_connect(
-                self.hass,
-                SIGNAL_DIAGNOSTICS_UPDATED,
-                self._handle_coordinator_update,
-            )
-        )
+class WallboxPrioritySwitch(MarstekSettingSwitch):
+    _setting = "_wallbox_priority"
+    _unique_id_suffix = "wallbox_priority_switch"
+    _attr_name = "Wallbox Priority"
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
+    def _apply_side_effects(self, value: bool) -> None:
+        if value:
+            self._data._wallbox_wait_start_mono = None  # Reset wallbox wait timer to allow immediate priority
+        else:
+            self._data._wallbox_charge_paused = False  # Release Batteries from blockade
+        self._data._last_wallbox_pause_attempt_mono = -math.inf  # Reset last pause attempt to allow immediate action
+        self._data._wallbox_power_history.clear()  # Clear power history to allow immediate stability assessment
+        self._data._wallbox_power_is_stable = False  # Reset stability flag to force reassessment
+        self._data._wallbox_stabilization_start_mono = None  # Reset stabilization timer
 
-    async def async_turn_on(self, **kwargs):
-        self._data._block_discharging_while_carcharging = True
-        await self._data.async_save_settings()
-        self.async_write_ha_state()
-        async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
-        if hasattr(self._data, "async_request_update"):
-            self.hass.async_create_task(self._data.async_request_update(reason="switch_toggle"))
 
-    async def async_turn_off(self, **kwargs):
-        self._data._block_discharging_while_carcharging = False
-        await self._data.async_save_settings()
-        self.async_write_ha_state()
-        async_dispatcher_send(self.hass, SIGNAL_DIAGNOSTICS_UPDATED)
-        if hasattr(self._data, "async_request_update"):
-            self.hass.async_create_task(self._data.async_request_update(reason="switch_toggle"))
\ No newline at end of file
+class BlockDischargingCCSwitch(MarstekSettingSwitch):
+    _setting = "_block_discharging_while_carcharging"
+    _unique_id_suffix = "block_discharging_cc_switch"
+    _attr_name = "Block discharging while carcharging"
@@ -1,7 +1,11 @@
+import asyncio
 import sys
 import types
+from datetime import datetime, timezone
 from pathlib import Path
 
+import pytest
+
 
 def _install_homeassistant_stubs() -> None:
     """Install minimal Home Assistant stubs so unit tests can import the integration.
@@ -14,6 +18,11 @@ def _install_homeassistant_stubs() -> None:
     config_entries = types.ModuleType("homeassistant.config_entries")
     helpers = types.ModuleType("homeassistant.helpers")
     helpers_event = types.ModuleType("homeassistant.helpers.event")
+    helpers_debounce = types.ModuleType("homeassistant.helpers.debounce")
+    helpers_dispatcher = types.ModuleType("homeassistant.helpers.dispatcher")
+    helpers_storage = types.ModuleType("homeassistant.helpers.storage")
+    util = types.ModuleType("homeassistant.util")
+    util_dt = types.ModuleType("homeassistant.util.dt")
     ha_const = types.ModuleType("homeassistant.const")
 
     class HomeAssistant:  # pragma: no cover
@@ -36,6 +45,42 @@ def _install_homeassistant_stubs() -> None:
     def async_track_state_change_event(*args, **kwargs):  # pragma: no cover
         return None
 
+    def async_track_time_interval(*args, **kwargs):  # pragma: no cover
+        return None
+
+    def async_call_later(*args, **kwargs):  # pragma: no cover
+        return None
+
+    class Debouncer:  # pragma: no cover
+        def __init__(self, hass, logger, *, cooldown, immediate, function=None):
+            self.function = function
+
+        async def async_call(self):
+            if self.function is not None:
+                await self.function()
+
+        def async_cancel(self):
+            pass
+
+    def async_dispatcher_connect(*args, **kwargs):  # pragma: no cover
+        return lambda: None
+
+    def async_dispatcher_send(*args, **kwargs):  # pragma: no cover
+        return None
+
+    class Store:  # pragma: no cover
+        def __init__(self, hass, version, key):
+            self.key = key
+
+        async def async_load(self):
+            return None
+
+        async def async_save(self, data):
+            pass
+
+    def now(time_zone=None):  # pragma: no cover
+        return datetime.now(time_zone or util_dt.DEFAULT_TIME_ZONE)
+
     core.HomeAssistant = HomeAssistant
     core.State = State
     core.callback = callback
@@ -44,6 +89,19 @@ def _install_homeassistant_stubs() -> None:
 
     helpers.event = helpers_event
     helpers_event.async_track_state_change_event = async_track_state_change_event
+    helpers_event.async_track_time_interval = async_track_time_interval
+    helpers_event.async_call_later = async_call_later
+    helpers.debounce = helpers_debounce
+    helpers_debounce.Debouncer = Debouncer
+    helpers.dispatcher = helpers_dispatcher
+    helpers_dispatcher.async_dispatcher_connect = async_dispatcher_connect
+    helpers_dispatcher.async_dispatcher_send = async_dispatcher_send
+    helpers.storage = helpers_storage
+    helpers_storage.Store = Store
+
+    util.dt = util_dt
+    util_dt.DEFAULT_TIME_ZONE = timezone.utc
+    util_dt.now = now
 
     ha_const.STATE_UNAVAILABLE = "unavailable"
     ha_const.STATE_UNKNOWN = "unknown"
@@ -54,6 +112,11 @@ def _install_homeassistant_stubs() -> None:
     sys.modules.setdefault("homeassistant.config_entries", config_entries)
     sys.modules.setdefault("homeassistant.helpers", helpers)
     sys.modules.setdefault("homeassistant.helpers.event", helpers_event)
+    sys.modules.setdefault("homeassistant.helpers.debounce", helpers_debounce)
+    sys.modules.setdefault("homeassistant.helpers.dispatcher", helpers_dispatcher)
+    sys.modules.setdefault("homeassistant.helpers.storage", helpers_storage)
+    sys.modules.setdefault("homeassistant.util", util)
+    sys.modules.setdefault("homeassistant.util.dt", util_dt)
     sys.modules.setdefault("homeassistant.const", ha_const)
 
 
@@ -63,3 +126,11 @@ _install_homeassistant_stubs()
 _repo_root = Path(__file__).resolve().parents[1]
 if str(_repo_root) not in sys.path:
     sys.path.insert(0, str(_repo_root))
+
+
+@pytest.fixture(scope="session")
+def loop():
+    """One event loop for the whole session instead of asyncio.run() per call."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
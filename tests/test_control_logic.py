@@ -1,4 +1,7 @@
 import asyncio
+import types
+
+from homeassistant.core import State
 
 from custom_components.marstek_venus_ha.coordinator import (
     MarstekCoordinator,
@@ -9,23 +12,57 @@ from custom_components.marstek_venus_ha.const import (
     CONF_MAX_DISCHARGE_POWER,
     CONF_MIN_CONSUMPTION,
     CONF_MIN_SURPLUS,
+    CONF_MIN_SOC,
+    CONF_MAX_SOC,
     CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING,
     CONF_POWER_STAGE_CHARGE_1,
     CONF_POWER_STAGE_CHARGE_2,
     CONF_POWER_STAGE_DISCHARGE_1,
     CONF_POWER_STAGE_DISCHARGE_2,
     CONF_POWER_STAGE_OFFSET,
+    CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS,
+    CONF_PRIORITY_INTERVAL,
+    CONF_WALLBOX_RETRY_MINUTES,
+    CONF_WALLBOX_START_DELAY_SECONDS,
+    DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS,
+    DEFAULT_WALLBOX_START_DELAY_SECONDS,
 )
 
 
+class _States:
+    """Minimal hass.states: entity id -> state string."""
+
+    def __init__(self, states: dict[str, str]):
+        self._states = states
+
+    def get(self, entity_id: str):
+        value = self._states.get(entity_id)
+        return None if value is None else State(value)
+
+
 def _mk_coordinator_for_control_logic(*, config: dict, battery_entities: list[str]):
     c = MarstekCoordinator.__new__(MarstekCoordinator)
+    # Idle batteries at 50% SoC, well inside the default SoC limits
+    states = {}
+    for b in battery_entities:
+        states[f"sensor.{b}_ac_power"] = "0"
+        states[f"sensor.{b}_battery_soc"] = "50"
+    c.hass = types.SimpleNamespace(states=_States(states))
     c.config = dict(config)
+    c._reload_config()
     c._battery_entities = list(battery_entities)
-    c._battery_priority = [{"id": b, "soc": 50.0} for b in battery_entities]
+    c._bat_ids = MarstekCoordinator._build_battery_entity_map(c._battery_entities)
+    c._battery_locks = {b: asyncio.Lock() for b in c._battery_entities}
+    c._zero_calls = {
+        b: MarstekCoordinator._build_power_calls(ids, 0, PowerDir.NEUTRAL) for b, ids in c._bat_ids.items()
+    }
+    c._priority_ids = tuple(battery_entities)
     c._below_min_charge_count = 0
     c._below_min_discharge_count = 0
     c._below_min_cycles_to_zero = config.get(CONF_MAX_LIMIT_BREACHES_BEFORE_ZEROING, 10)
+    c._last_battery_setpoints = {}
+    c._keepalive_index = 0
+    c._tick_cache = None
 
     async def _noop_async(*args, **kwargs):
         return None
@@ -36,6 +73,34 @@ def _mk_coordinator_for_control_logic(*, config: dict, battery_entities: list[st
     return c
 
 
+async def _distribute_n_times(c, n: int, power: float) -> None:
+    for _ in range(n):
+        await c._distribute_power(power=power, target_num_batteries=1)
+
+
+def test_reload_config_coerces_timing_options(loop):
+    c = _mk_coordinator_for_control_logic(
+        config={
+            CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS: "5",
+            CONF_PRIORITY_INTERVAL: "2",
+            CONF_WALLBOX_RETRY_MINUTES: 3,
+            CONF_WALLBOX_START_DELAY_SECONDS: "soon",
+        },
+        battery_entities=["b1"],
+    )
+
+    assert c._cfg_update_interval == 5
+    assert c._cfg_priority_interval_seconds == 120.0
+    assert c._cfg_wallbox_retry_seconds == 180
+    assert c._cfg_wallbox_start_delay == DEFAULT_WALLBOX_START_DELAY_SECONDS
+    assert c._wallbox_enabled is False
+    assert loop.run_until_complete(c._handle_wallbox_logic(-500.0)) is False
+
+    c.config = {CONF_COORDINATOR_UPDATE_INTERVAL_SECONDS: "fast"}
+    c._reload_config()
+    assert c._cfg_update_interval == DEFAULT_COORDINATOR_UPDATE_INTERVAL_SECONDS
+
+
 def test_get_desired_number_of_batteries_charge_upshift_from_single():
     c = _mk_coordinator_for_control_logic(
         config={
@@ -47,12 +112,11 @@ def test_get_desired_number_of_batteries_charge_upshift_from_single():
     )
     c._last_power_direction = PowerDir.CHARGE
 
-    # No batteries currently active
-    c._get_float_state = lambda entity_id: 0.0
-
-    assert c._get_desired_number_of_batteries(1700) == 1
-    assert c._get_desired_number_of_batteries(2000) == 2
-    assert c._get_desired_number_of_batteries(3800) == 3
+    # No batteries currently active (idle at 50% SoC, so the SoC caps do not force an upshift);
+    # a negative power is a surplus to charge from.
+    assert c._get_desired_number_of_batteries(-1700) == 1
+    assert c._get_desired_number_of_batteries(-2000) == 2
+    assert c._get_desired_number_of_batteries(-3800) == 3
 
 
 def test_get_desired_number_of_batteries_discharge_hysteresis_hold_two():
@@ -72,7 +136,7 @@ def test_get_desired_number_of_batteries_discharge_hysteresis_hold_two():
             return 50.0
         return 0.0
 
-    c._get_float_state = _float_state
+    c._fast_float = _float_state
 
     # With two active batteries, stay at 2 within hysteresis band:
     # stage1-offset=1300 and stage2+offset=2100
@@ -86,7 +150,43 @@ def test_get_desired_number_of_batteries_discharge_hysteresis_hold_two():
     assert c._get_desired_number_of_batteries(2200) == 3
 
 
-def test_distribute_power_caps_per_battery_to_configured_max_charge_power():
+def test_get_desired_number_of_batteries_missing_stages_use_defaults():
+    c = _mk_coordinator_for_control_logic(
+        config={CONF_POWER_STAGE_OFFSET: 100},
+        battery_entities=["b1", "b2", "b3"],
+    )
+    c._last_power_direction = PowerDir.DISCHARGE
+    # Three batteries currently active
+    c._fast_float = lambda entity_id: 50.0 if entity_id.endswith("_ac_power") else 0.0
+
+    # Default discharge stages 1400/2000: stay at 3 above stage2-offset, step down below it
+    assert c._get_desired_number_of_batteries(2500) == 3
+    assert c._get_desired_number_of_batteries(1500) == 2
+    assert c._get_desired_number_of_batteries(1000) == 1
+
+
+def test_is_steady_state_breaks_when_driven_battery_reaches_soc_limit():
+    c = _mk_coordinator_for_control_logic(
+        config={CONF_MIN_SOC: 15, CONF_MAX_SOC: 95},
+        battery_entities=["b1", "b2"],
+    )
+    c._wallbox_charge_paused = False
+    c._last_power_direction = PowerDir.CHARGE
+    c._last_real_power = -1000.0
+    c._last_battery_setpoints = {"b1": (1000, PowerDir.CHARGE), "b2": (0, PowerDir.NEUTRAL)}
+    socs = {"sensor.b1_battery_soc": 90.0, "sensor.b2_battery_soc": 99.0}
+    c._fast_float = lambda entity_id: socs.get(entity_id, 0.0)
+
+    # b2 is above max SoC but idle: the last pass still applies
+    assert c._is_steady_state(-1001.0) is True
+
+    # The charging battery reached max SoC: run a full pass to exclude it
+    socs["sensor.b1_battery_soc"] = 95.0
+    c._tick_cache = None
+    assert c._is_steady_state(-1001.0) is False
+
+
+def test_distribute_power_caps_per_battery_to_configured_max_charge_power(loop):
     calls: list[tuple[str, int, int]] = []
 
     c = _mk_coordinator_for_control_logic(
@@ -99,7 +199,7 @@ def test_distribute_power_caps_per_battery_to_configured_max_charge_power():
         },
         battery_entities=["b1", "b2"],
     )
-    c._battery_priority = [{"id": "b1", "soc": 50.0}, {"id": "b2", "soc": 40.0}]
+    c._priority_ids = ("b1", "b2")
     c._last_power_direction = PowerDir.CHARGE
 
     async def _set_battery_power(base_entity_id: str, power: int, direction: int):
@@ -108,13 +208,13 @@ def test_distribute_power_caps_per_battery_to_configured_max_charge_power():
     c._set_battery_power = _set_battery_power
 
     # abs_power=6000, 2 active batteries => 3000 each, but cap to max_charge_power=2500
-    asyncio.run(c._distribute_power(power=6000.0, target_num_batteries=2))
+    loop.run_until_complete(c._distribute_power(power=6000.0, target_num_batteries=2))
 
     assert ("b1", 2500, PowerDir.CHARGE) in calls
     assert ("b2", 2500, PowerDir.CHARGE) in calls
 
 
-def test_distribute_power_below_min_threshold_only_zeros_after_n_cycles():
+def test_distribute_power_below_min_threshold_only_zeros_after_n_cycles(loop):
     zero_calls: list[object] = []
     set_calls: list[tuple[str, int, int]] = []
 
@@ -128,7 +228,7 @@ def test_distribute_power_below_min_threshold_only_zeros_after_n_cycles():
         },
         battery_entities=["b1"],
     )
-    c._battery_priority = [{"id": "b1", "soc": 50.0}]
+    c._priority_ids = ("b1",)
     c._last_power_direction = PowerDir.CHARGE
 
     async def _set_all_batteries_to_zero():
@@ -141,22 +241,21 @@ def test_distribute_power_below_min_threshold_only_zeros_after_n_cycles():
     c._set_battery_power = _set_battery_power
 
     # Below threshold cycles should not trigger immediate zeroing
-    for _ in range(c._below_min_cycles_to_zero - 1):
-        asyncio.run(c._distribute_power(power=100.0, target_num_batteries=1))
+    loop.run_until_complete(_distribute_n_times(c, c._below_min_cycles_to_zero - 1, 100.0))
 
     assert len(zero_calls) == 0
     assert c._below_min_charge_count == c._below_min_cycles_to_zero - 1
 
     # Next cycle should trigger zero and reset counter
     set_calls.clear()
-    asyncio.run(c._distribute_power(power=100.0, target_num_batteries=1))
+    loop.run_until_complete(c._distribute_power(power=100.0, target_num_batteries=1))
 
     assert len(zero_calls) == 1
     assert c._below_min_charge_count == 0
     assert set_calls == []
 
 
-def test_distribute_power_resets_below_min_counters_when_above_threshold():
+def test_distribute_power_resets_below_min_counters_when_above_threshold(loop):
     c = _mk_coordinator_for_control_logic(
         config={
             CONF_MAX_CHARGE_POWER: 2500,
@@ -167,7 +266,7 @@ def test_distribute_power_resets_below_min_counters_when_above_threshold():
         },
         battery_entities=["b1"],
     )
-    c._battery_priority = [{"id": "b1", "soc": 50.0}]
+    c._priority_ids = ("b1",)
     c._last_power_direction = PowerDir.CHARGE
 
     async def _noop_async(*args, **kwargs):
@@ -177,13 +276,12 @@ def test_distribute_power_resets_below_min_counters_when_above_threshold():
     c._set_battery_power = _noop_async
 
     # Build up some below-min count
-    for _ in range(3):
-        asyncio.run(c._distribute_power(power=100.0, target_num_batteries=1))
+    loop.run_until_complete(_distribute_n_times(c, 3, 100.0))
 
     assert c._below_min_charge_count == 3
 
     # Above threshold should reset
-    asyncio.run(c._distribute_power(power=300.0, target_num_batteries=1))
+    loop.run_until_complete(c._distribute_power(power=300.0, target_num_batteries=1))
 
     assert c._below_min_charge_count == 0
     assert c._below_min_discharge_count == 0
@@ -0,0 +1,30 @@
+from collections import deque
+
+import pytest
+
+from custom_components.marstek_venus_ha.coordinator import MovingAverage
+
+
+def test_moving_average_matches_full_scan_of_window():
+    window = MovingAverage(3)
+    reference: deque[float] = deque(maxlen=3)
+
+    for value in [500.0, -1200.0, 900.5, 100.0, 100.0, 2000.0, 50.0]:
+        window.append(value)
+        reference.append(value)
+
+        assert len(window) == len(reference)
+        assert window.average == pytest.approx(sum(reference) / len(reference))
+
+
+def test_moving_average_clear_resets_length():
+    window = MovingAverage(2)
+    window.append(1.0)
+    window.append(2.0)
+    assert len(window) == window.maxlen
+
+    window.clear()
+
+    assert len(window) == 0
+    window.append(5.0)
+    assert window.average == 5.0
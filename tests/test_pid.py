@@ -1,4 +1,15 @@
-from custom_components.marstek_venus_ha.coordinator import MarstekCoordinator
+import random
+
+import pytest
+
+from custom_components.marstek_venus_ha.const import (
+    CONF_PID_DEADBAND,
+    CONF_PID_KD,
+    CONF_PID_KI,
+    CONF_PID_KP,
+    CONF_PID_RESET_ON_ZERO_CROSSING,
+)
+from custom_components.marstek_venus_ha.coordinator import MarstekCoordinator, PowerDir
 
 
 def _mk_coordinator(*, kp=0.0, ki=1.0, kd=0.0, integral=0.0):
@@ -7,6 +18,8 @@ def _mk_coordinator(*, kp=0.0, ki=1.0, kd=0.0, integral=0.0):
     c._pid_ki = ki
     c._pid_kd = kd
     c._pid_integral = integral
+    c._pid_saturated_high = False
+    c._pid_saturated_low = False
     return c
 
 
@@ -57,7 +70,7 @@ def test_pid_apply_anti_windup_unsaturated_updates_integral_and_output():
     assert out == 6.0
 
 
-def test_pid_apply_anti_windup_saturated_positive_back_calculates_integral():
+def test_pid_apply_anti_windup_saturated_positive_clamps_integral_and_output():
     c = _mk_coordinator(kp=0.0, ki=1.0, kd=0.0, integral=0.0)
 
     out = c._pid_apply_anti_windup(
@@ -69,11 +82,13 @@ def test_pid_apply_anti_windup_saturated_positive_back_calculates_integral():
     )
 
     assert out == 10.0
-    # Tracking anti-windup should pull I such that ki*I == sat_pos
+    # I += 100 would exceed the integral clamp max(sat_pos, sat_neg) / |ki| == 10
     assert c._pid_integral == 10.0
+    # The saturated output marks the high limit, freezing further positive integration
+    assert c._pid_saturated_high is True
 
 
-def test_pid_apply_anti_windup_saturated_negative_back_calculates_integral():
+def test_pid_apply_anti_windup_saturated_negative_clamps_integral_and_output():
     c = _mk_coordinator(kp=0.0, ki=2.0, kd=0.0, integral=0.0)
 
     out = c._pid_apply_anti_windup(
@@ -85,5 +100,178 @@ def test_pid_apply_anti_windup_saturated_negative_back_calculates_integral():
     )
 
     assert out == -10.0
-    # With ki=2, we expect I to be pulled so that 2*I == -10
+    # I -= 100 is clamped to -max(sat_pos, sat_neg) / |ki| == -5
     assert c._pid_integral == -5.0
+    # The saturated output marks the low limit, freezing further negative integration
+    assert c._pid_saturated_low is True
+
+
+def test_pid_apply_anti_windup_freezes_integral_while_saturated():
+    c = _mk_coordinator(kp=0.0, ki=1.0, kd=0.0, integral=0.0)
+
+    c._pid_apply_anti_windup(error=100.0, dt=1.0, derivative=0.0, sat_pos=10.0, sat_neg=10.0)
+    assert c._pid_integral == 10.0
+
+    # Still saturated high: error in the same direction must not integrate
+    out = c._pid_apply_anti_windup(error=5.0, dt=1.0, derivative=0.0, sat_pos=10.0, sat_neg=10.0)
+    assert out == 10.0
+    assert c._pid_integral == 10.0
+
+    # Error of opposite sign unwinds the integrator immediately
+    out = c._pid_apply_anti_windup(error=-3.0, dt=1.0, derivative=0.0, sat_pos=10.0, sat_neg=10.0)
+    assert c._pid_integral == 7.0
+    assert out == 7.0
+
+
+def _mk_pid_step_coordinator(config: dict, commands: list[float]):
+    """Coordinator for _pid_control_step with a single battery; commands records the signed setpoints."""
+    c = MarstekCoordinator.__new__(MarstekCoordinator)
+    c.config = dict(config)
+    c._reload_config()
+    c._reset_pid_state()
+    c._now = 0.0
+    c._priority_ids = ("b1",)
+    c._last_power_direction = PowerDir.NEUTRAL
+    c._below_min_charge_count = 0
+    c._below_min_discharge_count = 0
+    c._last_battery_setpoints = {}
+    c._sample_batteries = lambda: {"b1": (0.0, 50.0)}
+
+    async def _noop_async(*args, **kwargs):
+        return None
+
+    async def _distribute_power(power, target_num_batteries=1, *, from_pid=False):
+        commands.append(power if c._last_power_direction == PowerDir.CHARGE else -power)
+
+    async def _set_all_batteries_to_zero():
+        commands.append(0.0)
+
+    c._update_battery_priority_if_needed = _noop_async
+    c._get_desired_number_of_batteries = lambda power: 1
+    c._distribute_power = _distribute_power
+    c._set_all_batteries_to_zero = _set_all_batteries_to_zero
+    return c
+
+
+async def _run_noisy_load(c, commands: list[float], load: float, steps: int, noise: float) -> list[float]:
+    """Simulate a constant house load with meter noise; returns the grid power seen per step."""
+    rng = random.Random(42)
+    grid_history = []
+    for _ in range(steps):
+        # Positive command = charging (adds to the grid import), negative = discharging
+        battery = commands[-1] if commands else 0.0
+        grid = load + battery + rng.uniform(-noise, noise)
+        grid_history.append(grid)
+        await c._pid_control_step(grid, grid - battery)
+        c._now += 2.0
+    return grid_history
+
+
+@pytest.mark.parametrize("reset_on_zero_crossing", [False, True])
+def test_pid_control_step_holds_noisy_steady_load_at_zero_grid_power(loop, reset_on_zero_crossing):
+    commands: list[float] = []
+    c = _mk_pid_step_coordinator(
+        {
+            CONF_PID_KP: 0.6,
+            CONF_PID_KI: 0.02,
+            CONF_PID_KD: 0.0,
+            CONF_PID_RESET_ON_ZERO_CROSSING: reset_on_zero_crossing,
+        },
+        commands,
+    )
+
+    grid_history = loop.run_until_complete(_run_noisy_load(c, commands, load=800.0, steps=400, noise=15.0))
+
+    # Noise around 0W must not wipe the integral that holds the ~800W discharge
+    settled = grid_history[200:]
+    assert abs(sum(settled) / len(settled)) < 10.0
+    assert commands[-1] == pytest.approx(-800.0, abs=40.0)
+
+
+def test_pid_control_step_resets_integral_on_large_zero_crossing(loop):
+    commands: list[float] = []
+    c = _mk_pid_step_coordinator(
+        {CONF_PID_KP: 0.6, CONF_PID_KI: 0.02, CONF_PID_KD: 0.0, CONF_PID_RESET_ON_ZERO_CROSSING: True},
+        commands,
+    )
+    c._pid_integral = -40000.0  # Integral built up while discharging
+    c._pid_prev_error = -500.0
+    c._pid_prev_mono = 0.0
+    c._now = 2.0
+
+    # Surplus of 400W (> min surplus): the stale discharge integral is dropped before integrating
+    loop.run_until_complete(c._pid_control_step(-400.0, -400.0))
+
+    assert c._pid_integral == 800.0
+    assert commands[-1] > 0
+
+
+def test_pid_control_step_skips_distribution_within_deadband(loop):
+    commands: list[float] = []
+    c = _mk_pid_step_coordinator(
+        {CONF_PID_KP: 1.0, CONF_PID_KI: 0.0, CONF_PID_KD: 0.0, CONF_PID_DEADBAND: 3}, commands
+    )
+
+    loop.run_until_complete(c._pid_control_step(500.0, 500.0))
+    assert commands == [-500.0]
+
+    # Output moves by less than the deadband (3W) in the same direction: last distribution still applies
+    loop.run_until_complete(c._pid_control_step(502.0, 502.0))
+    assert commands == [-500.0]
+    assert c._pid_last_output == -500.0
+
+
+def test_pid_control_step_distributes_on_sign_change_within_deadband(loop):
+    commands: list[float] = []
+    c = _mk_pid_step_coordinator(
+        {CONF_PID_KP: 1.0, CONF_PID_KI: 0.0, CONF_PID_KD: 0.0, CONF_PID_DEADBAND: 3}, commands
+    )
+    c._pid_last_output = -1.0
+    c._pid_last_priority_ids = ("b1",)
+
+    loop.run_until_complete(c._pid_control_step(-1.5, -1.5))
+
+    # |1.5 - (-1)| < 3W, but the direction flipped: not a no-op cycle
+    assert commands == [2.0]
+    assert c._pid_last_output == 1.5
+
+
+def test_pid_control_step_distributes_when_driven_battery_reaches_soc_limit(loop):
+    commands: list[float] = []
+    c = _mk_pid_step_coordinator(
+        {CONF_PID_KP: 1.0, CONF_PID_KI: 0.0, CONF_PID_KD: 0.0, CONF_PID_DEADBAND: 3}, commands
+    )
+    c._sample_batteries = lambda: {"b1": (-500.0, 50.0)}
+
+    loop.run_until_complete(c._pid_control_step(500.0, 500.0))
+    c._last_battery_setpoints["b1"] = (500, PowerDir.DISCHARGE)
+
+    # Within the deadband, but the discharging battery dropped to the min SoC: it must be re-staged
+    c._sample_batteries = lambda: {"b1": (-500.0, 12.0)}
+    loop.run_until_complete(c._pid_control_step(501.0, 501.0))
+    assert commands == [-500.0, -501.0]
+
+
+def test_pid_control_step_distributes_after_last_output_is_cleared(loop):
+    commands: list[float] = []
+    c = _mk_pid_step_coordinator(
+        {CONF_PID_KP: 1.0, CONF_PID_KI: 0.0, CONF_PID_KD: 0.0, CONF_PID_DEADBAND: 3}, commands
+    )
+
+    loop.run_until_complete(c._pid_control_step(500.0, 500.0))
+    c._reset_pid_state()
+    loop.run_until_complete(c._pid_control_step(500.0, 500.0))
+    assert commands == [-500.0, -500.0]
+
+    # A forced (non state_change) update request clears the last output as well
+    class _RunningTask:
+        def done(self):
+            return False
+
+    c._is_running = True
+    c._update_task = _RunningTask()  # Keeps the request from scheduling a real update
+    c._get_effective_update_interval = lambda: 10
+    loop.run_until_complete(c.async_request_update(reason="switch"))
+    assert c._pid_last_output is None
+    loop.run_until_complete(c._pid_control_step(501.0, 501.0))
+    assert commands == [-500.0, -500.0, -501.0]
@@ -0,0 +1,30 @@
+from collections import deque
+
+from custom_components.marstek_venus_ha.coordinator import SlidingMinMax
+
+
+def test_sliding_min_max_matches_full_scan_of_window():
+    window = SlidingMinMax(3)
+    reference: deque[float] = deque(maxlen=3)
+
+    for value in [500.0, 1200.0, 900.0, 100.0, 100.0, 2000.0, 50.0]:
+        window.append(value)
+        reference.append(value)
+
+        assert len(window) == len(reference)
+        assert window.min() == min(reference)
+        assert window.max() == max(reference)
+
+
+def test_sliding_min_max_clear_resets_length():
+    window = SlidingMinMax(2)
+    window.append(1.0)
+    window.append(2.0)
+    assert len(window) == window.maxlen
+
+    window.clear()
+
+    assert len(window) == 0
+    window.append(5.0)
+    assert window.min() == 5.0
+    assert window.max() == 5.0